@@ -0,0 +1,148 @@
+import concurrent.futures
+import sys
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import Pool
+from typing import Any, Callable
+
+from easy_pool.distributed import DistributedBackend
+
+BACKEND_POOL = "pool"
+BACKEND_PROCESS = "process"
+BACKEND_THREAD = "thread"
+BACKEND_INTERPRETER = "interpreter"
+BACKEND_DISTRIBUTED = "distributed"
+BACKENDS = [
+    BACKEND_POOL,
+    BACKEND_PROCESS,
+    BACKEND_THREAD,
+    BACKEND_INTERPRETER,
+    BACKEND_DISTRIBUTED,
+]
+
+
+def get_available_backends() -> list[str]:
+    """
+    Get the backends the running Python supports. Sub-interpreters need Python 3.14+.
+    """
+    backends = [BACKEND_POOL, BACKEND_PROCESS, BACKEND_THREAD, BACKEND_DISTRIBUTED]
+    if hasattr(concurrent.futures, "InterpreterPoolExecutor"):
+        backends.append(BACKEND_INTERPRETER)
+    return backends
+
+
+def is_gil_enabled() -> bool:
+    """
+    Whether the running Python has the GIL enabled. False on free-threaded builds (3.13t+)
+    with the GIL disabled, where the thread backend runs Python code truly in parallel.
+    """
+    if hasattr(sys, "_is_gil_enabled"):
+        return sys._is_gil_enabled()
+    return True
+
+
+class FutureResult:
+    """
+    Gives a concurrent.futures.Future the same get interface as multiprocessing's AsyncResult.
+    """
+
+    def __init__(self, future: Future):
+        self.future = future
+
+    def get(self, timeout: float = None) -> Any:
+        return self.future.result(timeout)
+
+
+class PoolBackend:
+    """
+    Runs tasks in worker processes of a multiprocessing.Pool.
+
+    Like the other backends, submit returns a handle with a get(timeout) method and calls the
+    optional callback without arguments once the task is done, whether it succeeded or not.
+    Workers that die are replaced, the tasks they were running are never answered.
+    """
+
+    def __init__(
+        self,
+        pool_size: int,
+        initializer: Callable,
+        initargs: tuple,
+        max_tasks_per_child: int = None,
+    ):
+        self.pool = Pool(
+            processes=pool_size,
+            initializer=initializer,
+            initargs=initargs,
+            maxtasksperchild=max_tasks_per_child,
+        )
+
+    def submit(self, func: Callable, *args, callback: Callable = None):
+        if callback is None:
+            return self.pool.apply_async(func, args)
+
+        return self.pool.apply_async(
+            func,
+            args,
+            callback=lambda _: callback(),
+            error_callback=lambda _: callback(),
+        )
+
+    def shutdown(self):
+        self.pool.terminate()
+
+
+class ExecutorBackend:
+    """
+    Runs tasks in a concurrent.futures executor: worker processes, threads or sub-interpreters.
+    A worker process that dies breaks the executor, which fails all its pending tasks.
+    """
+
+    def __init__(
+        self, backend: str, pool_size: int, initializer: Callable, initargs: tuple
+    ):
+        if backend == BACKEND_PROCESS:
+            executor_class = ProcessPoolExecutor
+        elif backend == BACKEND_THREAD:
+            executor_class = ThreadPoolExecutor
+        elif backend == BACKEND_INTERPRETER:
+            executor_class = concurrent.futures.InterpreterPoolExecutor
+        else:
+            raise ValueError(f"Invalid executor backend '{backend}'.")
+
+        self.executor = executor_class(
+            max_workers=pool_size, initializer=initializer, initargs=initargs
+        )
+        self.exit_codes: dict[int, int] = {}
+
+    def submit(self, func: Callable, *args, callback: Callable = None) -> FutureResult:
+        future = self.executor.submit(func, *args)
+        if callback is not None:
+            future.add_done_callback(lambda _: callback())
+        return FutureResult(future)
+
+    def shutdown(self):
+        """
+        Stop the workers and keep the exit code of every worker process by its process id.
+        """
+        processes = dict(getattr(self.executor, "_processes", None) or {})
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.exit_codes = {pid: process.exitcode for pid, process in processes.items()}
+
+
+def create_backend(
+    backend: str,
+    pool_size: int,
+    initializer: Callable,
+    initargs: tuple,
+    max_tasks_per_child: int = None,
+):
+    """
+    Start the workers of a backend. Only the pool backend replaces its workers after
+    max_tasks_per_child tasks, ProcessPoolExecutor's own option can deadlock on some Python
+    versions.
+    """
+    if backend == BACKEND_POOL:
+        return PoolBackend(pool_size, initializer, initargs, max_tasks_per_child)
+    if backend == BACKEND_DISTRIBUTED:
+        return DistributedBackend(pool_size, initializer, initargs)
+
+    return ExecutorBackend(backend, pool_size, initializer, initargs)
@@ -0,0 +1,450 @@
+import ipaddress
+import os
+import queue
+import socket
+import sys
+import threading
+from multiprocessing import Pool, TimeoutError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable
+
+from util.timer import Timer, set_clock_offset
+
+# Agents run the workers of the "distributed" backend on this or other hosts. The harness
+# connects to every agent and sends it its share of the calls, the agent runs them in a local
+# multiprocessing.Pool and sends the results back.
+#
+# Every message is a frame of multiprocessing.connection: a length prefix followed by the
+# pickled message. Connections are authenticated with a shared key (HMAC challenge), but the
+# messages are pickles, so agents run whatever code a harness with the key sends them and
+# must only be reachable from trusted hosts. Calls and results are batched, a frame carries
+# all calls or results that queued up while the previous frame was being sent:
+# - harness to agent: (MESSAGE_CLOCK,), (MESSAGE_INIT, pool_size, clock_offset, initializer,
+#   initargs), (MESSAGE_CALLS, [(call_id, func, args), ...]) and (MESSAGE_SHUTDOWN,)
+# - agent to harness: (MESSAGE_CLOCK, now) and (MESSAGE_RESULTS, [(call_id, ok, value,
+#   agent_runtime), ...]), where agent_runtime is the time from receiving the call to
+#   sending its result
+MESSAGE_CLOCK = "clock"
+MESSAGE_INIT = "init"
+MESSAGE_CALLS = "calls"
+MESSAGE_RESULTS = "results"
+MESSAGE_SHUTDOWN = "shutdown"
+
+DEFAULT_AGENT_HOST = "127.0.0.1"
+DEFAULT_AGENT_PORT = 6100
+
+# The shared key of the harness and its agents. Without it agents only listen on the loopback
+# interface and use a default key.
+AGENT_KEY_VARIABLE = "EASY_POOL_AGENT_KEY"
+DEFAULT_AGENT_KEY = b"easy_pool"
+
+# How many round trips estimate the clock offset of an agent, the fastest one is used
+CLOCK_SYNC_ROUNDS = 5
+
+# How long to wait for an agent to stop its workers when a pool is shut down
+AGENT_SHUTDOWN_TIMEOUT = 10
+
+# The agents of the distributed backend, set from the config by set_agents
+agent_addresses: list[tuple[str, int]] = []
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    """
+    Parse an agent address of the form "host:port".
+
+    Raises:
+        ValueError: If the address has no valid port.
+    """
+    host, separator, port = address.rpartition(":")
+    if separator == "" or host == "" or not port.isdigit():
+        raise ValueError(f"Invalid agent address '{address}', expected 'host:port'.")
+    return host, int(port)
+
+
+def set_agents(addresses: list[str]):
+    global agent_addresses
+    agent_addresses = [parse_address(address) for address in addresses]
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def get_agent_key() -> bytes:
+    key = os.environ.get(AGENT_KEY_VARIABLE)
+    if key is None:
+        return DEFAULT_AGENT_KEY
+    return key.encode()
+
+
+def disable_nagle(connection: Connection):
+    """
+    Send small frames right away. A frame over 16 KiB is written as a length prefix and a
+    body, and Nagle's algorithm would hold back the body until the prefix is acknowledged.
+    """
+    sock = socket.fromfd(connection.fileno(), socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    finally:
+        sock.close()
+
+
+def split_workers(pool_size: int, agent_count: int) -> list[int]:
+    """
+    Spread the workers of a pool evenly across the agents, the first agents get the remainder.
+    """
+    return [
+        pool_size // agent_count + (1 if index < pool_size % agent_count else 0)
+        for index in range(agent_count)
+    ]
+
+
+class DistributedResult:
+    """
+    The handle of a call sent to an agent, with the same get interface as multiprocessing's
+    AsyncResult. Once done it also holds the time the call spent on the network, see
+    AgentConnection.
+    """
+
+    def __init__(self, callback: Callable = None):
+        self.callback = callback
+        self.event = threading.Event()
+        self.value = None
+        self.error: BaseException = None
+        self.network_runtime = 0.0
+
+    def set(
+        self, value: Any, error: BaseException = None, network_runtime: float = 0.0
+    ):
+        self.value = value
+        self.error = error
+        self.network_runtime = network_runtime
+        self.event.set()
+        if self.callback is not None:
+            self.callback()
+
+    def get(self, timeout: float = None) -> Any:
+        if not self.event.wait(timeout):
+            raise TimeoutError
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class AgentConnection:
+    """
+    The harness side of the connection to an agent running pool_size workers.
+
+    A sender thread batches the submitted calls into frames and a receiver thread resolves
+    their results. The network time of a call is its round trip time minus the time the agent
+    had it, so it covers the transfer and the (de)serialization in both directions and does
+    not depend on the clocks of the two hosts agreeing.
+    """
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        pool_size: int,
+        initializer: Callable,
+        initargs: tuple,
+    ):
+        self.address = address
+        self.pool_size = pool_size
+        try:
+            self.connection = Client(address, authkey=get_agent_key())
+        except (OSError, EOFError) as e:
+            raise ConnectionError(
+                f"Could not connect to agent {format_address(address)}: {e}"
+            )
+        disable_nagle(self.connection)
+
+        self.clock_offset = self.sync_clock()
+        self.connection.send(
+            (MESSAGE_INIT, pool_size, self.clock_offset, initializer, initargs)
+        )
+
+        self.lock = threading.Lock()
+        self.pending: dict[int, tuple[DistributedResult, float]] = {}
+        self.in_flight = 0
+        self.outgoing = queue.Queue()
+        self.sender = threading.Thread(target=self.send_calls, daemon=True)
+        self.receiver = threading.Thread(target=self.receive_results, daemon=True)
+        self.sender.start()
+        self.receiver.start()
+
+    def sync_clock(self) -> float:
+        """
+        Estimate how far the agent's clock is ahead of this one from the fastest of a few
+        round trips, assuming the agent read its clock halfway through.
+        """
+        best_round_trip = None
+        clock_offset = 0.0
+        for _ in range(CLOCK_SYNC_ROUNDS):
+            send_time = Timer.now()
+            self.connection.send((MESSAGE_CLOCK,))
+            _, agent_time = self.connection.recv()
+            receive_time = Timer.now()
+
+            round_trip = receive_time - send_time
+            if best_round_trip is None or round_trip < best_round_trip:
+                best_round_trip = round_trip
+                clock_offset = agent_time - (send_time + receive_time) / 2
+        return clock_offset
+
+    def submit(
+        self, call_id: int, func: Callable, args: tuple, result: DistributedResult
+    ):
+        with self.lock:
+            self.in_flight += 1
+        self.outgoing.put((call_id, func, args, result))
+
+    def get_load(self) -> float:
+        return self.in_flight / self.pool_size
+
+    def send_calls(self):
+        while True:
+            calls = [self.outgoing.get()]
+            while not self.outgoing.empty():
+                calls.append(self.outgoing.get())
+
+            stop = None in calls
+            calls = [call for call in calls if call is not None]
+            if len(calls) > 0:
+                send_time = Timer.now()
+                with self.lock:
+                    for call_id, _, _, result in calls:
+                        self.pending[call_id] = (result, send_time)
+                try:
+                    self.connection.send(
+                        (
+                            MESSAGE_CALLS,
+                            [(call_id, func, args) for call_id, func, args, _ in calls],
+                        )
+                    )
+                except OSError as e:
+                    self.fail_pending(e)
+                    return
+
+            if stop:
+                try:
+                    self.connection.send((MESSAGE_SHUTDOWN,))
+                except OSError:
+                    pass
+                return
+
+    def receive_results(self):
+        while True:
+            try:
+                _, results = self.connection.recv()
+            except (EOFError, OSError) as e:
+                self.fail_pending(e)
+                return
+            receive_time = Timer.now()
+
+            for call_id, ok, value, agent_runtime in results:
+                with self.lock:
+                    result, send_time = self.pending.pop(call_id)
+                    self.in_flight -= 1
+                network_runtime = max(receive_time - send_time - agent_runtime, 0.0)
+                if ok:
+                    result.set(value, network_runtime=network_runtime)
+                else:
+                    result.set(None, value, network_runtime)
+
+    def fail_pending(self, error: BaseException):
+        with self.lock:
+            pending = list(self.pending.values())
+            self.pending.clear()
+            self.in_flight = 0
+        for result, _ in pending:
+            result.set(
+                None,
+                ConnectionError(
+                    f"Lost connection to agent {format_address(self.address)}: {error or type(error).__name__}"
+                ),
+            )
+
+    def close(self):
+        # The agent hangs up once it has stopped its workers, which ends the receiver
+        self.outgoing.put(None)
+        self.sender.join()
+        self.receiver.join(AGENT_SHUTDOWN_TIMEOUT)
+        self.connection.close()
+
+
+class DistributedBackend:
+    """
+    Runs tasks in worker processes of agents, see run_agent. The workers of the pool are
+    spread evenly across the configured agents, and every call goes to the agent with the
+    fewest calls in flight per worker.
+    """
+
+    def __init__(self, pool_size: int, initializer: Callable, initargs: tuple):
+        if len(agent_addresses) == 0:
+            raise ValueError("The distributed backend needs at least one agent.")
+
+        self.connections: list[AgentConnection] = []
+        self.next_call_id = 0
+        try:
+            for address, size in zip(
+                agent_addresses, split_workers(pool_size, len(agent_addresses))
+            ):
+                if size > 0:
+                    self.connections.append(
+                        AgentConnection(address, size, initializer, initargs)
+                    )
+        except Exception:
+            self.shutdown()
+            raise
+
+    def submit(self, func: Callable, *args, callback: Callable = None):
+        call_id = self.next_call_id
+        self.next_call_id += 1
+
+        result = DistributedResult(callback)
+        connection = min(self.connections, key=lambda x: x.get_load())
+        connection.submit(call_id, func, args, result)
+        return result
+
+    def shutdown(self):
+        for connection in self.connections:
+            connection.close()
+        self.connections = []
+
+
+def format_address(address: tuple[str, int]) -> str:
+    return f"{address[0]}:{address[1]}"
+
+
+def init_agent_worker(clock_offset: float, initializer: Callable, initargs: tuple):
+    # Report times on the harness clock, e.g. when a task started for its queue wait
+    set_clock_offset(clock_offset)
+    initializer(*initargs)
+
+
+def run_agent(host: str = DEFAULT_AGENT_HOST, port: int = DEFAULT_AGENT_PORT):
+    """
+    Serve harnesses until interrupted. Every connection gets its own pool of workers, so
+    several pools of a harness can use the same agent at once.
+    """
+    if not is_loopback(host) and AGENT_KEY_VARIABLE not in os.environ:
+        print(
+            f"Agents listening on other hosts than this one need a shared key in {AGENT_KEY_VARIABLE}. Quitting..."
+        )
+        sys.exit(1)
+
+    listener = Listener((host, port), authkey=get_agent_key())
+    print(f"Agent listening on {host}:{port} ({socket.gethostname()})", flush=True)
+
+    try:
+        while True:
+            try:
+                connection = listener.accept()
+            except (OSError, EOFError) as e:
+                print(f"Rejected connection: {e}", flush=True)
+                continue
+
+            print(
+                f"Harness connected from {format_address(listener.last_accepted)}",
+                flush=True,
+            )
+            disable_nagle(connection)
+            threading.Thread(
+                target=serve_harness, args=(connection,), daemon=True
+            ).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+
+
+def serve_harness(connection: Connection):
+    """
+    Run the calls of a harness connection in a local pool until the harness shuts it down or
+    disconnects.
+    """
+    pool = None
+    outgoing = queue.Queue()
+    sender = threading.Thread(
+        target=send_results, args=(connection, outgoing), daemon=True
+    )
+
+    try:
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                break
+            receive_time = Timer.now()
+
+            if message[0] == MESSAGE_CLOCK:
+                connection.send((MESSAGE_CLOCK, receive_time))
+            elif message[0] == MESSAGE_INIT:
+                _, pool_size, clock_offset, initializer, initargs = message
+                pool = Pool(
+                    processes=pool_size,
+                    initializer=init_agent_worker,
+                    initargs=(clock_offset, initializer, initargs),
+                )
+                sender.start()
+                print(f"Started {pool_size} workers", flush=True)
+            elif message[0] == MESSAGE_CALLS:
+                for call_id, func, args in message[1]:
+                    pool.apply_async(
+                        func,
+                        args,
+                        callback=get_result_callback(
+                            outgoing, call_id, True, receive_time
+                        ),
+                        error_callback=get_result_callback(
+                            outgoing, call_id, False, receive_time
+                        ),
+                    )
+            elif message[0] == MESSAGE_SHUTDOWN:
+                break
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if sender.is_alive():
+            outgoing.put(None)
+            sender.join()
+        connection.close()
+        print("Harness disconnected", flush=True)
+
+
+def get_result_callback(
+    outgoing: queue.Queue, call_id: int, ok: bool, receive_time: float
+) -> Callable:
+    return lambda value: outgoing.put((call_id, ok, value, receive_time))
+
+
+def send_results(connection: Connection, outgoing: queue.Queue):
+    while True:
+        results = [outgoing.get()]
+        while not outgoing.empty():
+            results.append(outgoing.get())
+
+        stop = None in results
+        results = [result for result in results if result is not None]
+        if len(results) > 0:
+            send_time = Timer.now()
+            try:
+                connection.send(
+                    (
+                        MESSAGE_RESULTS,
+                        [
+                            (call_id, ok, value, send_time - receive_time)
+                            for call_id, ok, value, receive_time in results
+                        ],
+                    )
+                )
+            except OSError:
+                return
+
+        if stop:
+            return
@@ -1,14 +1,101 @@
+import os
+import pickle
+import queue
+import signal
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import BrokenExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dataclasses import dataclass
-from multiprocessing import Pool
-from multiprocessing.pool import AsyncResult
-from typing import Any, Callable, Generic, TypeVar
+from multiprocessing import Barrier, TimeoutError
+from multiprocessing.util import Finalize
+from typing import Any, Callable, Generic, Iterator, TypeVar, Union
 
-from util.timer import Timer
+import numpy as np
 
+from easy_pool.backends import (
+    BACKEND_DISTRIBUTED,
+    BACKEND_INTERPRETER,
+    BACKEND_POOL,
+    BACKEND_PROCESS,
+    BACKEND_THREAD,
+    create_backend,
+)
+from easy_pool.faults import (
+    ACTIVITY_SLOTS_PER_WORKER,
+    NO_TASK,
+    WATCHDOG_INTERVAL,
+    FaultPolicy,
+    TaskError,
+    WorkerActivity,
+    is_process_alive,
+    kill_process,
+)
+from easy_pool.placement import PLACEMENT_NONE, PlacementSlots, get_worker_cpus
+from easy_pool.registry import (
+    TaskRef,
+    TaskRegistry,
+    TaskTableHandle,
+    load_task_table,
+    publish_task_table,
+    unpublish_task_table,
+)
+from easy_pool.scheduler import (
+    SCHEDULE_FIFO,
+    SCHEDULE_LONGEST_FIRST,
+    SCHEDULE_WORK_STEALING,
+    StealQueue,
+    sort_longest_first,
+)
+from easy_pool.shared_memory import (
+    TRANSPORT_PICKLE,
+    TRANSPORT_SHARED_MEMORY,
+    SharedArrayStore,
+    resolve_shared_args,
+    release_result_buffers,
+    share_result,
+)
+from easy_pool.startup import WorkerStartup, import_modules
+from easy_pool.threads import ThreadLimits, limit_worker_threads
+from util.generator import seed_random_generators
+from util.profiler import ProfiledResult, TaskProfiles, run_profiled
+from util.samples import TaskSamples
+from util.timer import CPU_CLOCK_PROCESS, CPU_CLOCK_THREAD, Timer
 
 T = TypeVar("T")
 R = TypeVar("R")
 
+CHUNKSIZE_AUTO = "auto"
+
+# What happens to task results: returned as is, dropped in the worker or reduced
+# to a CRC32 checksum in the worker, so large results never travel back.
+RETENTION_KEEP = "keep"
+RETENTION_DISCARD = "discard"
+RETENTION_DIGEST = "digest"
+RETENTIONS = [RETENTION_KEEP, RETENTION_DISCARD, RETENTION_DIGEST]
+
+# Set in every worker by init_worker, used by warm_up_task to hold each worker
+# until all of them have started.
+warm_up_barrier = None
+
+# How long warm_up waits for every worker by default, so a worker that dies while starting
+# fails the warm up instead of holding it forever
+WARM_UP_TIMEOUT = 120
+
+# Set in every worker by init_worker: how the CPU time of a task is measured
+worker_cpu_clock = CPU_CLOCK_PROCESS
+
+# Set in every worker by init_worker: how long it took to start, per thread since thread
+# workers share the module
+worker_startup = threading.local()
+
+# Set in every worker by init_worker: where it publishes the task it is running, see
+# easy_pool.faults. The slot is per thread as well.
+worker_activity: WorkerActivity = None
+worker_activity_slot = threading.local()
+
 
 @dataclass
 class IndexedTask(Generic[T, R]):
@@ -19,61 +106,993 @@ class IndexedTask(Generic[T, R]):
     index: int
     func: Callable[[T], R]
     args: T
+    shared: bool = False
+    retention: str = RETENTION_KEEP
+    submit_time: float = None
+    seed: int = None
+    cost: float = None
+    profiler: str = None
 
 
 class EasyPool:
     """
     A simple wrapper around Python's multiprocessing.Pool to make it easy to run any arbitrary function in parallel.
 
+    The workers can also be provided by a concurrent.futures executor instead, see easy_pool.backends:
+    "pool" (multiprocessing.Pool, default), "process", "thread", "interpreter" or "distributed",
+    which runs them on agents on this or other hosts, see easy_pool.distributed.
+
     Add tasks to the pool using the add_task method, which calls the pool's apply_async method.
     After adding all tasks, call the get_results method to retrieve the results.
     This method will block until all tasks are done, or they timeout.
 
     The returned list is sorted by the index of each task.
 
+    Alternatively iter_results yields the results in the order the tasks complete, without
+    collecting them. The runtime, queue wait (submission to start) and CPU time of every task
+    are also recorded in task_samples. Tasks given a seed get their own random and numpy
+    generators seeded with it (see util.generator), not shared with other thread workers.
+    Combined with a max_in_flight window, which makes add_task block while that many tasks
+    are running, and a "discard" or "digest" result retention, any number of tasks can be
+    run in constant memory.
+
+    Tasks can be dispatched to the workers in batches to amortize the per-call pickling and IPC
+    overhead. With a chunksize of 1 every task gets its own apply_async call, larger values group
+    that many tasks into a single call and "auto" sizes the batches from the task count and pool size
+    once get_results is called. Each task is still timed individually inside the batch.
+
+    Large numpy arrays can be passed to and from the workers through shared memory instead of
+    pickling them. With the "shared_memory" transport an argument array is copied into shared
+    memory once and every task only carries a handle to it, and result arrays are written into
+    per-worker shared buffers that are recycled once get_results has copied them out.
+
+    The schedule decides the order the tasks are handed out in, see easy_pool.scheduler: "fifo"
+    dispatches them as they are added, "longest_first" buffers them until get_results and
+    dispatches them by descending estimated cost, and "work_stealing" keeps them in the main
+    process and only sends the next batch to a worker once it is idle, sized by the remaining
+    cost instead of the chunk size. The time from the first added task to the last result is
+    the makespan.
+
+    Tasks that raise an exception, run past the task timeout of the fault policy or are lost
+    with a worker that died are run again up to max_retries times, and are left out of the
+    results after that. While it waits for results the pool checks the activity the process
+    and thread workers publish (see easy_pool.faults): it kills the worker of a task past its
+    deadline, replaces workers that died and resends the tasks they had. The failed, retried
+    and timed out tasks and the lost workers are counted, see get_fault_metrics.
+
+    With a profiler set, every task runs under cProfile, a stack sampler or tracemalloc in
+    its worker (see util.profiler), and what was captured is collected per task type in
+    task_profiles.
+
+    A thread limit caps the BLAS/OpenMP and OpenCV thread pools of every worker, so workers that
+    each start a thread per core don't oversubscribe the CPU. Thread workers share the main
+    process, so for them the limit applies to the whole process until the pool is shut down.
+    Sub-interpreter workers are not limited.
+
+    The placement pins every worker to CPUs of the machine's NUMA topology, see
+    easy_pool.placement. Workers take a free CPU assignment as they start, so a worker that
+    replaces another one takes over its CPUs.
+
+    With a task registry set (see easy_pool.registry) the functions and argument lists of the
+    task list are sent to the workers once, and add_registered_task only sends the ids of a
+    task's function and arguments. The task registry is not supported by the "interpreter"
+    backend. Calls to process workers are pickled in the main process, so the time spent
+    preparing and sending the tasks (dispatch_runtime) and their size (payload_bytes) can be
+    reported. For the "distributed" backend the time the tasks spent on the network
+    (network_runtime) is reported as well.
+
     Args:
         pool_size (int): The number of workers in the pool.
         timeout (float, optional): The maximum time to wait for a result from a worker.
+        chunksize (int | str, optional): How many tasks to send to a worker per call, or "auto".
+        warm_modules (list[str], optional): Modules to import in every worker when it starts.
+        transport (str, optional): How numpy arrays are passed, "pickle" or "shared_memory".
+        backend (str, optional): What provides the workers, "pool", "process", "thread", "interpreter"
+                                 or "distributed".
+        retention (str, optional): What to return of each result, "keep", "discard" or "digest".
+        max_in_flight (int, optional): The maximum number of dispatched tasks that are not yet collected.
+        schedule (str, optional): How the tasks are handed out, "fifo", "longest_first" or "work_stealing".
+        thread_limit (int, optional): The maximum number of library threads per worker.
+        placement (str, optional): Which CPUs the workers are pinned to, "none", "compact", "scatter" or "numa".
+        fault_policy (FaultPolicy, optional): Task timeout, retries and worker recycling, none by default.
+        profiler (str, optional): What is captured around every task, "cprofile", "sampling" or "tracemalloc".
 
     Returns:
         list: A list of tuples containing the index, result, and runtime of each task.
     """
 
-    def __init__(self, pool_size: int, timeout: float = None):
+    def __init__(
+        self,
+        pool_size: int,
+        timeout: float = None,
+        chunksize: Union[int, str] = 1,
+        warm_modules: list[str] = None,
+        transport: str = TRANSPORT_PICKLE,
+        backend: str = BACKEND_POOL,
+        retention: str = RETENTION_KEEP,
+        max_in_flight: int = None,
+        schedule: str = SCHEDULE_FIFO,
+        thread_limit: int = None,
+        placement: str = PLACEMENT_NONE,
+        fault_policy: FaultPolicy = None,
+        profiler: str = None,
+    ):
         self.pool_size = pool_size
         self.timeout = timeout
-        self.pool = Pool(processes=pool_size)
-        self.async_results: list[AsyncResult] = []
+        self.chunksize = chunksize
+        self.transport = transport
+        self.backend = backend
+        self.retention = retention
+        self.max_in_flight = max_in_flight
+        self.schedule = schedule
+        self.fault_policy = fault_policy or FaultPolicy()
+        self.profiler = profiler
+        self.shared_arrays = SharedArrayStore()
+
+        # Process workers get their calls pickled up front, which sizes the payloads
+        self.pickle_calls = backend in [
+            BACKEND_POOL,
+            BACKEND_PROCESS,
+            BACKEND_DISTRIBUTED,
+        ]
+
+        # The task table of the registered tasks, see set_registry
+        self.registry: TaskRegistry = None
+        self.table_handle: TaskTableHandle = None
+        self.table_segment = None
+
+        # Sub-interpreters and agents can not share a barrier, their warm up is best effort
+        self.barrier = None
+        if backend not in [BACKEND_INTERPRETER, BACKEND_DISTRIBUTED]:
+            self.barrier = Barrier(pool_size)
+
+        # Thread workers share a process, so only their own thread's CPU time is theirs
+        cpu_clock = CPU_CLOCK_PROCESS
+        if backend == BACKEND_THREAD:
+            cpu_clock = CPU_CLOCK_THREAD
+
+        # Thread workers are limited through the main process instead of one by one, for
+        # every test pass, see apply_thread_limits
+        self.thread_limits = ThreadLimits(None)
+        worker_thread_limit = thread_limit
+        if backend == BACKEND_THREAD:
+            self.thread_limits = ThreadLimits(thread_limit)
+            worker_thread_limit = None
+        elif backend == BACKEND_INTERPRETER:
+            worker_thread_limit = None
+
+        # The CPUs of every worker, handed out in slots as the workers start
+        self.worker_cpus = get_worker_cpus(placement, pool_size, thread_limit or 1)
+        placement_slots = None
+        if backend in [BACKEND_INTERPRETER, BACKEND_DISTRIBUTED]:
+            self.worker_cpus = [None for _ in range(pool_size)]
+        elif placement != PLACEMENT_NONE:
+            placement_slots = PlacementSlots(self.worker_cpus)
+
+        # Worker startup latencies are measured from here, see warm_up
+        self.start_time = Timer.now()
+        self.initargs = (
+            warm_modules or [],
+            self.barrier,
+            cpu_clock,
+            worker_thread_limit,
+            placement_slots,
+            self.start_time,
+        )
+        self.activity: WorkerActivity = None
+        self.pool = self.create_workers()
+        self.pending_tasks: list[IndexedTask] = []
+        self.steal_queue = StealQueue()
+
+        # Dispatched calls by call id, with their tasks. Backends report finished calls by
+        # putting their id into the completed queue.
+        self.in_flight: dict[int, tuple[Any, list[Union[IndexedTask, TaskRef]]]] = {}
+        self.in_flight_tasks = 0
+        self.next_call_id = 0
+        self.completed_calls = queue.Queue()
+        self.received_results: deque[tuple[int, Any, float]] = deque()
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Reset the collection statistics, e.g. before reusing the pool for another test run.
+        """
+        self.stats_timer = Timer(start_now=True)
+        self.first_result_runtime: float = None
+        self.submit_blocked_runtime = 0.0
+        self.head_of_line = HeadOfLineTracker()
+        self.task_samples = TaskSamples()
+        self.first_submit_time: float = None
+        self.last_receive_time: float = None
+        self.dispatch_runtime = 0.0
+        self.payload_bytes = 0
+        self.network_runtime = 0.0
+        self.added_tasks = 0
+        self.task_attempts: dict[int, int] = {}
+        self.failed_tasks = 0
+        self.retried_tasks = 0
+        self.timed_out_tasks = 0
+        self.lost_workers = 0
+        self.last_error: str = None
+        self.task_profiles = TaskProfiles(self.profiler)
+
+    def create_workers(self):
+        """
+        Start the backend. The workers of the process and thread backends publish their
+        activity, which sub-interpreters and agents can't share.
+        """
+        self.activity = None
+        if self.backend in [BACKEND_POOL, BACKEND_PROCESS, BACKEND_THREAD]:
+            self.activity = WorkerActivity(self.pool_size * ACTIVITY_SLOTS_PER_WORKER)
+
+        return create_backend(
+            self.backend,
+            self.pool_size,
+            initializer=init_worker,
+            initargs=(*self.initargs, self.activity),
+            max_tasks_per_child=self.fault_policy.max_tasks_per_child,
+        )
+
+    @staticmethod
+    def process_indexed_task(
+        task: IndexedTask[Any, Any],
+    ) -> tuple[int, Any, float, float, float]:
+        args = task.args
+        if task.shared:
+            args = resolve_shared_args(args)
+        if task.seed is not None:
+            seed_random_generators(task.seed)
+
+        slot = getattr(worker_activity_slot, "slot", None)
+        if slot is not None:
+            worker_activity.start_task(slot, task.index)
+
+        timer = Timer(start_now=True, cpu_clock=worker_cpu_clock)
+        queue_wait = 0.0
+        if task.submit_time is not None:
+            queue_wait = timer.start_time - task.submit_time
+
+        profile = None
+        try:
+            if task.profiler is not None:
+                result, profile = run_profiled(task.profiler, task.func, args)
+            else:
+                result = task.func(*args)
+        except Exception as e:
+            result = TaskError(e)
+        runtime = timer.get_duration()
+        cpu_time = timer.get_cpu_duration()
+
+        if slot is not None:
+            worker_activity.end_task(slot)
+
+        if not isinstance(result, TaskError):
+            result = apply_retention(result, task.retention)
+            if task.shared:
+                result = share_result(result)
+            if profile is not None:
+                result = ProfiledResult(result, task.func.__name__, profile)
+
+        return (task.index, result, runtime, queue_wait, cpu_time)
+
+    @staticmethod
+    def process_indexed_task_batch(
+        tasks: list[IndexedTask[Any, Any]],
+    ) -> list[tuple[int, Any, float, float, float]]:
+        return [EasyPool.process_indexed_task(task) for task in tasks]
 
     @staticmethod
-    def process_indexed_task(task: IndexedTask[Any, Any]) -> tuple[int, Any, float]:
+    def process_registered_task_batch(
+        call: tuple[TaskTableHandle, str, bool, str, list[TaskRef]],
+    ) -> list[tuple[int, Any, float, float, float]]:
+        table_handle, retention, shared, profiler, task_refs = call
+        funcs, args = load_task_table(table_handle)
+        return [
+            EasyPool.process_indexed_task(
+                IndexedTask(
+                    task_ref.index,
+                    funcs[task_ref.type_id],
+                    args[task_ref.arg_ref] + [task_ref.index],
+                    shared,
+                    retention,
+                    submit_time=task_ref.submit_time,
+                    seed=task_ref.seed,
+                    profiler=profiler,
+                )
+            )
+            for task_ref in task_refs
+        ]
+
+    @staticmethod
+    def process_pickled_call(call: tuple[Callable, bytes]) -> Any:
+        func, payload = call
+        return func(pickle.loads(payload))
+
+    def warm_up(self) -> list[WorkerStartup]:
+        """
+        Block until every worker in the pool has started and run a no-op task.
+
+        Each no-op waits on a barrier sized to the pool, so no worker can pick up a second
+        one before all the others have taken theirs. Waits up to the pool's timeout, or
+        WARM_UP_TIMEOUT if it has none, for all of them.
+
+        Returns:
+            list: The startup profile of every warmed up worker.
+        """
+        return self.call_every_worker(warm_up_task, self.start_time)
+
+    def release_result_buffers(self):
+        """
+        Free the result buffers of the shared memory transport that every worker keeps for
+        reuse, e.g. between the test passes of a persistent pool, so they don't hold on to
+        shared memory while the pool is idle.
+        """
+        if len(self.shared_arrays.result_buffer_names) == 0:
+            return
+
+        self.call_every_worker(release_result_buffers_task)
+        self.shared_arrays.detach_result_buffers()
+
+    def call_every_worker(self, func: Callable, *args) -> list:
+        """
+        Run func(timeout, *args) once on every worker, see warm_up_task for how func has to
+        wait on the barrier. Waits up to the pool's timeout, or WARM_UP_TIMEOUT if it has none.
+
+        Returns:
+            list: The result of every call.
+        """
+        timeout = self.timeout if self.timeout is not None else WARM_UP_TIMEOUT
+        deadline = Timer.now() + timeout
+        calls = [self.pool.submit(func, timeout, *args) for _ in range(self.pool_size)]
+
+        try:
+            return [call.get(max(deadline - Timer.now(), 0)) for call in calls]
+        except (TimeoutError, FutureTimeoutError, threading.BrokenBarrierError) as e:
+            raise TimeoutError(
+                f"Not all {self.pool_size} workers were ready within {timeout}s"
+            ) from e
+
+    def set_registry(self, registry: TaskRegistry):
+        """
+        Send the task table of a task list to the workers, replacing the previous one. Call it
+        before adding the registered tasks of a test pass.
+        """
         timer = Timer(start_now=True)
-        result = task.func(*task.args)
-        return (task.index, result, timer.get_duration())
+        self.close_registry()
+
+        args = registry.args
+        if self.transport == TRANSPORT_SHARED_MEMORY:
+            args = [self.shared_arrays.share_args(task_args) for task_args in args]
 
-    def add_task(self, task_index: int, task_func: Callable, task_args: list) -> Any:
-        task = IndexedTask(task_index, task_func, task_args)
-        self.async_results.append(
-            self.pool.apply_async(self.process_indexed_task, (task,))
+        self.registry = registry
+        self.table_handle, self.table_segment = publish_task_table(
+            (registry.funcs, args), in_process=self.backend == BACKEND_THREAD
         )
+        self.dispatch_runtime += timer.get_duration()
 
-    def get_results(self) -> list[tuple[int, Any, float]]:
-        results = []
-        for async_result in self.async_results:
-            index, value, runtime = async_result.get(self.timeout)
-            results.append((index, value, runtime))
+    def close_registry(self):
+        if self.table_handle is not None:
+            unpublish_task_table(self.table_handle, self.table_segment)
+        self.registry = None
+        self.table_handle = None
+        self.table_segment = None
 
-        results.sort(key=lambda x: x[0])
+    def add_task(
+        self,
+        task_index: int,
+        task_func: Callable,
+        task_args: list,
+        seed: int = None,
+        cost: float = None,
+    ) -> Any:
+        timer = Timer(start_now=True)
+        shared = self.transport == TRANSPORT_SHARED_MEMORY
+        if shared:
+            task_args = self.shared_arrays.share_args(task_args)
+
+        task = IndexedTask(
+            task_index,
+            task_func,
+            task_args,
+            shared,
+            self.retention,
+            submit_time=Timer.now(),
+            seed=seed,
+            cost=cost,
+            profiler=self.profiler,
+        )
+        self.dispatch_runtime += timer.get_duration()
+        self.enqueue_task(task)
+
+    def add_registered_task(
+        self, task_index: int, seed: int = None, cost: float = None
+    ):
+        """
+        Add the task at the given index of the registered task list, see set_registry.
+        """
+        timer = Timer(start_now=True)
+        type_id, arg_ref = self.registry.get_ref(task_index)
+        task = TaskRef(task_index, type_id, arg_ref, Timer.now(), seed, cost)
+        self.dispatch_runtime += timer.get_duration()
+        self.enqueue_task(task)
 
-        self.async_results = []
+    def enqueue_task(self, task: Union[IndexedTask, TaskRef]):
+        """
+        Dispatch a task right away, or buffer it until its batch is full or get_results is
+        called.
+        """
+        self.added_tasks += 1
+        self.head_of_line.submit(task.index)
+        if self.first_submit_time is None:
+            self.first_submit_time = task.submit_time
+
+        if self.schedule == SCHEDULE_FIFO and self.chunksize == 1:
+            if isinstance(task, TaskRef):
+                self.dispatch_batch([task])
+            else:
+                self.dispatch(self.process_indexed_task, task, [task])
+            return
+
+        self.pending_tasks.append(task)
+
+        # With a fixed chunk size the batch can be sent as soon as it is full,
+        # "auto" and the cost ordered schedules have to wait for all tasks.
+        if (
+            self.schedule == SCHEDULE_FIFO
+            and self.chunksize != CHUNKSIZE_AUTO
+            and len(self.pending_tasks) >= self.chunksize
+        ):
+            self.flush_tasks()
+
+    def flush_tasks(self):
+        """
+        Dispatch all buffered tasks to the pool in batches of the resolved chunk size.
+        """
+        if len(self.pending_tasks) == 0:
+            return
+
+        if self.schedule in [SCHEDULE_LONGEST_FIRST, SCHEDULE_WORK_STEALING]:
+            self.pending_tasks = sort_longest_first(self.pending_tasks)
+
+        if self.schedule == SCHEDULE_WORK_STEALING:
+            self.steal_queue.extend(self.pending_tasks)
+            self.pending_tasks = []
+            self.feed_workers()
+            return
+
+        chunksize = resolve_chunksize(
+            self.chunksize, len(self.pending_tasks), self.pool_size
+        )
+        for start in range(0, len(self.pending_tasks), chunksize):
+            self.dispatch_batch(self.pending_tasks[start : start + chunksize])
+
+        self.pending_tasks = []
+
+    def feed_workers(self):
+        """
+        Send the next batches of the work stealing queue to the idle workers.
+        """
+        while len(self.steal_queue) > 0 and len(self.in_flight) < self.pool_size:
+            self.dispatch_batch(self.steal_queue.take_batch(self.pool_size))
+
+    def dispatch_batch(self, batch: list[Union[IndexedTask, TaskRef]]):
+        if len(batch) > 0 and isinstance(batch[0], TaskRef):
+            shared = self.transport == TRANSPORT_SHARED_MEMORY
+            self.dispatch(
+                self.process_registered_task_batch,
+                (self.table_handle, self.retention, shared, self.profiler, batch),
+                batch,
+            )
+        else:
+            self.dispatch(self.process_indexed_task_batch, batch, batch)
+
+    def dispatch(
+        self, func: Callable, payload: Any, tasks: list[Union[IndexedTask, TaskRef]]
+    ):
+        """
+        Submit a call of the given tasks to the backend, first waiting for earlier calls to
+        finish if it would not fit in the in-flight window.
+        """
+        task_count = len(tasks)
+        if self.max_in_flight is not None:
+            blocked_timer = Timer(start_now=True)
+            while (
+                len(self.in_flight) > 0
+                and self.in_flight_tasks + task_count > self.max_in_flight
+            ):
+                self.receive_result()
+            self.submit_blocked_runtime += blocked_timer.get_duration()
+
+        call_id = self.next_call_id
+        self.next_call_id += 1
+
+        timer = Timer(start_now=True)
+        if self.pickle_calls:
+            payload = (func, pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+            func = self.process_pickled_call
+            self.payload_bytes += len(payload[1])
+
+        # The callback must not hold on to the pool, calls that were given up on can finish
+        # (and drop the last reference to it) in a worker thread or never
+        completed_calls = self.completed_calls
+        handle = self.pool.submit(
+            func, payload, callback=lambda: completed_calls.put(call_id)
+        )
+        self.dispatch_runtime += timer.get_duration()
+        self.in_flight[call_id] = (handle, tasks)
+        self.in_flight_tasks += task_count
+
+    def receive_result(self, timeout: float = None):
+        """
+        Block until the next dispatched call finishes and buffer the results of its tasks
+        that succeeded. Waits up to the given timeout instead of the pool's, if one is given.
+        The tasks that failed are sent again or given up on, see fail_task, so a call can
+        finish without results.
+        """
+        wait_timeout = self.timeout if timeout is None else timeout
+        wait_deadline = None if wait_timeout is None else Timer.now() + wait_timeout
+
+        # Without results for a while, check the workers for hung or lost tasks
+        while True:
+            poll_timeout = wait_timeout
+            if self.activity is not None:
+                poll_timeout = WATCHDOG_INTERVAL
+                if wait_deadline is not None:
+                    poll_timeout = min(
+                        poll_timeout, max(wait_deadline - Timer.now(), 0)
+                    )
+
+            try:
+                call_id = self.completed_calls.get(timeout=poll_timeout)
+            except queue.Empty:
+                if self.activity is not None and self.check_workers():
+                    return
+                if wait_deadline is not None and Timer.now() >= wait_deadline:
+                    raise TimeoutError
+                continue
+
+            # Calls that were given up on can still finish, e.g. on an abandoned thread
+            if call_id in self.in_flight:
+                break
+
+        handle, tasks = self.in_flight.pop(call_id)
+        self.in_flight_tasks -= len(tasks)
+
+        try:
+            result = handle.get(self.timeout)
+        except Exception as e:
+            # The whole call failed, e.g. its worker died and broke the executor, which
+            # loses the other calls on it as well
+            error = f"{type(e).__name__}: {e}"
+            if isinstance(e, BrokenExecutor) and self.backend == BACKEND_PROCESS:
+                # Put the call back, all calls are sent again and only the tasks of the
+                # workers that died use up a retry
+                self.in_flight[call_id] = (handle, tasks)
+                self.in_flight_tasks += len(tasks)
+                self.check_workers(broken_call=call_id, error=error)
+                return
+            if isinstance(e, BrokenExecutor):
+                self.restart_workers()
+                self.requeue_calls(list(self.in_flight), {})
+            for task in tasks:
+                self.fail_task(task, error)
+            return
+
+        if not isinstance(result, list):
+            result = [result]
+        if self.backend == BACKEND_DISTRIBUTED:
+            self.network_runtime += handle.network_runtime
+
+        receive_time = self.stats_timer.get_duration()
+        self.last_receive_time = Timer.now()
+        if self.first_result_runtime is None:
+            self.first_result_runtime = receive_time
+
+        tasks_by_index = {task.index: task for task in tasks}
+        for index, value, runtime, queue_wait, cpu_time in result:
+            if isinstance(value, TaskError):
+                self.fail_task(tasks_by_index[index], value.message)
+                continue
+            if isinstance(value, ProfiledResult):
+                self.task_profiles.add(value.task_type, value.pid, value.data)
+                value = value.value
+
+            self.head_of_line.receive(index, receive_time)
+            self.task_samples.add(index, runtime, queue_wait, cpu_time)
+            self.received_results.append(
+                (index, self.shared_arrays.read_result(value), runtime)
+            )
+
+    def check_workers(self, broken_call: int = None, error: str = None) -> bool:
+        """
+        Kill the workers of tasks past their deadline and find the workers that died. The
+        tasks of their calls are sent again, only the task that timed out or was running on
+        a dead worker counts as failed. Thread workers can't be killed, so a thread with a
+        timed out task is abandoned and the call's results are ignored once it finishes.
+
+        Args:
+            broken_call (int, optional): The call that failed because its executor broke. Its
+                tasks fail with the given error if no dead worker was running a task.
+            error (str, optional): The error of the broken call.
+
+        Returns:
+            bool: Whether a call was given up on.
+        """
+        task_timeout = self.fault_policy.task_timeout
+        now = Timer.now()
+        faults: dict[int, str] = {}
+        restart = broken_call is not None
+
+        for slot, pid, index, start_time in self.activity.get_workers():
+            timed_out = (
+                index != NO_TASK
+                and task_timeout is not None
+                and now - start_time > task_timeout
+            )
+            if not timed_out:
+                continue
+            self.timed_out_tasks += 1
+            faults[index] = f"Timed out after {task_timeout}s"
+            if self.backend == BACKEND_THREAD:
+                self.activity.end_task(slot)
+                continue
+            kill_process(pid)
+            self.activity.free_slot(slot)
+            restart = restart or self.backend == BACKEND_PROCESS
+
+        # A multiprocessing.Pool replaces its dead workers. An executor breaks and
+        # terminates the others, which only its exit codes tell apart from the workers that
+        # died.
+        if self.backend == BACKEND_PROCESS:
+            restart = restart or any(
+                not is_process_alive(pid)
+                for _, pid, _, _ in self.activity.get_workers()
+            )
+            if restart:
+                self.pool.shutdown()
+                self.free_dead_workers(faults, self.pool.exit_codes)
+        elif self.backend != BACKEND_THREAD:
+            self.free_dead_workers(faults)
+
+        if broken_call is not None and len(faults) == 0:
+            for task in self.in_flight[broken_call][1]:
+                faults[task.index] = error
+
+        if restart:
+            self.pool = self.create_workers()
+            faulted_calls = list(self.in_flight)
+        else:
+            faulted_calls = [
+                call_id
+                for call_id, (_, tasks) in self.in_flight.items()
+                if any(task.index in faults for task in tasks)
+            ]
+
+        self.requeue_calls(faulted_calls, faults)
+        return len(faulted_calls) > 0
+
+    def free_dead_workers(
+        self, faults: dict[int, str], exit_codes: dict[int, int] = None
+    ):
+        """
+        Free the slots of the workers that died, each is one lost worker. The task a dead
+        worker was running is added to the faults. Workers that exited with SIGTERM by the
+        given exit codes were terminated by a broken executor instead.
+        """
+        exit_codes = exit_codes or {}
+        for slot, pid, index, _ in self.activity.get_workers():
+            if is_process_alive(pid):
+                continue
+            if exit_codes.get(pid) == -signal.SIGTERM:
+                self.activity.free_slot(slot)
+                continue
+            self.lost_workers += 1
+            if index != NO_TASK:
+                faults[index] = "Worker died"
+            self.activity.free_slot(slot)
+
+    def requeue_calls(self, call_ids: list[int], faults: dict[int, str]):
+        """
+        Give up on the given calls and send their tasks again. Only the tasks with a fault
+        use up a retry, the others were just unlucky to share a call or executor with them.
+        """
+        for call_id in call_ids:
+            if call_id not in self.in_flight:
+                continue
+            _, tasks = self.in_flight.pop(call_id)
+            self.in_flight_tasks -= len(tasks)
+            for task in tasks:
+                if task.index in faults:
+                    self.fail_task(task, faults[task.index])
+                else:
+                    self.dispatch_batch([task])
+
+    def restart_workers(self):
+        """
+        Replace a broken executor, the calls still in flight on it are lost.
+        """
+        self.pool.shutdown()
+        self.pool = self.create_workers()
+
+    def fail_task(self, task: Union[IndexedTask, TaskRef], error: str):
+        """
+        Send a failed task again, or give up on it once it is out of retries.
+        """
+        self.last_error = error
+        attempts = self.task_attempts.get(task.index, 0)
+        if attempts < self.fault_policy.max_retries:
+            self.task_attempts[task.index] = attempts + 1
+            self.retried_tasks += 1
+            self.dispatch_batch([task])
+            return
+
+        self.failed_tasks += 1
+        self.head_of_line.receive(task.index, self.stats_timer.get_duration())
+
+    def iter_results(self) -> Iterator[tuple[int, Any, float]]:
+        """
+        Yield the index, result and runtime of every added task in completion order.
+        """
+        self.flush_tasks()
+
+        while (
+            len(self.received_results) > 0
+            or len(self.in_flight) > 0
+            or len(self.steal_queue) > 0
+        ):
+            if len(self.received_results) == 0:
+                self.receive_result()
+                self.feed_workers()
+                continue
+            yield self.received_results.popleft()
+
+    def poll_results(self, timeout: float = None) -> list[tuple[int, Any, float]]:
+        """
+        Wait up to timeout for the next dispatched call to finish, without waiting for all of
+        them, and return the index, result and runtime of all results received so far. With
+        no call in flight it sleeps for the timeout instead, e.g. until the next arrival of an
+        open loop test.
+        """
+        if len(self.received_results) == 0 and len(self.in_flight) > 0:
+            try:
+                self.receive_result(timeout)
+            except TimeoutError:
+                pass
+        elif len(self.received_results) == 0 and timeout is not None:
+            time.sleep(timeout)
+
+        # Take the results of all calls that finished in the meantime as well
+        while not self.completed_calls.empty():
+            try:
+                self.receive_result(0)
+            except TimeoutError:
+                break
+
+        results = list(self.received_results)
+        self.received_results.clear()
         return results
 
+    def get_makespan(self) -> float:
+        """
+        The time from adding the first task to receiving the last result.
+        """
+        if self.first_submit_time is None or self.last_receive_time is None:
+            return 0
+        return self.last_receive_time - self.first_submit_time
+
+    def get_dispatch_metrics(self) -> dict[str, float]:
+        """
+        The time the main process spent preparing and sending every task, and for process
+        workers the pickled size of every task in bytes. For agents also the time every task
+        spent on the network, see easy_pool.distributed.
+        """
+        if self.added_tasks == 0:
+            return {}
+
+        metrics = {"dispatch_runtime": self.dispatch_runtime / self.added_tasks}
+        if self.pickle_calls:
+            metrics["payload_bytes"] = self.payload_bytes / self.added_tasks
+        if self.backend == BACKEND_DISTRIBUTED:
+            metrics["network_runtime"] = self.network_runtime / self.added_tasks
+        return metrics
+
+    def get_fault_metrics(self) -> dict[str, float]:
+        """
+        How many tasks failed for good, were retried or timed out, and how many workers were
+        lost.
+        """
+        return {
+            "failed_tasks": self.failed_tasks,
+            "retried_tasks": self.retried_tasks,
+            "timed_out_tasks": self.timed_out_tasks,
+            "lost_workers": self.lost_workers,
+        }
+
+    def get_results(self) -> list[tuple[int, Any, float]]:
+        results = list(self.iter_results())
+        results.sort(key=lambda x: x[0])
+        return results
+
+    def apply_thread_limits(self):
+        """
+        Limit the library threads of the main process, which thread workers share, until
+        restore_thread_limits. Pipelines do so around every test pass instead of for the
+        lifetime of the pool, so that the limit of a persistent pool doesn't carry over into
+        the runners of other thread policies. Does nothing for other backends.
+        """
+        self.thread_limits.apply()
+
+    def restore_thread_limits(self):
+        self.thread_limits.restore()
+
     def shutdown(self):
         if hasattr(self, "pool") is False or self.pool is None:
             return
 
-        self.pool.terminate()
+        self.pool.shutdown()
         del self.pool
 
+        self.close_registry()
+        self.shared_arrays.close()
+        self.thread_limits.restore()
+
     def __del__(self):
         self.shutdown()
+
+
+class HeadOfLineTracker:
+    """
+    Measures how long results wait behind earlier, slower tasks when they are collected in
+    submission order instead of completion order.
+
+    A result collected in order is delivered once it and all the results submitted before it
+    have arrived. Only the results that arrived out of order are kept track of, so the memory
+    use is bounded by how far out of order the tasks complete.
+    """
+
+    def __init__(self):
+        self.submitted = 0
+        self.next_position = 0
+        self.positions: dict[int, int] = {}
+        self.waiting: dict[int, float] = {}
+        self.total_delay = 0.0
+        self.delivered = 0
+
+    def submit(self, index: int):
+        self.positions[index] = self.submitted
+        self.submitted += 1
+
+    def receive(self, index: int, receive_time: float):
+        self.waiting[self.positions.pop(index)] = receive_time
+
+        while self.next_position in self.waiting:
+            self.total_delay += receive_time - self.waiting.pop(self.next_position)
+            self.delivered += 1
+            self.next_position += 1
+
+    def get_avg_delay(self) -> float:
+        if self.delivered == 0:
+            return 0
+        return self.total_delay / self.delivered
+
+
+def apply_retention(result: Any, retention: str) -> Any:
+    if retention == RETENTION_DISCARD:
+        return None
+    if retention == RETENTION_DIGEST:
+        return digest_result(result)
+    return result
+
+
+def digest_result(value: Any) -> int:
+    """
+    Calculate a CRC32 checksum of a task result.
+    """
+    if isinstance(value, np.ndarray):
+        return zlib.crc32(np.ascontiguousarray(value).data)
+
+    if isinstance(value, (list, tuple)):
+        checksum = 0
+        for item in value:
+            checksum = zlib.crc32(digest_result(item).to_bytes(4, "little"), checksum)
+        return checksum
+
+    return zlib.crc32(repr(value).encode())
+
+
+def init_worker(
+    warm_modules: list[str],
+    barrier: Barrier,
+    cpu_clock: str = CPU_CLOCK_PROCESS,
+    thread_limit: int = None,
+    placement_slots: PlacementSlots = None,
+    start_time: float = None,
+    activity: WorkerActivity = None,
+):
+    global warm_up_barrier, worker_cpu_clock, worker_activity
+    init_time = Timer.now()
+    warm_up_barrier = barrier
+    worker_cpu_clock = cpu_clock
+
+    # Pin before the thread pools of the libraries start, so their threads inherit it
+    if placement_slots is not None:
+        # Thread workers share the process, every thread is pinned on its own
+        if cpu_clock == CPU_CLOCK_PROCESS:
+            placement_slot = placement_slots.claim_slot(os.getpid())
+        else:
+            placement_slot = placement_slots.claim_slot(threading.get_native_id())
+
+        if placement_slot is not None:
+            # Free the slot when a worker process exits, for the worker that replaces it
+            if cpu_clock == CPU_CLOCK_PROCESS:
+                Finalize(
+                    None,
+                    placement_slots.free_slot,
+                    args=(placement_slot,),
+                    exitpriority=0,
+                )
+            cpus = placement_slots.worker_cpus[placement_slot]
+            if cpus is not None:
+                os.sched_setaffinity(0, cpus)
+
+    limit_worker_threads(thread_limit)
+
+    if activity is not None:
+        worker_activity = activity
+        worker_activity_slot.slot = activity.claim_slot()
+        # Free the slot when a worker process exits, e.g. replaced after its max tasks
+        if worker_activity_slot.slot is not None and cpu_clock == CPU_CLOCK_PROCESS:
+            Finalize(
+                None,
+                activity.free_slot,
+                args=(worker_activity_slot.slot,),
+                exitpriority=0,
+            )
+
+    worker_startup.profile = WorkerStartup(
+        os.getpid(),
+        init_time - start_time if start_time is not None else float("nan"),
+        import_modules(warm_modules),
+    )
+
+
+def warm_up_task(timeout: float = None, start_time: float = None) -> WorkerStartup:
+    startup = getattr(worker_startup, "profile", None) or WorkerStartup(
+        os.getpid(), float("nan")
+    )
+    if start_time is not None:
+        startup.first_task_latency = Timer.now() - start_time
+
+    if warm_up_barrier is not None:
+        warm_up_barrier.wait(timeout)
+    return startup
+
+
+def release_result_buffers_task(timeout: float = None):
+    release_result_buffers()
+
+    if warm_up_barrier is not None:
+        warm_up_barrier.wait(timeout)
+
+
+def resolve_chunksize(
+    chunksize: Union[int, str], task_count: int, pool_size: int
+) -> int:
+    """
+    Resolve a configured chunk size into the number of tasks to send per batch.
+
+    "auto" uses the same heuristic as multiprocessing.Pool.map: split the tasks into roughly
+    four batches per worker, so that the load stays balanced while the call count stays low.
+    """
+    if chunksize != CHUNKSIZE_AUTO:
+        return chunksize
+
+    if task_count == 0 or pool_size == 0:
+        return 1
+
+    chunksize, extra = divmod(task_count, pool_size * 4)
+    if extra:
+        chunksize += 1
+
+    return max(chunksize, 1)
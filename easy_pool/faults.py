@@ -0,0 +1,119 @@
+import os
+import signal
+from multiprocessing import Lock
+from multiprocessing.sharedctypes import RawArray
+from typing import NamedTuple
+
+from util.timer import Timer
+
+# How often the main process checks the workers for tasks past their deadline and for
+# workers that died while it waits for results
+WATCHDOG_INTERVAL = 0.1
+
+# Slots for every worker of a pool and as many replacements that start before the slots
+# of the workers they replace are freed
+ACTIVITY_SLOTS_PER_WORKER = 2
+
+# The task of an idle worker slot
+NO_TASK = -1
+
+
+class FaultPolicy(NamedTuple):
+    """
+    How a pool deals with tasks that fail, hang or are lost with their worker.
+
+    Args:
+        task_timeout (float, optional): The deadline of every task in seconds from its start.
+                                        The worker of a task past it is killed and replaced,
+                                        thread workers can only be abandoned.
+        max_retries (int, optional): How often a failed, timed out or lost task is run again
+                                     before it counts as failed.
+        max_tasks_per_child (int, optional): How many tasks a worker process of the pool
+                                             backend runs before it is replaced by a new one,
+                                             to limit memory growth.
+    """
+
+    task_timeout: float = None
+    max_retries: int = 0
+    max_tasks_per_child: int = None
+
+
+class TaskError:
+    """
+    The result of a task that raised an exception, which is sent back instead of the
+    exception itself, so the other tasks of its batch still return their results.
+    """
+
+    def __init__(self, error: BaseException):
+        self.message = f"{type(error).__name__}: {error}"
+
+    def __repr__(self) -> str:
+        return f"TaskError({self.message})"
+
+
+class WorkerActivity:
+    """
+    Shared slots in which every worker publishes its process id and the index and start time
+    of the task it is running, so the main process can tell which task a hung or dead worker
+    had. Workers claim a slot when they start and free it when they exit, the slots of
+    workers that were killed are freed by the main process.
+    """
+
+    def __init__(self, capacity: int):
+        self.lock = Lock()
+        self.pids = RawArray("q", capacity)
+        self.tasks = RawArray("q", [NO_TASK] * capacity)
+        self.start_times = RawArray("d", capacity)
+
+    def claim_slot(self) -> int:
+        """
+        Returns:
+            int: The claimed slot, None if all slots are taken.
+        """
+        with self.lock:
+            for slot in range(len(self.pids)):
+                if self.pids[slot] == 0:
+                    self.pids[slot] = os.getpid()
+                    self.tasks[slot] = NO_TASK
+                    return slot
+        return None
+
+    def free_slot(self, slot: int):
+        with self.lock:
+            self.tasks[slot] = NO_TASK
+            self.pids[slot] = 0
+
+    def start_task(self, slot: int, index: int):
+        self.start_times[slot] = Timer.now()
+        self.tasks[slot] = index
+
+    def end_task(self, slot: int):
+        self.tasks[slot] = NO_TASK
+
+    def get_workers(self) -> list[tuple[int, int, int, float]]:
+        """
+        The slot, process id, running task (NO_TASK when idle) and task start time of every
+        worker.
+        """
+        return [
+            (slot, self.pids[slot], self.tasks[slot], self.start_times[slot])
+            for slot in range(len(self.pids))
+            if self.pids[slot] != 0
+        ]
+
+
+def is_process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def kill_process(pid: int):
+    try:
+        os.kill(pid, signal.SIGKILL if hasattr(signal, "SIGKILL") else signal.SIGTERM)
+    except ProcessLookupError:
+        pass
@@ -0,0 +1,177 @@
+import os
+from multiprocessing import Lock
+from multiprocessing.sharedctypes import RawArray
+from typing import Optional
+
+from easy_pool.faults import is_process_alive
+
+NODE_DIR = "/sys/devices/system/node"
+
+# Which CPUs every worker is pinned to:
+# - "none": no pinning, the OS places the workers
+# - "compact": consecutive CPUs, filling one NUMA node before the next
+# - "scatter": round-robin across the NUMA nodes, spreading the workers over all sockets
+# - "numa": every worker may run on all CPUs of one NUMA node, the nodes are assigned
+#   round-robin, so its memory is allocated on that node
+# Compact and scatter pin every worker to as many CPUs as its thread limit allows, or to a
+# single CPU without a limit.
+PLACEMENT_NONE = "none"
+PLACEMENT_COMPACT = "compact"
+PLACEMENT_SCATTER = "scatter"
+PLACEMENT_NUMA = "numa"
+PLACEMENTS = [PLACEMENT_NONE, PLACEMENT_COMPACT, PLACEMENT_SCATTER, PLACEMENT_NUMA]
+
+
+def is_placement_supported() -> bool:
+    """
+    Pinning needs os.sched_setaffinity, which is only available on Linux.
+    """
+    return hasattr(os, "sched_setaffinity")
+
+
+def parse_cpu_list(cpu_list: str) -> list[int]:
+    """
+    Parse a sysfs CPU list like "0-3,8-11" into the CPU numbers.
+    """
+    cpus = []
+    for part in cpu_list.strip().split(","):
+        if part == "":
+            continue
+        if "-" in part:
+            start, stop = part.split("-")
+            cpus.extend(range(int(start), int(stop) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def format_cpu_list(cpus: list[int]) -> str:
+    """
+    Format CPU numbers as a CPU list like "0-3,8-11".
+    """
+    ranges = []
+    for cpu in sorted(cpus):
+        if len(ranges) > 0 and ranges[-1][1] == cpu - 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(
+        [str(start) if start == stop else f"{start}-{stop}" for start, stop in ranges]
+    )
+
+
+def get_numa_nodes() -> list[list[int]]:
+    """
+    Get the CPUs of every NUMA node this process may run on. Without NUMA information all
+    allowed CPUs make up a single node.
+    """
+    allowed = set(os.sched_getaffinity(0))
+
+    nodes = []
+    if os.path.isdir(NODE_DIR):
+        node_names = [
+            name
+            for name in os.listdir(NODE_DIR)
+            if name.startswith("node") and name[4:].isdigit()
+        ]
+        for name in sorted(node_names, key=lambda x: int(x[4:])):
+            try:
+                with open(os.path.join(NODE_DIR, name, "cpulist"), "r") as file:
+                    cpus = [
+                        cpu for cpu in parse_cpu_list(file.read()) if cpu in allowed
+                    ]
+            except OSError:
+                continue
+            if len(cpus) > 0:
+                nodes.append(cpus)
+
+    if len(nodes) == 0:
+        nodes = [sorted(allowed)]
+
+    return nodes
+
+
+def get_worker_cpus(
+    placement: str, pool_size: int, cpus_per_worker: int = 1
+) -> list[Optional[list[int]]]:
+    """
+    Get the CPUs every worker is pinned to, None for workers that are not pinned. Workers
+    wrap around to the first CPUs when there are more of them than CPUs.
+    """
+    if placement == PLACEMENT_NONE or not is_placement_supported():
+        return [None for _ in range(pool_size)]
+
+    nodes = get_numa_nodes()
+    cpus_per_worker = max(cpus_per_worker, 1)
+
+    if placement == PLACEMENT_NUMA:
+        return [nodes[index % len(nodes)] for index in range(pool_size)]
+
+    if placement == PLACEMENT_COMPACT:
+        cpus = [cpu for node in nodes for cpu in node]
+        return [
+            [
+                cpus[(index * cpus_per_worker + offset) % len(cpus)]
+                for offset in range(min(cpus_per_worker, len(cpus)))
+            ]
+            for index in range(pool_size)
+        ]
+
+    worker_cpus = []
+    for index in range(pool_size):
+        node = nodes[index % len(nodes)]
+        start = (index // len(nodes)) * cpus_per_worker
+        worker_cpus.append(
+            [
+                node[(start + offset) % len(node)]
+                for offset in range(min(cpus_per_worker, len(node)))
+            ]
+        )
+    return worker_cpus
+
+
+class PlacementSlots:
+    """
+    Shared slots that hand the CPUs of every worker of a pool out to the workers as they
+    start. A worker claims a free slot and frees it when it exits, so a worker that replaces
+    another one, e.g. after its max tasks or a crash, takes over the CPUs of the worker it
+    replaces instead of those of a worker that is still running. Workers that died without
+    freeing their slot, e.g. when they were killed, have it taken over as well.
+    """
+
+    def __init__(self, worker_cpus: list[Optional[list[int]]]):
+        self.worker_cpus = worker_cpus
+        self.lock = Lock()
+        # The process (or thread) id of the worker of every slot, 0 for a free slot
+        self.owners = RawArray("q", len(worker_cpus))
+
+    def claim_slot(self, owner: int) -> Optional[int]:
+        """
+        Returns:
+            int: The claimed slot, None if the workers of all slots are still running.
+        """
+        with self.lock:
+            for slot in range(len(self.owners)):
+                if self.owners[slot] == 0:
+                    self.owners[slot] = owner
+                    return slot
+            for slot in range(len(self.owners)):
+                if not is_process_alive(self.owners[slot]):
+                    self.owners[slot] = owner
+                    return slot
+        return None
+
+    def free_slot(self, slot: int):
+        with self.lock:
+            self.owners[slot] = 0
+
+
+def format_worker_cpus(worker_cpus: list[Optional[list[int]]]) -> str:
+    """
+    Describe the CPUs of every worker, separated by spaces, e.g. "0 2 1 3".
+    """
+    if all(cpus is None for cpus in worker_cpus):
+        return ""
+    return " ".join(
+        [format_cpu_list(cpus) if cpus is not None else "*" for cpus in worker_cpus]
+    )
@@ -0,0 +1,130 @@
+import itertools
+import os
+import pickle
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, NamedTuple, Optional
+
+# How a task is sent to a worker:
+# - "inline": its function and argument list are pickled with every task
+# - "registry": the functions and argument lists of all tasks are stored once in a task
+#   table, which every worker loads once, and a task only carries the small integer ids of
+#   its function and arguments, see TaskRegistry
+TASK_PAYLOAD_INLINE = "inline"
+TASK_PAYLOAD_REGISTRY = "registry"
+TASK_PAYLOADS = [TASK_PAYLOAD_INLINE, TASK_PAYLOAD_REGISTRY]
+
+# The functions and argument lists of a task table
+TaskTable = tuple[list[Callable], list[list]]
+
+# Worker side state: the task table of the current test pass, by name. Thread workers share
+# the main process, which stores the table here directly.
+worker_tables: dict[str, TaskTable] = {}
+
+table_counter = itertools.count()
+
+
+class TaskRef(NamedTuple):
+    """
+    A task of a registered task list: the ids of its function and argument list in the task
+    table. A named tuple pickles as little more than its values.
+    """
+
+    index: int
+    type_id: int
+    arg_ref: int
+    submit_time: float = None
+    seed: int = None
+    cost: float = None
+
+
+class TaskTableHandle(NamedTuple):
+    """
+    Where a worker finds a task table: the shared memory segment it was pickled into, and its
+    size. Tables of thread workers are not pickled and have a size of 0.
+    """
+
+    name: str
+    size: int = 0
+
+
+class TaskRegistry:
+    """
+    Stores every distinct task function and argument list of a task list once. Functions are
+    told apart by equality and argument lists by identity, so a task list that repeats the
+    same arguments (like get_task_list) has a single entry, and a large argument shared by
+    several argument lists (like the image of the img tasks) is pickled once with the table.
+
+    Registered tasks are called with their index appended to the arguments, like the test
+    pipelines call the tasks.
+    """
+
+    def __init__(self, tasks: list[tuple[Callable, list]]):
+        self.funcs: list[Callable] = []
+        self.args: list[list] = []
+        self.refs: list[tuple[int, int]] = []
+
+        func_ids: dict[Callable, int] = {}
+        arg_ids: dict[int, int] = {}
+        for task_func, task_args in tasks:
+            if task_func not in func_ids:
+                func_ids[task_func] = len(self.funcs)
+                self.funcs.append(task_func)
+            if id(task_args) not in arg_ids:
+                arg_ids[id(task_args)] = len(self.args)
+                self.args.append(task_args)
+            self.refs.append((func_ids[task_func], arg_ids[id(task_args)]))
+
+    def get_ref(self, index: int) -> tuple[int, int]:
+        """
+        The ids of the function and argument list of the task at the given index.
+        """
+        return self.refs[index]
+
+
+def publish_task_table(
+    table: TaskTable, in_process: bool = False
+) -> tuple[TaskTableHandle, Optional[SharedMemory]]:
+    """
+    Make a task table available to the workers: pickled into a shared memory segment once, or
+    for workers that share this process, stored in worker_tables as is.
+
+    Returns:
+        A tuple of the handle the workers find the table by and the segment, None in process.
+    """
+    if in_process:
+        handle = TaskTableHandle(f"task_table_{os.getpid()}_{next(table_counter)}")
+        worker_tables[handle.name] = table
+        return handle, None
+
+    data = pickle.dumps(table, protocol=pickle.HIGHEST_PROTOCOL)
+    segment = SharedMemory(create=True, size=max(len(data), 1))
+    segment.buf[: len(data)] = data
+    return TaskTableHandle(segment.name, len(data)), segment
+
+
+def load_task_table(handle: TaskTableHandle) -> TaskTable:
+    """
+    Get a task table in a worker, loading it from its segment on first use. Only the table
+    of the current test pass is kept.
+    """
+    if handle.name not in worker_tables:
+        segment = SharedMemory(name=handle.name)
+        try:
+            data = bytes(segment.buf[: handle.size])
+        finally:
+            segment.close()
+
+        worker_tables.clear()
+        worker_tables[handle.name] = pickle.loads(data)
+
+    return worker_tables[handle.name]
+
+
+def unpublish_task_table(handle: TaskTableHandle, segment: Optional[SharedMemory]):
+    worker_tables.pop(handle.name, None)
+    if segment is not None:
+        segment.close()
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,67 @@
+from collections import deque
+from typing import Any
+
+# In which order and how the tasks are handed to the workers:
+# - "fifo": in the order they were added, the batches are dispatched right away
+# - "longest_first": all tasks are buffered and dispatched by descending estimated cost, so
+#   the big tasks start early and the small ones fill the gaps at the end
+# - "work_stealing": the tasks are kept by descending cost in the main process, and a worker
+#   only gets the next batch once it is idle. Batches shrink as the remaining work does.
+SCHEDULE_FIFO = "fifo"
+SCHEDULE_LONGEST_FIRST = "longest_first"
+SCHEDULE_WORK_STEALING = "work_stealing"
+SCHEDULES = [SCHEDULE_FIFO, SCHEDULE_LONGEST_FIRST, SCHEDULE_WORK_STEALING]
+
+# Work stealing batches hold at most this share of the remaining cost per worker, smaller
+# values balance the tail better at the cost of more calls
+GUIDED_BATCH_FACTOR = 2
+
+
+def get_task_cost(task: Any) -> float:
+    """
+    The estimated cost of a task, tasks without an estimate count as one unit.
+    """
+    if task.cost is None:
+        return 1.0
+    return task.cost
+
+
+def sort_longest_first(tasks: list) -> list:
+    """
+    Sort tasks by descending estimated cost, tasks of the same cost keep their order.
+    """
+    return sorted(tasks, key=get_task_cost, reverse=True)
+
+
+class StealQueue:
+    """
+    The tasks of the work stealing schedule, held back in the main process until a worker is
+    idle. Like guided self-scheduling, every batch takes the next tasks until it has at least
+    the remaining cost divided by GUIDED_BATCH_FACTOR times the worker count, so expensive
+    tasks are sent alone and cheap ones are bundled as the queue drains.
+    """
+
+    def __init__(self):
+        self.tasks: deque = deque()
+        self.remaining_cost = 0.0
+
+    def extend(self, tasks: list):
+        for task in tasks:
+            self.tasks.append(task)
+            self.remaining_cost += get_task_cost(task)
+
+    def take_batch(self, pool_size: int) -> list:
+        target_cost = self.remaining_cost / (GUIDED_BATCH_FACTOR * max(pool_size, 1))
+
+        batch = []
+        batch_cost = 0.0
+        while len(self.tasks) > 0 and (len(batch) == 0 or batch_cost < target_cost):
+            task = self.tasks.popleft()
+            batch.append(task)
+            batch_cost += get_task_cost(task)
+
+        self.remaining_cost = max(self.remaining_cost - batch_cost, 0.0)
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.tasks)
@@ -0,0 +1,244 @@
+import threading
+from dataclasses import dataclass
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Optional
+
+import numpy as np
+
+
+TRANSPORT_PICKLE = "pickle"
+TRANSPORT_SHARED_MEMORY = "shared_memory"
+TRANSPORTS = [TRANSPORT_PICKLE, TRANSPORT_SHARED_MEMORY]
+
+# Arrays smaller than this are cheaper to pickle than to map
+SHARED_MEMORY_MIN_BYTES = 64 * 1024
+
+# Result buffers start with a header holding the lease flag. It is sized to keep
+# the array data that follows it aligned.
+RESULT_HEADER_BYTES = 64
+BUFFER_FREE = 0
+BUFFER_LEASED = 1
+
+# Result buffers stay leased until the parent has read them, and every array of a batch of
+# results needs its own. Past this many buffers per worker, results are pickled instead, so
+# large batches can't fill /dev/shm.
+MAX_RESULT_BUFFERS = 4
+
+# Worker side state, one copy per worker process. Shared by all workers of the
+# thread backend, hence the lock.
+attached_segments: dict[str, SharedMemory] = {}
+result_buffers: list[SharedMemory] = []
+result_buffers_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class SharedArrayHandle:
+    """
+    A lightweight, picklable reference to a numpy array that lives in shared memory.
+
+    Result buffers carry a lease flag in their header: the worker sets it when it writes a
+    result and the reader clears it once the data has been copied out, after which the
+    worker is free to reuse the buffer for a later task.
+    """
+
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+    offset: int = 0
+    leased: bool = False
+
+    def to_ndarray(self, segment: SharedMemory) -> np.ndarray:
+        return np.ndarray(
+            self.shape, dtype=self.dtype, buffer=segment.buf, offset=self.offset
+        )
+
+
+def is_shareable(value: Any) -> bool:
+    return isinstance(value, np.ndarray) and value.nbytes >= SHARED_MEMORY_MIN_BYTES
+
+
+class SharedArrayStore:
+    """
+    The parent side of the shared memory transport.
+
+    Places large task arguments into shared memory once and swaps them for handles, and
+    reads results back out of the workers' result buffers. All segments that passed through
+    the store are unlinked when it is closed.
+    """
+
+    def __init__(self):
+        # Make sure the workers share the parent's resource tracker, so segments they
+        # create are not unlinked behind our back when a worker exits.
+        resource_tracker.ensure_running()
+
+        self.arrays: dict[int, tuple[np.ndarray, SharedArrayHandle]] = {}
+        self.segments: dict[str, SharedMemory] = {}
+        # The names of the workers' result buffers among the segments
+        self.result_buffer_names: set[str] = set()
+
+    def put(self, array: np.ndarray) -> SharedArrayHandle:
+        # The array is kept referenced, so its id can not be reused while it is cached
+        if id(array) in self.arrays:
+            return self.arrays[id(array)][1]
+
+        segment = SharedMemory(create=True, size=array.nbytes)
+        handle = SharedArrayHandle(segment.name, array.shape, array.dtype.str)
+        handle.to_ndarray(segment)[...] = array
+
+        self.segments[segment.name] = segment
+        self.arrays[id(array)] = (array, handle)
+        return handle
+
+    def share_args(self, args: list) -> list:
+        return [self.share_value(arg) for arg in args]
+
+    def share_value(self, value: Any) -> Any:
+        if is_shareable(value):
+            return self.put(value)
+
+        if isinstance(value, list):
+            return [self.share_value(item) for item in value]
+
+        return value
+
+    def read_result(self, value: Any) -> Any:
+        if isinstance(value, SharedArrayHandle):
+            segment = self.attach(value.name)
+            array = value.to_ndarray(segment).copy()
+            if value.leased:
+                self.result_buffer_names.add(value.name)
+                segment.buf[0] = BUFFER_FREE
+            return array
+
+        if isinstance(value, list):
+            return [self.read_result(item) for item in value]
+
+        return value
+
+    def attach(self, name: str) -> SharedMemory:
+        if name not in self.segments:
+            self.segments[name] = SharedMemory(name=name)
+        return self.segments[name]
+
+    def detach_result_buffers(self):
+        """
+        Close the parent's mappings of the workers' result buffers, e.g. once the workers
+        freed their idle buffers, see release_result_buffers. The workers unlink them.
+        """
+        for name in self.result_buffer_names:
+            self.segments.pop(name).close()
+        self.result_buffer_names = set()
+
+    def close(self):
+        for segment in self.segments.values():
+            segment.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+
+        self.segments = {}
+        self.arrays = {}
+        self.result_buffer_names = set()
+
+
+def resolve_shared_args(args: list) -> list:
+    """
+    Swap shared array handles in task arguments for arrays backed by the shared segments.
+    Runs in the worker, segments stay attached for the lifetime of the worker.
+    """
+    return [resolve_shared_value(arg) for arg in args]
+
+
+def resolve_shared_value(value: Any) -> Any:
+    if isinstance(value, SharedArrayHandle):
+        if value.name not in attached_segments:
+            attached_segments[value.name] = SharedMemory(name=value.name)
+
+        array = value.to_ndarray(attached_segments[value.name])
+        # Shared between all tasks, so it must not be modified in place
+        array.flags.writeable = False
+        return array
+
+    if isinstance(value, list):
+        return [resolve_shared_value(item) for item in value]
+
+    return value
+
+
+def share_result(value: Any) -> Any:
+    """
+    Write large arrays in a task result into a free result buffer of this worker and
+    swap them for handles, or leave them to be pickled if the worker has no buffer left.
+    Runs in the worker.
+    """
+    if is_shareable(value):
+        segment = get_result_buffer(value.nbytes)
+        if segment is None:
+            return value
+
+        handle = SharedArrayHandle(
+            segment.name,
+            value.shape,
+            value.dtype.str,
+            offset=RESULT_HEADER_BYTES,
+            leased=True,
+        )
+        handle.to_ndarray(segment)[...] = value
+        return handle
+
+    if isinstance(value, list):
+        return [share_result(item) for item in value]
+
+    return value
+
+
+def get_result_buffer(nbytes: int) -> Optional[SharedMemory]:
+    """
+    Lease the smallest free result buffer that fits, or create a new one. At
+    MAX_RESULT_BUFFERS, a free buffer that is too small is replaced, and None is returned if
+    all of them are leased.
+    """
+    with result_buffers_lock:
+        free_buffers = [
+            segment for segment in result_buffers if segment.buf[0] == BUFFER_FREE
+        ]
+        fitting_buffers = [
+            segment
+            for segment in free_buffers
+            if segment.size - RESULT_HEADER_BYTES >= nbytes
+        ]
+
+        if len(fitting_buffers) > 0:
+            segment = min(fitting_buffers, key=lambda x: x.size)
+        elif len(result_buffers) < MAX_RESULT_BUFFERS or len(free_buffers) > 0:
+            if len(result_buffers) >= MAX_RESULT_BUFFERS:
+                free_result_buffer(min(free_buffers, key=lambda x: x.size))
+            segment = SharedMemory(create=True, size=RESULT_HEADER_BYTES + nbytes)
+            result_buffers.append(segment)
+        else:
+            return None
+
+        segment.buf[0] = BUFFER_LEASED
+        return segment
+
+
+def release_result_buffers():
+    """
+    Free the result buffers of this worker that are not leased, e.g. between test passes.
+    Runs in the worker.
+    """
+    with result_buffers_lock:
+        for segment in list(result_buffers):
+            if segment.buf[0] == BUFFER_FREE:
+                free_result_buffer(segment)
+
+
+def free_result_buffer(segment: SharedMemory):
+    result_buffers.remove(segment)
+    segment.close()
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
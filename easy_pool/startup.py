@@ -0,0 +1,89 @@
+import importlib
+import multiprocessing
+import sys
+from dataclasses import dataclass, field
+
+from util.timer import Timer
+
+START_METHOD_FORKSERVER = "forkserver"
+
+# Modules every worker needs regardless of the task: the main module, which the
+# forkserver preloads by default, and the pool's own worker functions
+FORKSERVER_BASE_MODULES = ["__main__", "easy_pool.easy_pool"]
+
+
+@dataclass
+class WorkerStartup:
+    """
+    How long a worker took to start, in seconds from the moment its pool was created.
+    """
+
+    pid: int
+    # Until the worker's initializer ran
+    start_latency: float
+    # Import time of every task module the initializer imported
+    import_runtimes: dict[str, float] = field(default_factory=dict)
+    # Until the worker was ready for its first task
+    first_task_latency: float = None
+
+    def get_import_runtime(self) -> float:
+        return sum(self.import_runtimes.values())
+
+
+def preload_forkserver(modules: list[str]) -> bool:
+    """
+    Have the forkserver import the given modules once, so that every worker forked from it
+    starts with them loaded instead of importing them itself. Nothing else is preloaded,
+    so workers of a sum run never load e.g. OpenCV. Only takes effect with the forkserver
+    start method and before its first process is started.
+
+    Returns:
+        bool: Whether the modules will be preloaded.
+    """
+    if multiprocessing.get_start_method(allow_none=True) != START_METHOD_FORKSERVER:
+        return False
+
+    multiprocessing.set_forkserver_preload(
+        list(dict.fromkeys(FORKSERVER_BASE_MODULES + modules))
+    )
+    return True
+
+
+def import_modules(modules: list[str]) -> dict[str, float]:
+    """
+    Import the given modules.
+
+    Returns:
+        dict: The import runtime of every module, 0 for modules that were already loaded,
+              like those the forkserver preloaded or the parent had when it forked.
+    """
+    import_runtimes = {}
+    for module in modules:
+        if module in sys.modules:
+            import_runtimes[module] = 0.0
+            continue
+
+        timer = Timer(start_now=True)
+        importlib.import_module(module)
+        import_runtimes[module] = timer.get_duration()
+    return import_runtimes
+
+
+def print_startup_profile(startups: list[WorkerStartup]):
+    """
+    Print when every worker started, how long it spent importing each task module and when
+    it was ready for its first task.
+    """
+    print("Worker startup profile (seconds since pool creation):")
+    for startup in sorted(startups, key=lambda x: x.start_latency):
+        imports = ", ".join(
+            [
+                f"{module}={runtime:.4f}"
+                for module, runtime in startup.import_runtimes.items()
+            ]
+        )
+        print(
+            f"  Worker {startup.pid}: started {startup.start_latency:.4f}, "
+            f"imports {startup.get_import_runtime():.4f} ({imports or 'none'}), "
+            f"first task {startup.first_task_latency:.4f}"
+        )
@@ -0,0 +1,115 @@
+import os
+import sys
+from typing import Optional
+
+try:
+    from threadpoolctl import threadpool_info, threadpool_limits
+except ImportError:
+    # Without threadpoolctl the BLAS thread count can only be set through the environment,
+    # which only works in processes that have not loaded the BLAS library yet
+    threadpool_info = None
+    threadpool_limits = None
+
+# How many threads the BLAS, OpenMP and OpenCV thread pools of every worker may use:
+# - "unlimited": the libraries' defaults, usually one thread per core in every worker
+# - "single": one thread per worker
+# - "share": the cores divided by the worker count, so all workers together use every core once
+THREADS_UNLIMITED = "unlimited"
+THREADS_SINGLE = "single"
+THREADS_SHARE = "share"
+THREAD_POLICIES = [THREADS_UNLIMITED, THREADS_SINGLE, THREADS_SHARE]
+
+# Environment variables that set the thread count of the BLAS and OpenMP libraries
+BLAS_THREAD_VARIABLES = [
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+]
+
+# The environment variable OpenCV reads its default thread count from when it is loaded
+OPENCV_THREAD_VARIABLE = "OPENCV_FOR_THREADS_NUM"
+
+
+def resolve_thread_limit(policy: Optional[str], pool_size: int) -> Optional[int]:
+    """
+    Resolve a thread policy into the number of threads per worker, None for no limit.
+    """
+    if policy == THREADS_SINGLE:
+        return 1
+    if policy == THREADS_SHARE:
+        return max((os.cpu_count() or 1) // max(pool_size, 1), 1)
+    return None
+
+
+class ThreadLimits:
+    """
+    Limits the BLAS/OpenMP thread pools (with threadpoolctl, if installed) and the OpenCV
+    thread pool of the current process, and can restore the previous thread counts. OpenCV
+    is only limited if it is loaded, it is not imported for this.
+    """
+
+    def __init__(self, limit: Optional[int]):
+        self.limit = limit
+        self.applied = False
+        self.blas_limits = None
+        self.original_cv2_threads: int = None
+
+    def apply(self):
+        if self.limit is None or self.applied:
+            return
+        self.applied = True
+
+        if "cv2" in sys.modules:
+            cv2 = sys.modules["cv2"]
+            self.original_cv2_threads = cv2.getNumThreads()
+            cv2.setNumThreads(self.limit)
+
+        if threadpool_limits is not None:
+            # The BLAS library is only found once numpy has loaded it
+            import numpy
+
+            self.blas_limits = threadpool_limits(limits=self.limit)
+
+    def restore(self):
+        self.applied = False
+
+        if self.original_cv2_threads is not None:
+            sys.modules["cv2"].setNumThreads(self.original_cv2_threads)
+            self.original_cv2_threads = None
+
+        if self.blas_limits is not None:
+            self.blas_limits.restore_original_limits()
+            self.blas_limits = None
+
+
+def limit_worker_threads(limit: Optional[int]):
+    """
+    Limit the threads of a worker process for its whole lifetime. The environment variables
+    cover libraries loaded after this, e.g. in spawned workers or by the first img task.
+    """
+    if limit is None:
+        return
+
+    for name in BLAS_THREAD_VARIABLES + [OPENCV_THREAD_VARIABLE]:
+        os.environ[name] = str(limit)
+
+    ThreadLimits(limit).apply()
+
+
+def get_thread_pool_info() -> list[dict]:
+    """
+    Describe the BLAS/OpenMP thread pools loaded into the current process, if threadpoolctl
+    is installed.
+    """
+    if threadpool_info is None:
+        return []
+    return [
+        {
+            "api": pool.get("internal_api"),
+            "version": pool.get("version"),
+            "num_threads": pool.get("num_threads"),
+        }
+        for pool in threadpool_info()
+    ]
@@ -2,19 +2,103 @@ import datetime
 import os
 import sys
 
-from pipelines.handler import run_pipeline
+from easy_pool.distributed import DEFAULT_AGENT_HOST, DEFAULT_AGENT_PORT, run_agent
+from easy_pool.faults import FaultPolicy
+from pipelines.handler import profile_startup, run_pipeline
 
+from work.sum import IMPLEMENTATION_LOOP
 from work_wrapper.task_parser import TaskWrapper
+from util.compare import DEFAULT_BASELINE_WINDOW, compare_runs, print_comparisons
 from util.config import load_runtime_config
 from util.csv import csv_export
+from util.result_store import DEFAULT_RESULT_STORE, ResultStore
+from util.runner import (
+    METRIC_COLUMNS,
+    SUMMARY_COLUMNS,
+    TASK_CSV_HEADER,
+    save_task_profiles,
+)
 import argparse
 
 
 def main():
     parser = argparse.ArgumentParser(description="Parallel Task Performance Tester")
     parser.add_argument("--config", type=str, help="Path to the configuration file")
+    subparsers = parser.add_subparsers(dest="command")
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="Check a recorded run for throughput regressions"
+    )
+    compare_parser.add_argument(
+        "run",
+        type=int,
+        nargs="?",
+        help="Id of the run to check, defaults to the latest",
+    )
+    compare_parser.add_argument(
+        "--baseline",
+        type=int,
+        help="Id of the run to compare against, defaults to a rolling baseline of the previous runs",
+    )
+    compare_parser.add_argument(
+        "--window",
+        type=int,
+        default=DEFAULT_BASELINE_WINDOW,
+        help="How many previous runs of the same task and environment the rolling baseline uses",
+    )
+    compare_parser.add_argument(
+        "--min-change",
+        type=float,
+        default=0.0,
+        help="The smallest relative throughput drop that counts as a regression, e.g. 0.05",
+    )
+    compare_parser.add_argument(
+        "--store",
+        type=str,
+        default=DEFAULT_RESULT_STORE,
+        help="Path to the result store",
+    )
+
+    runs_parser = subparsers.add_parser("runs", help="List the recorded runs")
+    runs_parser.add_argument(
+        "--limit", type=int, default=20, help="How many of the latest runs to list"
+    )
+    runs_parser.add_argument(
+        "--store",
+        type=str,
+        default=DEFAULT_RESULT_STORE,
+        help="Path to the result store",
+    )
+
+    subparsers.add_parser(
+        "startup",
+        help="Profile the worker startup of the configured backends and worker counts",
+    )
+
+    agent_parser = subparsers.add_parser(
+        "agent", help="Run the workers of the distributed backend for a harness"
+    )
+    agent_parser.add_argument(
+        "--host",
+        type=str,
+        default=DEFAULT_AGENT_HOST,
+        help="The address to listen on",
+    )
+    agent_parser.add_argument(
+        "--port", type=int, default=DEFAULT_AGENT_PORT, help="The port to listen on"
+    )
+
     args = parser.parse_args()
 
+    if args.command == "compare":
+        sys.exit(compare(args))
+    if args.command == "runs":
+        list_runs(args)
+        return
+    if args.command == "agent":
+        run_agent(args.host, args.port)
+        return
+
     config = load_runtime_config(args.config)
 
     try:
@@ -23,6 +107,16 @@ def main():
         print(f"Failed to parse task: {e}. Quitting...")
         sys.exit(1)
 
+    if args.command == "startup":
+        profile_startup(
+            task_func=task_wrapper.task_func,
+            task_args=task_wrapper.task_args,
+            workers=config.workers,
+            backends=config.backend,
+            max_workers=config.max_workers,
+        )
+        return
+
     print(
         f"Starting test for task {config.task} with {config.task_count} tasks, {config.iterations} iterations"
     )
@@ -37,6 +131,33 @@ def main():
         wait_time_after_runner=config.wait_time_after_runner,
         wait_time_after_iteration=config.wait_time_after_iteration,
         gc_after_iteration=config.gc_after_iteration,
+        chunksizes=config.chunksize,
+        persistent_pool=config.persistent_pool,
+        transports=config.transport,
+        backends=config.backend,
+        async_concurrency=config.async_concurrency,
+        retention=config.result_retention,
+        max_in_flight=config.max_in_flight,
+        resource_sample_interval=config.resource_sample_interval,
+        max_workers=config.max_workers,
+        data_parallel=config.data_parallel,
+        seed=config.seed,
+        task_plan=config.task_plan,
+        schedules=config.schedule,
+        cost_model=config.cost_model,
+        thread_policies=config.thread_policy,
+        placements=config.placement,
+        arrival_rates=config.arrival_rate,
+        arrival_process=config.arrival_process,
+        latency_slo=config.latency_slo,
+        task_payloads=config.task_payload,
+        fault_policy=FaultPolicy(
+            task_timeout=config.task_timeout,
+            max_retries=config.task_retries,
+            max_tasks_per_child=config.max_tasks_per_child,
+        ),
+        profiler=config.profiler,
+        implementations=task_wrapper.implementations,
     )
 
     csv_data = []
@@ -44,31 +165,148 @@ def main():
         [
             "Name",
             "Workers",
+            "Backend",
+            "Chunk size",
+            "Transport",
+            "Schedule",
+            "Thread policy",
+            "Placement",
+            "Placement CPUs",
+            "Task payload",
+            "Implementation",
             "Task details",
             "Task count",
             "Time: init",
             "Time: work",
             "Time: task avg",
             "Time: total",
+            "Time: pool startup",
             "Tasks per second",
             "Speedup (vs sequential)",
+            "Speedup (implementation vs loop)",
+            "Search: recommended",
+            *METRIC_COLUMNS.values(),
+            *SUMMARY_COLUMNS,
         ]
     )
 
-    reference_tps = 0
-    if "sequential" in runners:
-        reference_tps = runners["sequential"].get_tasks_per_second()
+    # The runners of every implementation are compared with its sequential runner, and the
+    # sequential runners of the implementations with the one of the interpreter loop
+    reference_tps = {
+        runner.implementation: runner.get_tasks_per_second()
+        for runner in runners.values()
+        if runner.workers == 0
+    }
+    loop_tps = reference_tps.get(IMPLEMENTATION_LOOP, 0)
 
     for key, runner in runners.items():
-        csv_data.extend(runner.to_csv(reference_tps=reference_tps))
+        implementation_speedup = None
+        if runner.implementation is not None and loop_tps != 0:
+            implementation_speedup = (
+                reference_tps.get(runner.implementation, 0) / loop_tps
+            )
+        csv_data.extend(
+            runner.to_csv(
+                reference_tps=reference_tps.get(runner.implementation, 0),
+                implementation_speedup=implementation_speedup,
+            )
+        )
 
-    csv_filename = f"results/{config.task}__{datetime.datetime.now().strftime('%Y_%m_%d__%H_%M')}.csv"
+    task_csv_data = [TASK_CSV_HEADER]
+    for key, runner in runners.items():
+        task_csv_data.extend(runner.tasks_to_csv())
+
+    csv_basename = (
+        f"results/{config.task}__{datetime.datetime.now().strftime('%Y_%m_%d__%H_%M')}"
+    )
+    csv_filename = f"{csv_basename}.csv"
+    task_csv_filename = f"{csv_basename}__tasks.csv"
 
     os.makedirs("results", exist_ok=True)
 
     csv_export(data=csv_data, filename=csv_filename)
+    csv_export(data=task_csv_data, filename=task_csv_filename)
 
     print(f"Results saved to {csv_filename}")
+    print(f"Per-task results saved to {task_csv_filename}")
+
+    profiles_filename = save_task_profiles(runners, csv_basename)
+    if profiles_filename is not None:
+        print(f"Task profiles summarized in {profiles_filename}")
+
+    if config.result_store is not None:
+        store = ResultStore(config.result_store)
+        run_id = store.add_run(config.task, vars(config), runners)
+        store.close()
+        print(f"Run {run_id} recorded in {config.result_store}")
+
+
+def compare(args: argparse.Namespace) -> int:
+    """
+    Compare a recorded run against a baseline run, or against the previous runs of the same
+    task and environment.
+
+    Returns:
+        int: The exit code, 1 if a runner regressed.
+    """
+    if not os.path.exists(args.store):
+        print(f"Result store {args.store} does not exist. Quitting...")
+        return 1
+
+    store = ResultStore(args.store)
+
+    run = store.get_run(args.run) if args.run is not None else store.get_latest_run()
+    if run is None:
+        print("Run not found. Quitting...")
+        return 1
+
+    if args.baseline is not None:
+        baseline_runs = [store.get_run(args.baseline)]
+        if baseline_runs[0] is None:
+            print("Baseline run not found. Quitting...")
+            return 1
+        if baseline_runs[0].fingerprint != run.fingerprint:
+            print("Warning: the runs were measured in different environments")
+    else:
+        baseline_runs = store.get_previous_runs(run, args.window)
+        if len(baseline_runs) == 0:
+            print(
+                f"No previous runs of task {run.task} in the same environment to compare with. Quitting..."
+            )
+            return 1
+
+    print(
+        f"Comparing run {run.id} ({run.task}, {run.created_at}) against run(s) "
+        f"{', '.join([str(baseline.id) for baseline in baseline_runs])}"
+    )
+    print()
+
+    comparisons = compare_runs(store, run, baseline_runs)
+    store.close()
+    print_comparisons(comparisons, args.min_change)
+
+    regressions = [x for x in comparisons if x.is_regression(args.min_change)]
+    if len(regressions) > 0:
+        print(f"{len(regressions)} of {len(comparisons)} runners regressed")
+        return 1
+
+    print(f"No regressions in {len(comparisons)} runners")
+    return 0
+
+
+def list_runs(args: argparse.Namespace):
+    if not os.path.exists(args.store):
+        print(f"Result store {args.store} does not exist")
+        return
+
+    store = ResultStore(args.store)
+    for run in store.get_runs(args.limit):
+        print(
+            f"{run.id}: {run.created_at} {run.task} {run.config.get('task_args')}, "
+            f"{run.config.get('task_count')} tasks, environment {run.fingerprint} "
+            f"({run.environment.get('cpu_model')}, {run.environment.get('cpu_count')} CPUs)"
+        )
+    store.close()
 
 
 if __name__ == "__main__":
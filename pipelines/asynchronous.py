@@ -0,0 +1,155 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+import numpy as np
+
+from easy_pool.easy_pool import EasyPool, IndexedTask
+from util.samples import TaskSamples
+from util.timer import Timer
+from work.io import async_io_task, io_task
+from work.zip import async_file_compression_task, file_compression_task
+
+PIPELINE_ASYNC = "async"
+
+# Tasks that have an asyncio native implementation, everything else is CPU-bound
+# and gets offloaded to the executor.
+ASYNC_TASK_FUNCS = {
+    io_task: async_io_task,
+    file_compression_task: async_file_compression_task,
+}
+
+
+def async_test_pipeline(
+    pool_size: int,
+    tasks: list[tuple[callable, list]],
+    concurrency: int = None,
+    seeds: list[int] = None,
+) -> tuple[float, float, float, float, dict[str, TaskSamples]]:
+    """
+    Executes a test pipeline running the tasks as coroutines on an asyncio event loop.
+    Tasks with an async native implementation run directly on the loop, others are offloaded
+    to a process pool executor with loop.run_in_executor.
+    Args:
+        pool_size (int): The number of workers in the executor for CPU-bound tasks.
+        tasks (list[tuple[callable, list]]): A list of tasks, where each task is represented
+                                             as a tuple containing a callable and a list of arguments.
+        concurrency (int, optional): The maximum number of tasks in progress at a time.
+                                     Defaults to the pool size.
+        seeds (list[int], optional): A random seed for every task offloaded to the executor.
+    Returns:
+        A tuple containing the following values:
+        - The runtime for task creation.
+        - The runtime for waiting for all tasks to complete.
+        - The average runtime of each task.
+        - The total runtime of the test.
+        - A dict with the CPU time of the tasks and the per-task samples, the queue wait being
+          the time a task waited for the concurrency limit. The CPU time is only known for the
+          tasks offloaded to the executor.
+    """
+    if concurrency is None:
+        concurrency = pool_size
+
+    print_prefix = (
+        f"Async test pipeline: Pool size={pool_size}, Concurrency={concurrency} |"
+    )
+    print(f"{print_prefix} Starting test...")
+    timer = Timer(start_now=True)
+
+    executor = ProcessPoolExecutor(max_workers=pool_size)
+
+    print(f"{print_prefix} Task creation runtime: {timer.get_duration_str()}")
+
+    init_runtime = timer.get_duration()
+    collect_timer = Timer(start_now=True)
+
+    # Blocking until all tasks are done
+    task_samples = asyncio.run(run_async_tasks(tasks, executor, concurrency, seeds))
+    print(f"{print_prefix} Work runtime: {collect_timer.get_duration_str()}")
+    work_runtime = collect_timer.get_duration()
+
+    avg_task_runtime = float(task_samples.get_runtimes().mean())
+
+    executor.shutdown()
+
+    print(f"{print_prefix} Total runtime: {timer.get_duration_str()}")
+    print()
+
+    total_runtime = timer.get_duration()
+
+    return (
+        init_runtime,
+        work_runtime,
+        avg_task_runtime,
+        total_runtime,
+        {
+            "task_samples": task_samples,
+            "cpu_task_runtime": task_samples.get_cpu_time_sum(),
+        },
+    )
+
+
+async def run_async_tasks(
+    tasks: list[tuple[callable, list]],
+    executor: Executor,
+    concurrency: int,
+    seeds: list[int] = None,
+    arrival_times: np.ndarray = None,
+    response_times: np.ndarray = None,
+) -> TaskSamples:
+    """
+    Run all tasks on the loop, at most concurrency at a time. With arrival times (seconds
+    from the start) every task is only submitted once it arrives, and the time from its
+    arrival to its completion is written into response_times.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    task_samples = TaskSamples()
+    start_time = Timer.now()
+
+    async def run_task(index: int, task_func: callable, task_args: list):
+        if arrival_times is not None:
+            await asyncio.sleep(max(start_time + arrival_times[index] - Timer.now(), 0))
+
+        submit_time = Timer.now()
+        async with semaphore:
+            timer = Timer(start_now=True)
+            seed = seeds[index] if seeds is not None else None
+            cpu_time = await run_async_task(index, task_func, task_args, executor, seed)
+            task_samples.add(
+                index, timer.get_duration(), timer.start_time - submit_time, cpu_time
+            )
+
+        if response_times is not None:
+            response_times[index] = Timer.now() - start_time - arrival_times[index]
+
+    await asyncio.gather(
+        *[
+            run_task(index, task_func, task_args + [index])
+            for index, (task_func, task_args) in enumerate(tasks)
+        ]
+    )
+    return task_samples
+
+
+async def run_async_task(
+    index: int,
+    task_func: callable,
+    task_args: list,
+    executor: Executor,
+    seed: int = None,
+) -> float:
+    """
+    Run a task natively on the loop or in the executor.
+
+    Returns:
+        The CPU time of the task if it ran in the executor, NaN otherwise.
+    """
+    if task_func in ASYNC_TASK_FUNCS:
+        await ASYNC_TASK_FUNCS[task_func](*task_args)
+        return float("nan")
+
+    loop = asyncio.get_running_loop()
+    task = IndexedTask(index, task_func, task_args, seed=seed)
+    _, _, _, _, cpu_time = await loop.run_in_executor(
+        executor, EasyPool.process_indexed_task, task
+    )
+    return cpu_time
@@ -1,45 +1,151 @@
 import gc
+import itertools
+import os
 import sys
 import time
-from typing import Optional
+from typing import Optional, Union
 
-import cv2
+import numpy as np
 
+from easy_pool.backends import (
+    BACKEND_INTERPRETER,
+    BACKEND_POOL,
+    BACKEND_THREAD,
+    is_gil_enabled,
+)
+from easy_pool.easy_pool import RETENTION_KEEP, EasyPool
+from easy_pool.faults import FaultPolicy
+from easy_pool.placement import PLACEMENT_NONE, format_worker_cpus, get_worker_cpus
+from easy_pool.registry import TASK_PAYLOAD_INLINE
+from easy_pool.scheduler import SCHEDULE_FIFO
+from easy_pool.shared_memory import TRANSPORT_PICKLE
+from easy_pool.startup import preload_forkserver, print_startup_profile
+from easy_pool.threads import THREADS_UNLIMITED, resolve_thread_limit
+from pipelines.asynchronous import PIPELINE_ASYNC, async_test_pipeline
+from pipelines.open_loop import (
+    ARRIVAL_CONSTANT,
+    add_slo_rates,
+    open_loop_test_pipeline,
+    print_slo_summary,
+)
 from pipelines.pool import pool_test_pipeline
+from pipelines.search import WORKERS_AUTO, WorkerSearch
+from pipelines.split import PIPELINE_SPLIT, get_split_task_func, split_test_pipeline
 from pipelines.sequential import sequential_test_pipeline
+from util.resources import ResourceSampler
 from util.runner import Runner, print_runtimes
+from util.timer import Timer
 from work_wrapper.random_task_list import get_random_task_list
-from work_wrapper.task_list import get_task_list
+from work_wrapper.task_cost import COST_MODEL_LEARNED, CostModel, get_task_costs
+from work_wrapper.task_list import get_task_list, set_task_implementation
+from work_wrapper.task_plan import TaskPlan, generate_task_plan, get_task_seeds
+from work_wrapper.task_types import get_task_modules
 
 
 def run_pipeline(
     task_func: Optional[callable],
     task_args: list,
-    workers: list[int],
+    workers: Union[list[int], str],
     iterations: int,
     task_details: str,
     task_count: int = 0,
     wait_time_after_runner: float = None,
     wait_time_after_iteration: float = None,
     gc_after_iteration: bool = False,
+    chunksizes: list[Union[int, str]] = None,
+    persistent_pool: bool = False,
+    transports: list[str] = None,
+    backends: list[str] = None,
+    async_concurrency: int = None,
+    retention: str = RETENTION_KEEP,
+    max_in_flight: int = None,
+    resource_sample_interval: Optional[float] = None,
+    max_workers: int = None,
+    data_parallel: bool = False,
+    seed: int = None,
+    task_plan: str = None,
+    schedules: list[str] = None,
+    cost_model: str = None,
+    thread_policies: list[str] = None,
+    placements: list[str] = None,
+    arrival_rates: list[float] = None,
+    arrival_process: str = ARRIVAL_CONSTANT,
+    latency_slo: float = None,
+    task_payloads: list[str] = None,
+    fault_policy: FaultPolicy = None,
+    profiler: str = None,
+    implementations: list[str] = None,
 ) -> dict[str, Runner]:
-    runners: dict[str, Runner] = {}
-    for num_workers in workers:
-        if num_workers != 0:
-            key = f"parallel_{num_workers}"
-        else:
-            key = "sequential"
+    """
+    Run the test passes of all runners. With workers set to "auto" the worker counts to test
+    are searched for instead, up to max_workers (defaults to the CPU count), and iterations
+    is the most test passes per configuration. With data_parallel every task is partitioned
+    across all workers instead of running the tasks side by side.
+
+    With a seed or a task plan file the random task list is a TaskPlan replayed in every
+    iteration, and all tasks seed the random generators with their own seed before running.
+
+    The pool runners are compared per schedule. The cost ordered schedules estimate the task
+    costs from the task parameters, or with the "learned" cost model from the task runtimes
+    measured in the previous test passes.
+
+    The parallel runners are also compared per thread policy, which limits the BLAS/OpenMP and
+    OpenCV threads of every worker, and per placement, which pins the workers to CPUs.
+
+    With arrival rates the parallel runners are open-loop tests compared per arrival rate:
+    the tasks are submitted at the rate of the arrival process instead of all at once, and
+    the response times are checked against the latency SLO.
+
+    The pool runners are also compared per task payload: the function and arguments sent with
+    every task, or only their ids in a task table that is sent to the workers once.
+
+    The fault policy sets the task timeout, retries and worker recycling of all pools. Tasks
+    that failed for good don't count towards the tasks per second.
+
+    With a profiler every task of the sequential and pool runners is profiled in the process
+    that runs it, and the profiles are kept per runner.
+
+    The sum and multi tasks are run with every implementation in its own runners, the
+    sequential runner included, so that the speedup from leaving the interpreter loop and
+    the speedup from parallelism can be told apart.
+    """
+    if chunksizes is None:
+        chunksizes = [1]
+    if transports is None:
+        transports = [TRANSPORT_PICKLE]
+    if backends is None:
+        backends = [BACKEND_POOL]
+    if schedules is None:
+        schedules = [SCHEDULE_FIFO]
+    if thread_policies is None:
+        thread_policies = [THREADS_UNLIMITED]
+    if placements is None:
+        placements = [PLACEMENT_NONE]
+    if task_payloads is None:
+        task_payloads = [TASK_PAYLOAD_INLINE]
+    if implementations is None:
+        implementations = [None]
 
-        runners[key] = Runner(
-            name=key,
-            workers=num_workers,
-            task_details=task_details,
-            task_count=task_count,
+    if data_parallel and (task_func is None or get_split_task_func(task_func) is None):
+        print(
+            "Data-parallel mode is only supported for the sum, multi, sort, tensor and img tasks. Quitting..."
         )
+        sys.exit(1)
+
+    if BACKEND_THREAD in backends:
+        print(f"Thread backend: GIL enabled={is_gil_enabled()}")
+        print()
 
     tasks: list[tuple[callable, list]] = []
 
-    img = cv2.imread("img.jpg")
+    # Warmed up pools kept alive for the whole run when persistent_pool is set,
+    # with the time it took to start them, by backend, worker count, thread policy and placement
+    pools: dict[tuple[str, int, str, str], tuple[EasyPool, float]] = {}
+
+    # Learns the runtime of the task types from every test pass
+    learned_costs = CostModel() if cost_model == COST_MODEL_LEARNED else None
+
+    img = None
 
     # Get tasks list for pipeline
     if task_func is not None:
@@ -47,39 +153,534 @@ def run_pipeline(
             task_count=task_count, task_func=task_func, task_args=task_args
         )
 
-    for index in range(iterations):
-        print(f"Test iteration {index+1}/{iterations}")
+    # Seeds of the tasks, and the plan of the random tasks if they are seeded
+    seeds: list[int] = None
+    plan: TaskPlan = None
+    if task_func is None and (seed is not None or task_plan is not None):
+        plan = get_task_plan(task_plan, task_count, task_args, seed)
+        tasks = plan.get_tasks(load_task_img([name for name, _, _ in plan.tasks]))
+        seeds = plan.get_seeds()
+    elif seed is not None:
+        seeds = get_task_seeds(seed, task_count)
+
+    if task_func is None and plan is None:
+        img = load_task_img(task_args)
+
+    # Workers forked from a forkserver start with the task modules already imported. The
+    # random tasks of later iterations can use other modules than the first task list
+    if task_func is None and plan is None:
+        task_modules = get_task_modules(task_args)
+    else:
+        task_modules = sorted(set(func.__module__ for func, _ in tasks))
+    if preload_forkserver(task_modules):
+        print(f"Forkserver preloads: {', '.join(task_modules)}")
         print()
 
+    def get_tasks() -> list[tuple[callable, list]]:
         # Initialize a set of random tasks
-        if task_func is None:
-            tasks = get_random_task_list(
+        if task_func is None and plan is None:
+            return get_random_task_list(
                 task_count=task_count, task_types=task_args, img=img
             )
+        return tasks
+
+    def run_test_pass(runner: Runner, tasks: list[tuple[callable, list]]):
+        print(f"Running test for {runner.name}")
+        if runner.implementation is not None:
+            tasks = set_task_implementation(tasks, runner.implementation)
+        resource_sampler = None
+        if resource_sample_interval is not None:
+            resource_sampler = ResourceSampler(resource_sample_interval)
+            resource_sampler.start()
+        samples_count = len(runner.task_samples)
+
+        if runner.workers == 0:
+            runner.add_runtime(sequential_test_pipeline(tasks, seeds, profiler))
+        elif runner.backend == PIPELINE_ASYNC and runner.arrival_rate is not None:
+            runner.add_runtime(
+                open_loop_test_pipeline(
+                    runner.workers,
+                    tasks,
+                    runner.arrival_rate,
+                    arrival_process,
+                    latency_slo,
+                    backend=PIPELINE_ASYNC,
+                    async_concurrency=async_concurrency,
+                    seeds=seeds,
+                    arrival_seed=seed,
+                )
+            )
+        elif runner.backend == PIPELINE_ASYNC:
+            runner.add_runtime(
+                async_test_pipeline(runner.workers, tasks, async_concurrency, seeds)
+            )
+        else:
+            thread_limit = resolve_thread_limit(runner.thread_policy, runner.workers)
+            # Sub-interpreter workers are not pinned
+            if runner.backend != BACKEND_INTERPRETER:
+                runner.placement_cpus = format_worker_cpus(
+                    get_worker_cpus(runner.placement, runner.workers, thread_limit or 1)
+                )
+            easy_pool = None
+            if persistent_pool:
+                pool_key = (
+                    runner.backend,
+                    runner.workers,
+                    runner.thread_policy,
+                    runner.placement,
+                )
+                if pool_key not in pools:
+                    pools[pool_key] = start_warm_pool(
+                        runner.workers,
+                        task_modules,
+                        runner.backend,
+                        thread_limit,
+                        runner.placement,
+                        fault_policy,
+                    )
+                easy_pool, runner.startup_runtime = pools[pool_key]
 
+            if data_parallel:
+                runner.add_runtime(
+                    split_test_pipeline(
+                        runner.workers,
+                        tasks,
+                        easy_pool=easy_pool,
+                        backend=runner.backend,
+                        seeds=seeds,
+                        thread_limit=thread_limit,
+                        placement=runner.placement,
+                        fault_policy=fault_policy,
+                        profiler=profiler,
+                    )
+                )
+            elif runner.arrival_rate is not None:
+                runner.add_runtime(
+                    open_loop_test_pipeline(
+                        runner.workers,
+                        tasks,
+                        runner.arrival_rate,
+                        arrival_process,
+                        latency_slo,
+                        easy_pool=easy_pool,
+                        transport=runner.transport,
+                        backend=runner.backend,
+                        retention=retention,
+                        seeds=seeds,
+                        arrival_seed=seed,
+                        thread_limit=thread_limit,
+                        placement=runner.placement,
+                        task_payload=runner.task_payload,
+                        fault_policy=fault_policy,
+                        profiler=profiler,
+                    )
+                )
+            else:
+                costs = None
+                if runner.schedule != SCHEDULE_FIFO:
+                    costs = get_task_costs(tasks, learned_costs)
+
+                runner.add_runtime(
+                    pool_test_pipeline(
+                        runner.workers,
+                        tasks,
+                        runner.chunksize,
+                        easy_pool=easy_pool,
+                        transport=runner.transport,
+                        backend=runner.backend,
+                        retention=retention,
+                        max_in_flight=max_in_flight,
+                        seeds=seeds,
+                        schedule=runner.schedule,
+                        costs=costs,
+                        thread_limit=thread_limit,
+                        placement=runner.placement,
+                        task_payload=runner.task_payload,
+                        fault_policy=fault_policy,
+                        profiler=profiler,
+                    )
+                )
+
+            # A persistent pool idles until its next test pass
+            if easy_pool is not None:
+                easy_pool.release_result_buffers()
+
+        if learned_costs is not None and len(runner.task_samples) > samples_count:
+            learned_costs.update(tasks, runner.task_samples[-1])
+
+        if resource_sampler is not None:
+            runner.add_metrics(resource_sampler.stop())
+
+        if wait_time_after_runner is not None:
+            time.sleep(wait_time_after_runner)
+
+    def check_tasks(tasks: list[tuple[callable, list]]):
         # For whatever reason the tasks list is empty
         if len(tasks) == 0:
             print("No tasks specified to run pipelines with. Quitting...")
             sys.exit(1)
 
-        # Run tests
-        for key, runner in runners.items():
-            print(f"Running test for {key}")
-            if runner.workers == 0:
-                runners[key].add_runtime(sequential_test_pipeline(tasks))
-            else:
-                runners[key].add_runtime(pool_test_pipeline(runner.workers, tasks))
+    # The task list of every search round: the n-th pass of every configuration runs the
+    # n-th task list, so that random task lists compare the configurations on the same work
+    search_task_lists: list[list[tuple[callable, list]]] = []
 
-            if wait_time_after_runner is not None:
-                time.sleep(wait_time_after_runner)
+    def run_search_pass(runner: Runner):
+        # Every pass of the search stands for an iteration
+        search_round = len(runner.runtimes)
+        while len(search_task_lists) <= search_round:
+            search_tasks = get_tasks()
+            check_tasks(search_tasks)
+            search_task_lists.append(search_tasks)
+        run_test_pass(runner, search_task_lists[search_round])
 
         if gc_after_iteration:
-            print("Running garbage collection...")
-            print()
             gc.collect()
 
         if wait_time_after_iteration is not None:
             time.sleep(wait_time_after_iteration)
 
+    def create_worker_runners(num_workers: int) -> dict[str, Runner]:
+        return create_runners(
+            [num_workers],
+            task_details,
+            task_count,
+            chunksizes,
+            transports,
+            backends,
+            data_parallel,
+            schedules,
+            thread_policies,
+            placements,
+            arrival_rates,
+            task_payloads,
+            implementations,
+        )
+
+    if workers == WORKERS_AUTO:
+        search = WorkerSearch(
+            create_runners=create_worker_runners,
+            run_test_pass=run_search_pass,
+            max_workers=max_workers or os.cpu_count(),
+            max_iterations=iterations,
+        )
+        runners = search.run()
+    else:
+        runners = create_runners(
+            workers,
+            task_details,
+            task_count,
+            chunksizes,
+            transports,
+            backends,
+            data_parallel,
+            schedules,
+            thread_policies,
+            placements,
+            arrival_rates,
+            task_payloads,
+            implementations,
+        )
+
+        for index in range(iterations):
+            print(f"Test iteration {index+1}/{iterations}")
+            print()
+
+            tasks = get_tasks()
+            check_tasks(tasks)
+
+            # Run tests
+            for runner in runners.values():
+                run_test_pass(runner, tasks)
+
+            if gc_after_iteration:
+                print("Running garbage collection...")
+                print()
+                gc.collect()
+
+            if wait_time_after_iteration is not None:
+                time.sleep(wait_time_after_iteration)
+
+    for easy_pool, _ in pools.values():
+        easy_pool.shutdown()
+
+    if latency_slo is not None and arrival_rates is not None:
+        add_slo_rates(runners, latency_slo)
     print_runtimes(runners)
+    if latency_slo is not None and arrival_rates is not None:
+        print_slo_summary(runners, latency_slo)
+    return runners
+
+
+def create_runners(
+    workers: list[int],
+    task_details: str,
+    task_count: int,
+    chunksizes: list[Union[int, str]],
+    transports: list[str],
+    backends: list[str],
+    data_parallel: bool = False,
+    schedules: list[str] = None,
+    thread_policies: list[str] = None,
+    placements: list[str] = None,
+    arrival_rates: list[float] = None,
+    task_payloads: list[str] = None,
+    implementations: list[str] = None,
+) -> dict[str, Runner]:
+    """
+    Create a runner for every worker count, and per worker count for every compared
+    backend, chunk size, transport, schedule, thread policy, placement, arrival rate, task
+    payload and implementation. The sequential runner is created per implementation. Chunk sizes, transports, schedules and task payloads do not apply to
+    data-parallel runners, chunk sizes and schedules not to open-loop runners, which submit
+    the tasks one at a time as they arrive.
+    """
+    if schedules is None:
+        schedules = [SCHEDULE_FIFO]
+    if thread_policies is None:
+        thread_policies = [THREADS_UNLIMITED]
+    if placements is None:
+        placements = [PLACEMENT_NONE]
+    if task_payloads is None:
+        task_payloads = [TASK_PAYLOAD_INLINE]
+    if implementations is None:
+        implementations = [None]
+    if arrival_rates is None:
+        arrival_rates = [None]
+    else:
+        chunksizes = [None]
+        schedules = [SCHEDULE_FIFO]
+
+    if data_parallel:
+        chunksizes = [None]
+        transports = [None]
+        schedules = [None]
+        task_payloads = [None]
+
+    runners: dict[str, Runner] = {}
+    for num_workers in workers:
+        if num_workers == 0:
+            for implementation in implementations:
+                key = "sequential"
+                if len(implementations) > 1:
+                    key = f"{key}_{implementation}"
+                runners[key] = Runner(
+                    name=key,
+                    workers=num_workers,
+                    task_details=task_details,
+                    task_count=task_count,
+                    implementation=implementation,
+                )
+            continue
+
+        if PIPELINE_ASYNC in backends:
+            for arrival_rate, implementation in itertools.product(
+                arrival_rates, implementations
+            ):
+                key = f"{PIPELINE_ASYNC}_{num_workers}"
+                if len(arrival_rates) > 1:
+                    key = f"{key}_rate_{arrival_rate}"
+                if len(implementations) > 1:
+                    key = f"{key}_{implementation}"
+                runners[key] = Runner(
+                    name=key,
+                    workers=num_workers,
+                    task_details=task_details,
+                    task_count=task_count,
+                    backend=PIPELINE_ASYNC,
+                    arrival_rate=arrival_rate,
+                    implementation=implementation,
+                )
+
+        pool_backends = [backend for backend in backends if backend != PIPELINE_ASYNC]
+        for (
+            backend,
+            chunksize,
+            transport,
+            schedule,
+            thread_policy,
+            placement,
+            arrival_rate,
+            task_payload,
+            implementation,
+        ) in itertools.product(
+            pool_backends,
+            chunksizes,
+            transports,
+            schedules,
+            thread_policies,
+            placements,
+            arrival_rates,
+            task_payloads,
+            implementations,
+        ):
+            # The multiprocessing.Pool backend keeps its original runner name
+            if backend == BACKEND_POOL:
+                key = f"parallel_{num_workers}"
+            else:
+                key = f"{backend}_{num_workers}"
+
+            if data_parallel:
+                key = f"{key}_{PIPELINE_SPLIT}"
+
+            # Only name the dimensions that have several values being compared
+            if len(chunksizes) > 1:
+                key = f"{key}_chunk_{chunksize}"
+            if len(transports) > 1:
+                key = f"{key}_{transport}"
+            if len(schedules) > 1:
+                key = f"{key}_{schedule}"
+            if len(thread_policies) > 1:
+                key = f"{key}_threads_{thread_policy}"
+            if len(placements) > 1:
+                key = f"{key}_placement_{placement}"
+            if len(arrival_rates) > 1:
+                key = f"{key}_rate_{arrival_rate}"
+            if len(task_payloads) > 1:
+                key = f"{key}_payload_{task_payload}"
+            if len(implementations) > 1:
+                key = f"{key}_{implementation}"
+
+            runners[key] = Runner(
+                name=key,
+                workers=num_workers,
+                task_details=task_details,
+                task_count=task_count,
+                chunksize=chunksize,
+                transport=transport,
+                backend=backend,
+                schedule=schedule,
+                thread_policy=thread_policy,
+                placement=placement,
+                arrival_rate=arrival_rate,
+                task_payload=task_payload,
+                implementation=implementation,
+            )
+
     return runners
+
+
+def start_warm_pool(
+    pool_size: int,
+    warm_modules: list[str],
+    backend: str = BACKEND_POOL,
+    thread_limit: int = None,
+    placement: str = PLACEMENT_NONE,
+    fault_policy: FaultPolicy = None,
+) -> tuple[EasyPool, float]:
+    """
+    Start a pool and wait until every worker has imported the task modules and run a no-op,
+    so that the time it took can be reported separately from the actual work.
+
+    Returns:
+        A tuple of the warmed up pool and its startup runtime.
+    """
+    print(f"Starting persistent pool: Backend={backend}, Pool size={pool_size}")
+    timer = Timer(start_now=True)
+
+    easy_pool = EasyPool(
+        pool_size=pool_size,
+        warm_modules=warm_modules,
+        backend=backend,
+        thread_limit=thread_limit,
+        placement=placement,
+        fault_policy=fault_policy,
+    )
+    startups = easy_pool.warm_up()
+
+    startup_runtime = timer.get_duration()
+    print(f"Persistent pool startup runtime: {timer.get_duration_str()}")
+    print_startup_profile(startups)
+    print()
+
+    return easy_pool, startup_runtime
+
+
+def profile_startup(
+    task_func: Optional[callable],
+    task_args: list,
+    workers: Union[list[int], str],
+    backends: list[str] = None,
+    max_workers: int = None,
+):
+    """
+    Start a pool for every backend and worker count without running any tasks, print how
+    long each of its workers took to start, to import the task modules and to be ready for
+    a first task, and shut it down again.
+    """
+    if backends is None:
+        backends = [BACKEND_POOL]
+    if workers == WORKERS_AUTO:
+        workers = [max_workers or os.cpu_count()]
+
+    if task_func is not None:
+        task_modules = [task_func.__module__]
+    else:
+        task_modules = get_task_modules(task_args)
+    print(f"Task modules: {', '.join(task_modules)}")
+    if preload_forkserver(task_modules):
+        print("Forkserver preloads the task modules")
+    print()
+
+    # The async pipeline starts its own executor, and a worker count of 0 has no pool
+    pool_backends = [backend for backend in backends if backend != PIPELINE_ASYNC]
+    for backend, num_workers in itertools.product(pool_backends, workers):
+        if num_workers == 0:
+            continue
+
+        timer = Timer(start_now=True)
+        easy_pool = EasyPool(
+            pool_size=num_workers, warm_modules=task_modules, backend=backend
+        )
+        startups = easy_pool.warm_up()
+        print(
+            f"Backend={backend}, Pool size={num_workers} | Startup runtime: {timer.get_duration_str()}"
+        )
+        print_startup_profile(startups)
+        easy_pool.shutdown()
+        print()
+
+
+def load_task_img(task_types: list[str]) -> Optional[np.ndarray]:
+    """
+    Read the image of the img tasks if they are among the task types, all types if none are
+    given. OpenCV is only imported then.
+    """
+    if len(task_types) > 0 and "img" not in task_types:
+        return None
+
+    import cv2
+
+    return cv2.imread("img.jpg")
+
+
+def get_task_plan(
+    filename: Optional[str], task_count: int, task_types: list[str], seed: int = None
+) -> TaskPlan:
+    """
+    Load the task plan from a file if it exists, otherwise generate one and save it there.
+    """
+    if filename is not None and os.path.exists(filename):
+        print(f"Loading task plan: {filename}")
+        try:
+            plan = TaskPlan.load(filename)
+        except Exception as e:
+            print(f"Failed to load task plan: {e}. Quitting...")
+            sys.exit(1)
+
+        if len(plan.tasks) != task_count:
+            print(
+                f"Task plan has {len(plan.tasks)} tasks, but the task count is {task_count}. Quitting..."
+            )
+            sys.exit(1)
+
+        if seed is not None and seed != plan.seed:
+            print(f"Using the task plan's seed {plan.seed} instead of {seed}")
+        print()
+        return plan
+
+    plan = generate_task_plan(task_count, task_types, seed)
+    print(f"Generated task plan with seed {plan.seed}")
+    if filename is not None:
+        plan.save(filename)
+        print(f"Task plan saved to {filename}")
+    print()
+    return plan
@@ -0,0 +1,395 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from easy_pool.backends import BACKEND_POOL, BACKEND_THREAD
+from easy_pool.easy_pool import RETENTION_KEEP, EasyPool
+from easy_pool.faults import FaultPolicy
+from easy_pool.placement import PLACEMENT_NONE
+from easy_pool.registry import TASK_PAYLOAD_INLINE, TASK_PAYLOAD_REGISTRY, TaskRegistry
+from easy_pool.scheduler import SCHEDULE_FIFO
+from easy_pool.shared_memory import TRANSPORT_PICKLE
+from pipelines.asynchronous import PIPELINE_ASYNC, run_async_tasks
+from pipelines.pool import print_faults
+from util.math import percentiles
+from util.runner import Runner
+from util.timer import Timer
+
+# How the arrival times of the tasks are spaced:
+# - "constant": evenly, at exactly the arrival rate
+# - "poisson": exponentially distributed gaps with the arrival rate as mean rate
+# - "ramp": the rate rises linearly from zero to the arrival rate over the test, which sweeps
+#   the load in a single test pass
+ARRIVAL_CONSTANT = "constant"
+ARRIVAL_POISSON = "poisson"
+ARRIVAL_RAMP = "ramp"
+ARRIVAL_PROCESSES = [ARRIVAL_CONSTANT, ARRIVAL_POISSON, ARRIVAL_RAMP]
+
+# The response time percentile the latency SLO applies to
+SLO_PERCENTILE = 99
+
+# Tasks per window when looking for the rate a ramp crosses the SLO at
+SLO_WINDOW_MIN_TASKS = 20
+
+
+def get_arrival_times(
+    task_count: int, arrival_rate: float, arrival_process: str, seed: int = None
+) -> np.ndarray:
+    """
+    Get the arrival time of every task in seconds from the start of the test.
+    """
+    if arrival_process == ARRIVAL_POISSON:
+        rng = np.random.default_rng(seed)
+        gaps = rng.exponential(1 / arrival_rate, task_count)
+        return np.cumsum(gaps) - gaps[0]
+
+    if arrival_process == ARRIVAL_RAMP:
+        # With the rate rising linearly to arrival_rate over the duration, the i-th task
+        # arrives at sqrt(2 * i * duration / arrival_rate)
+        duration = get_ramp_duration(task_count, arrival_rate)
+        return np.sqrt(2 * np.arange(task_count) * duration / arrival_rate)
+
+    return np.arange(task_count) / arrival_rate
+
+
+def get_ramp_duration(task_count: int, arrival_rate: float) -> float:
+    """
+    The duration of a ramp from zero to arrival_rate during which task_count tasks arrive.
+    """
+    return 2 * task_count / arrival_rate
+
+
+def open_loop_test_pipeline(
+    pool_size: int,
+    tasks: list[tuple[callable, list]],
+    arrival_rate: float,
+    arrival_process: str = ARRIVAL_CONSTANT,
+    latency_slo: float = None,
+    easy_pool: EasyPool = None,
+    transport: str = TRANSPORT_PICKLE,
+    backend: str = BACKEND_POOL,
+    retention: str = RETENTION_KEEP,
+    async_concurrency: int = None,
+    seeds: list[int] = None,
+    arrival_seed: int = None,
+    thread_limit: int = None,
+    placement: str = PLACEMENT_NONE,
+    task_payload: str = TASK_PAYLOAD_INLINE,
+    fault_policy: FaultPolicy = None,
+    profiler: str = None,
+) -> tuple[float, float, float, float, dict]:
+    """
+    Executes an open-loop test pipeline: the tasks are submitted at their arrival times,
+    whether the earlier ones are done or not, like requests to a service. The response time
+    of a task is measured from its arrival to its result, so it includes the time it queued.
+    Args:
+        pool_size (int): The number of workers in the pool.
+        tasks (list[tuple[callable, list]]): A list of tasks, where each task is represented
+                                             as a tuple containing a callable and a list of arguments.
+        arrival_rate (float): The tasks arriving per second, the peak rate of a ramp.
+        arrival_process (str, optional): How the arrivals are spaced, "constant", "poisson"
+                                         or "ramp".
+        latency_slo (float, optional): The target for the p99 response time in seconds.
+        easy_pool (EasyPool, optional): An already running pool to reuse. It is left running
+                                        afterwards, so its startup is not part of the runtimes.
+        transport (str, optional): How numpy arrays are passed to and from the workers,
+                                   "pickle" or "shared_memory".
+        backend (str, optional): What provides the workers, "pool", "process", "thread",
+                                 "interpreter" or "async". Ignored when easy_pool is given.
+        retention (str, optional): What the workers return of each result, "keep", "discard"
+                                   or "digest" (a checksum).
+        async_concurrency (int, optional): The maximum number of tasks in progress at a time
+                                           with the "async" backend.
+        seeds (list[int], optional): A random seed for every task.
+        arrival_seed (int, optional): The seed of the Poisson arrivals.
+        thread_limit (int, optional): The maximum number of BLAS/OpenMP and OpenCV threads
+                                      per worker. Ignored when easy_pool is given.
+        placement (str, optional): Which CPUs the workers are pinned to, "none", "compact",
+                                   "scatter" or "numa". Ignored when easy_pool is given.
+        task_payload (str, optional): What is sent to the workers per task, "inline" or
+                                      "registry". Ignored with the "async" backend.
+        fault_policy (FaultPolicy, optional): The task timeout, retries and worker recycling.
+                                              Ignored when easy_pool is given.
+        profiler (str, optional): What is captured around every task, "cprofile",
+                                  "sampling" or "tracemalloc". Ignored with the "async"
+                                  backend.
+    Returns:
+        A tuple containing the following values:
+        - The runtime for starting the pool.
+        - The runtime from the first arrival to the last result.
+        - The average runtime of each task.
+        - The total runtime of the test.
+        - A dict with the offered and achieved rates, the p50 and p99 response times, the
+          share of tasks over the latency SLO, for a ramp the rate at which the p99 response
+          time crossed the SLO, the CPU time of the tasks, the main process time and pickled
+          bytes of dispatching every task, the failed, retried and timed out tasks and lost
+          workers and the per-task samples, with a profiler also the profiles of the tasks.
+          Tasks that failed have no response time and count as over the SLO.
+    """
+    print_prefix = (
+        f"Open-loop test pipeline: Backend={backend}, Pool size={pool_size}, "
+        f"Arrivals={arrival_process}, Rate={arrival_rate}/s |"
+    )
+    print(f"{print_prefix} Starting test...")
+    timer = Timer(start_now=True)
+
+    arrival_times = get_arrival_times(
+        len(tasks), arrival_rate, arrival_process, arrival_seed
+    )
+    response_times = np.full(len(tasks), np.nan)
+
+    if backend == PIPELINE_ASYNC:
+        executor = ProcessPoolExecutor(max_workers=pool_size)
+        # Start the workers before the first arrival, so that their startup is not counted
+        # as queueing in the response times
+        list(executor.map(int, range(pool_size)))
+        init_runtime = timer.get_duration()
+        collect_timer = Timer(start_now=True)
+
+        task_samples = asyncio.run(
+            run_async_tasks(
+                tasks,
+                executor,
+                async_concurrency or pool_size,
+                seeds,
+                arrival_times,
+                response_times,
+            )
+        )
+        work_runtime = collect_timer.get_duration()
+        executor.shutdown()
+        tasks_in_main_process = False
+        dispatch_metrics = {}
+        fault_metrics = {}
+        task_profiles = None
+    else:
+        if easy_pool is not None:
+            easy_pool.chunksize = 1
+            easy_pool.transport = transport
+            easy_pool.retention = retention
+            easy_pool.max_in_flight = None
+            easy_pool.schedule = SCHEDULE_FIFO
+            easy_pool.profiler = profiler
+            easy_pool.reset_stats()
+            easy_pool.close_registry()
+        else:
+            easy_pool = EasyPool(
+                pool_size=pool_size,
+                transport=transport,
+                backend=backend,
+                retention=retention,
+                thread_limit=thread_limit,
+                placement=placement,
+                fault_policy=fault_policy,
+                profiler=profiler,
+            )
+        easy_pool.apply_thread_limits()
+
+        if task_payload == TASK_PAYLOAD_REGISTRY:
+            easy_pool.set_registry(TaskRegistry(tasks))
+
+        init_runtime = timer.get_duration()
+        collect_timer = Timer(start_now=True)
+
+        submit_tasks_open_loop(easy_pool, tasks, arrival_times, response_times, seeds)
+        easy_pool.restore_thread_limits()
+
+        work_runtime = collect_timer.get_duration()
+        task_samples = easy_pool.task_samples
+        dispatch_metrics = easy_pool.get_dispatch_metrics()
+        fault_metrics = easy_pool.get_fault_metrics()
+        task_profiles = easy_pool.task_profiles if profiler is not None else None
+        print_faults(print_prefix, easy_pool)
+        tasks_in_main_process = easy_pool.backend == BACKEND_THREAD
+        del easy_pool
+
+    print(f"{print_prefix} Work runtime: {collect_timer.get_duration_str()}")
+
+    task_runtimes = task_samples.get_runtimes()
+    avg_task_runtime = float(task_runtimes.mean()) if len(task_runtimes) > 0 else 0
+
+    print(f"{print_prefix} Total runtime: {timer.get_duration_str()}")
+    print()
+
+    total_runtime = timer.get_duration()
+
+    completed = ~np.isnan(response_times)
+    p50, p99 = percentiles(response_times[completed], [50, SLO_PERCENTILE])
+    metrics = {
+        "offered_rate": arrival_rate,
+        "achieved_rate": (
+            int(completed.sum()) / work_runtime if work_runtime > 0 else 0
+        ),
+        "response_p50_runtime": p50,
+        "response_p99_runtime": p99,
+        **dispatch_metrics,
+        **fault_metrics,
+        "task_samples": task_samples,
+        "cpu_task_runtime": task_samples.get_cpu_time_sum(),
+    }
+    if latency_slo is not None:
+        # Failed tasks have a NaN response time, which counts as over the SLO
+        metrics["slo_violation_ratio"] = float(
+            np.mean(~(response_times <= latency_slo))
+        )
+        if arrival_process == ARRIVAL_RAMP:
+            metrics["slo_knee_rate"] = get_ramp_slo_rate(
+                arrival_times, response_times, arrival_rate, latency_slo
+            )
+
+    if task_profiles is not None:
+        metrics["task_profiles"] = task_profiles
+
+    if not tasks_in_main_process and backend != PIPELINE_ASYNC:
+        metrics["cpu_main_runtime"] = timer.get_cpu_duration()
+
+    return init_runtime, work_runtime, avg_task_runtime, total_runtime, metrics
+
+
+def submit_tasks_open_loop(
+    easy_pool: EasyPool,
+    tasks: list[tuple[callable, list]],
+    arrival_times: np.ndarray,
+    response_times: np.ndarray,
+    seeds: list[int] = None,
+):
+    """
+    Add every task to the pool at its arrival time and collect the results in between,
+    writing the time from the arrival to the result of every task into response_times.
+    Arrival times that have passed while the main process was busy are caught up on at once,
+    and still count from their scheduled time. With a task registry set on the pool the
+    tasks are added as registered tasks. Tasks the pool gave up on get no response time.
+    """
+    start_time = Timer.now()
+    next_index = 0
+    received = 0
+
+    while received + easy_pool.failed_tasks < len(tasks):
+        now = Timer.now() - start_time
+        while next_index < len(tasks) and arrival_times[next_index] <= now:
+            seed = seeds[next_index] if seeds is not None else None
+            if easy_pool.registry is not None:
+                easy_pool.add_registered_task(next_index, seed)
+            else:
+                task_func, task_args = tasks[next_index]
+                easy_pool.add_task(
+                    next_index, task_func, task_args + [next_index], seed
+                )
+            next_index += 1
+
+        wait = None
+        if next_index < len(tasks):
+            wait = max(arrival_times[next_index] - (Timer.now() - start_time), 0)
+
+        for index, _, _ in easy_pool.poll_results(wait):
+            response_times[index] = Timer.now() - start_time - arrival_times[index]
+            received += 1
+
+
+def get_ramp_slo_rate(
+    arrival_times: np.ndarray,
+    response_times: np.ndarray,
+    arrival_rate: float,
+    latency_slo: float,
+) -> float:
+    """
+    Get the arrival rate of a ramp from which on the p99 response time of a sliding window of
+    tasks stayed past the SLO, or the peak rate if it ended within the SLO. Windows over the
+    SLO that are followed by ones within it, e.g. while the workers start, are not counted.
+    Failed tasks (without a response time) are left out of the windows.
+    """
+    window = max(SLO_WINDOW_MIN_TASKS, len(arrival_times) // 20)
+    if len(arrival_times) < window:
+        return arrival_rate
+
+    duration = get_ramp_duration(len(arrival_times), arrival_rate)
+    knee_start = None
+    for start in range(0, len(arrival_times) - window + 1, max(window // 4, 1)):
+        window_p99 = np.nanpercentile(
+            response_times[start : start + window], SLO_PERCENTILE
+        )
+        if window_p99 <= latency_slo:
+            knee_start = None
+        elif knee_start is None:
+            knee_start = start
+
+    if knee_start is None:
+        return arrival_rate
+    return float(arrival_rate * arrival_times[knee_start] / duration)
+
+
+def get_rate_groups(runners: dict[str, Runner]) -> dict[str, list[Runner]]:
+    """
+    Group the open-loop runners by configuration, with the runners of every compared
+    arrival rate ordered by rate.
+    """
+    groups: dict[str, list[Runner]] = {}
+    for runner in runners.values():
+        if runner.arrival_rate is None:
+            continue
+        name = runner.name.replace(f"_rate_{runner.arrival_rate}", "")
+        groups.setdefault(name, []).append(runner)
+
+    for group in groups.values():
+        group.sort(key=lambda x: x.arrival_rate)
+    return groups
+
+
+def add_slo_rates(runners: dict[str, Runner], latency_slo: float):
+    """
+    Find for every configuration the highest compared arrival rate up to which the p99
+    response time met the latency SLO, and the first rate that missed it. Both are added to
+    the metrics of all runners of the configuration, a ramp has its knee rate instead.
+    """
+    for group in get_rate_groups(runners).values():
+        if "slo_knee_rate" in group[0].metrics:
+            continue
+
+        met: Runner = None
+        missed: Runner = None
+        for runner in group:
+            if runner.get_avg_metric("response_p99_runtime") > latency_slo:
+                missed = runner
+                break
+            met = runner
+
+        for runner in group:
+            if met is not None:
+                runner.metrics["slo_met_rate"] = [met.arrival_rate]
+            if missed is not None:
+                runner.metrics["slo_missed_rate"] = [missed.arrival_rate]
+
+
+def print_slo_summary(runners: dict[str, Runner], latency_slo: float):
+    """
+    Print the SLO rates of every configuration, see add_slo_rates.
+    """
+    print(f"Open-loop: p{SLO_PERCENTILE} response time SLO of {latency_slo}s")
+    for name, group in get_rate_groups(runners).items():
+        if "slo_knee_rate" in group[0].metrics:
+            knee_rate = min(runner.get_avg_metric("slo_knee_rate") for runner in group)
+            print(f"{name}: the ramp crossed the SLO at {round(knee_rate, 3)} tasks/s")
+            continue
+
+        met, missed = None, None
+        for runner in group:
+            if runner.arrival_rate == runner.get_avg_metric("slo_met_rate"):
+                met = runner
+            if runner.arrival_rate == runner.get_avg_metric("slo_missed_rate"):
+                missed = runner
+
+        if met is None:
+            print(
+                f"{name}: SLO missed from the lowest rate, {missed.arrival_rate} tasks/s"
+            )
+            continue
+
+        summary = (
+            f"{name}: SLO met up to {met.arrival_rate} tasks/s "
+            f"(achieved {round(met.get_avg_metric('achieved_rate'), 3)} tasks/s)"
+        )
+        if missed is not None:
+            summary = f"{summary}, missed at {missed.arrival_rate} tasks/s"
+        print(summary)
+    print()
@@ -1,9 +1,14 @@
 from dataclasses import dataclass
 from multiprocessing import Pool
-from typing import Any, Callable, Generic, TypeVar
-
-from easy_pool.easy_pool import EasyPool
-from util.math import avg_float
+from typing import Any, Callable, Generic, TypeVar, Union
+
+from easy_pool.backends import BACKEND_POOL, BACKEND_THREAD
+from easy_pool.easy_pool import RETENTION_KEEP, EasyPool
+from easy_pool.faults import FaultPolicy
+from easy_pool.placement import PLACEMENT_NONE
+from easy_pool.registry import TASK_PAYLOAD_INLINE, TASK_PAYLOAD_REGISTRY, TaskRegistry
+from easy_pool.scheduler import SCHEDULE_FIFO
+from easy_pool.shared_memory import TRANSPORT_PICKLE
 from util.timer import Timer
 
 T = TypeVar("T")
@@ -26,43 +31,166 @@ def process_indexed_task(task: IndexedTask[Any, Any]) -> tuple[int, Any, float]:
 def pool_test_pipeline(
     pool_size: int,
     tasks: list[tuple[callable, list]],
-) -> tuple[float, float, float, float]:
+    chunksize: Union[int, str] = 1,
+    easy_pool: EasyPool = None,
+    transport: str = TRANSPORT_PICKLE,
+    backend: str = BACKEND_POOL,
+    retention: str = RETENTION_KEEP,
+    max_in_flight: int = None,
+    seeds: list[int] = None,
+    schedule: str = SCHEDULE_FIFO,
+    costs: list[float] = None,
+    thread_limit: int = None,
+    placement: str = PLACEMENT_NONE,
+    task_payload: str = TASK_PAYLOAD_INLINE,
+    fault_policy: FaultPolicy = None,
+    profiler: str = None,
+) -> tuple[float, float, float, float, dict[str, float]]:
     """
     Executes a test pipeline using a pool of workers to process tasks.
     Args:
         pool_size (int): The number of workers in the pool.
         tasks (list[tuple[callable, list]]): A list of tasks, where each task is represented
                                              as a tuple containing a callable and a list of arguments.
+        chunksize (int | str, optional): How many tasks to dispatch to a worker per call, or "auto".
+        easy_pool (EasyPool, optional): An already running pool to reuse. It is left running
+                                        afterwards, so its startup is not part of the runtimes.
+        transport (str, optional): How numpy arrays are passed to and from the workers,
+                                   "pickle" or "shared_memory".
+        backend (str, optional): What provides the workers, "pool", "process", "thread"
+                                 or "interpreter". Ignored when easy_pool is given.
+        retention (str, optional): What the workers return of each result, "keep", "discard"
+                                   or "digest" (a checksum).
+        max_in_flight (int, optional): The maximum number of tasks dispatched but not yet
+                                       collected. Task creation blocks while it is reached.
+        seeds (list[int], optional): A random seed for every task.
+        schedule (str, optional): How the tasks are handed to the workers, "fifo",
+                                  "longest_first" or "work_stealing".
+        costs (list[float], optional): The estimated cost of every task, for the schedules
+                                       that order the tasks by cost.
+        thread_limit (int, optional): The maximum number of BLAS/OpenMP and OpenCV threads
+                                      per worker. Ignored when easy_pool is given.
+        placement (str, optional): Which CPUs the workers are pinned to, "none", "compact",
+                                   "scatter" or "numa". Ignored when easy_pool is given.
+        task_payload (str, optional): What is sent to the workers per task, "inline" (the
+                                      function and arguments) or "registry" (the ids of the
+                                      function and arguments in a task table sent once).
+        fault_policy (FaultPolicy, optional): The task timeout, retries and worker recycling.
+                                              Ignored when easy_pool is given.
+        profiler (str, optional): What is captured around every task, "cprofile",
+                                  "sampling" or "tracemalloc".
     Returns:
-        A tuple of floats containing the following values:
+        A tuple containing the following values:
         - The runtime for task creation.
         - The runtime for waiting for all tasks to complete.
         - The average runtime of each task.
         - The total runtime of the test.
+        - A dict of additional metrics: the time until the first result arrived, the average
+          time results wait behind earlier tasks when collected in submission order (head-of-line
+          blocking), the time task creation was blocked by the in-flight window, the CPU time
+          of the tasks and of the main process outside of them, the makespan (first task added
+          to last result) and its ratio to the lower bound of any schedule, the main process
+          time and pickled bytes of dispatching every task, the failed, retried and timed
+          out tasks and lost workers, and the per-task samples. With a profiler also the
+          profiles of the tasks.
     """
 
-    print_prefix = f"Pool test pipeline: Pool size={pool_size} |"
+    print_prefix = (
+        f"Pool test pipeline: Backend={backend}, Pool size={pool_size}, "
+        f"Chunk size={chunksize}, "
+        f"Transport={transport}, "
+        f"Schedule={schedule}, "
+        f"Thread limit={thread_limit}, "
+        f"Placement={placement}, "
+        f"Task payload={task_payload} |"
+    )
     print(f"{print_prefix} Starting test...")
     timer = Timer(start_now=True)
 
-    easy_pool = EasyPool(pool_size=pool_size)
-
-    for index, task_tuple in enumerate(tasks):
-        task_func, task_args = task_tuple
-        task_args_with_index = task_args + [index]
-        easy_pool.add_task(index, task_func, task_args_with_index)
+    if easy_pool is not None:
+        easy_pool.chunksize = chunksize
+        easy_pool.transport = transport
+        easy_pool.retention = retention
+        easy_pool.max_in_flight = max_in_flight
+        easy_pool.schedule = schedule
+        easy_pool.profiler = profiler
+        easy_pool.reset_stats()
+        easy_pool.close_registry()
+    else:
+        easy_pool = EasyPool(
+            pool_size=pool_size,
+            chunksize=chunksize,
+            transport=transport,
+            backend=backend,
+            retention=retention,
+            max_in_flight=max_in_flight,
+            schedule=schedule,
+            thread_limit=thread_limit,
+            placement=placement,
+            fault_policy=fault_policy,
+            profiler=profiler,
+        )
+    easy_pool.apply_thread_limits()
+
+    if task_payload == TASK_PAYLOAD_REGISTRY:
+        easy_pool.set_registry(TaskRegistry(tasks))
+        for index in range(len(tasks)):
+            easy_pool.add_registered_task(
+                index,
+                seeds[index] if seeds is not None else None,
+                costs[index] if costs is not None else None,
+            )
+    else:
+        for index, task_tuple in enumerate(tasks):
+            task_func, task_args = task_tuple
+            task_args_with_index = task_args + [index]
+            easy_pool.add_task(
+                index,
+                task_func,
+                task_args_with_index,
+                seeds[index] if seeds is not None else None,
+                costs[index] if costs is not None else None,
+            )
 
     print(f"{print_prefix} Task creation runtime: {timer.get_duration_str()}")
 
     init_runtime = timer.get_duration()
     collect_timer = Timer(start_now=True)
 
-    # Blocking until all tasks are done
-    results = easy_pool.get_results()
+    # Blocking until all tasks are done, results are processed in completion order
+    # and not kept around
+    task_runtime_sum = 0.0
+    result_count = 0
+    for _, _, runtime in easy_pool.iter_results():
+        task_runtime_sum += runtime
+        result_count += 1
+    easy_pool.restore_thread_limits()
+
     print(f"{print_prefix} Work runtime: {collect_timer.get_duration_str()}")
     work_runtime = collect_timer.get_duration()
 
-    avg_task_runtime = avg_float([runtime for _, _, runtime in results])
+    avg_task_runtime = task_runtime_sum / result_count if result_count > 0 else 0
+    print_faults(print_prefix, easy_pool)
+
+    task_samples = easy_pool.task_samples
+    makespan_runtime = easy_pool.get_makespan()
+    makespan_lower_bound = task_samples.get_makespan_lower_bound(pool_size)
+    metrics = {
+        "first_result_runtime": easy_pool.first_result_runtime,
+        "hol_blocking_runtime": easy_pool.head_of_line.get_avg_delay(),
+        "submit_blocked_runtime": easy_pool.submit_blocked_runtime,
+        "makespan_runtime": makespan_runtime,
+        "makespan_ratio": (
+            makespan_runtime / makespan_lower_bound if makespan_lower_bound > 0 else 0
+        ),
+        **easy_pool.get_dispatch_metrics(),
+        **easy_pool.get_fault_metrics(),
+        "task_samples": task_samples,
+    }
+    if profiler is not None:
+        metrics["task_profiles"] = easy_pool.task_profiles
+    # Thread workers run inside the main process, their CPU time is not overhead
+    tasks_in_main_process = easy_pool.backend == BACKEND_THREAD
 
     del easy_pool
 
@@ -71,4 +199,24 @@ def pool_test_pipeline(
 
     total_runtime = timer.get_duration()
 
-    return init_runtime, work_runtime, avg_task_runtime, total_runtime
+    metrics["cpu_task_runtime"] = task_samples.get_cpu_time_sum()
+    metrics["cpu_main_runtime"] = timer.get_cpu_duration()
+    if tasks_in_main_process:
+        metrics["cpu_main_runtime"] -= metrics["cpu_task_runtime"]
+
+    return init_runtime, work_runtime, avg_task_runtime, total_runtime, metrics
+
+
+def print_faults(print_prefix: str, easy_pool: EasyPool):
+    """
+    Print how many tasks failed, were retried or timed out, if any, with the last error.
+    """
+    faults = easy_pool.get_fault_metrics()
+    if sum(faults.values()) == 0:
+        return
+
+    print(
+        f"{print_prefix} Faults: {faults['failed_tasks']} failed, "
+        f"{faults['retried_tasks']} retried, {faults['timed_out_tasks']} timed out, "
+        f"{faults['lost_workers']} workers lost. Last error: {easy_pool.last_error}"
+    )
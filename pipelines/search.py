@@ -0,0 +1,168 @@
+import math
+from typing import Callable
+
+from util.runner import Runner
+
+WORKERS_AUTO = "auto"
+
+# Passes every configuration gets before it is compared, the least a confidence
+# interval can be computed from
+SEARCH_MIN_ITERATIONS = 2
+
+
+class WorkerSearch:
+    """
+    Searches for the worker count with the highest tasks per second, instead of testing a
+    fixed list of worker counts.
+
+    A coarse sweep tests powers of two up to the maximum worker count. The search then
+    bisects the gaps next to the best worker count until its direct neighbours have been
+    tested, which finds the peak of a unimodal scaling curve. Every configuration gets a
+    minimum number of test passes. After that, more passes are only spent on configurations
+    whose 95% confidence interval of the tasks per second overlaps the one of the best
+    configuration, and the search stops early as soon as they all separate.
+    """
+
+    def __init__(
+        self,
+        create_runners: Callable[[int], dict[str, Runner]],
+        run_test_pass: Callable[[Runner], None],
+        max_workers: int,
+        max_iterations: int,
+    ):
+        """
+        Args:
+            create_runners (Callable[[int], dict[str, Runner]]): Creates the runners of a
+                worker count, one per compared backend, chunk size and transport.
+            run_test_pass (Callable[[Runner], None]): Runs a test pass of a runner.
+            max_workers (int): The highest worker count to consider.
+            max_iterations (int): The most test passes to run per configuration.
+        """
+        self.create_runners = create_runners
+        self.run_test_pass = run_test_pass
+        self.max_workers = max_workers
+        self.max_iterations = max(max_iterations, SEARCH_MIN_ITERATIONS)
+        self.runners: dict[str, Runner] = {}
+        self.tested_workers: set[int] = set()
+
+    def run(self) -> dict[str, Runner]:
+        """
+        Run the search.
+
+        Returns:
+            All runners that were tested, ordered by worker count, which makes up the
+            measured scaling curve.
+        """
+        # The sequential reference for the speedup
+        self.test_workers(0)
+
+        for num_workers in get_coarse_worker_counts(self.max_workers):
+            self.test_workers(num_workers)
+
+        while True:
+            best = self.get_best()
+            self.refine()
+            self.settle()
+            if self.get_best() is best:
+                break
+
+        self.get_best().recommended = True
+        self.print_result()
+        return dict(sorted(self.runners.items(), key=lambda x: x[1].workers))
+
+    def test_workers(self, num_workers: int):
+        print(f"Worker search: Testing {num_workers} workers")
+        print()
+
+        runners = self.create_runners(num_workers)
+        self.runners.update(runners)
+        self.tested_workers.add(num_workers)
+
+        for _ in range(SEARCH_MIN_ITERATIONS):
+            for runner in runners.values():
+                self.run_test_pass(runner)
+
+    def refine(self):
+        """
+        Test the untested worker counts halfway to the closest tested ones around the best
+        configuration, until there are no gaps next to it.
+        """
+        while True:
+            num_workers = self.get_best().workers
+            lower = max([x for x in self.tested_workers if 0 < x < num_workers] or [0])
+            upper = min(
+                [x for x in self.tested_workers if x > num_workers]
+                or [self.max_workers + 1]
+            )
+
+            candidates = set()
+            if num_workers - lower > 1:
+                candidates.add((lower + num_workers) // 2)
+            if upper - num_workers > 1:
+                candidates.add(math.ceil((num_workers + upper) / 2))
+
+            if len(candidates) == 0:
+                return
+
+            for candidate in sorted(candidates):
+                self.test_workers(candidate)
+
+    def settle(self):
+        """
+        Run more test passes on the configurations that can not be told apart from the best
+        one yet, until the confidence intervals separate or the iterations are used up.
+        """
+        while True:
+            best = self.get_best()
+            contenders = [
+                runner
+                for runner in self.get_parallel_runners()
+                if len(runner.runtimes) < self.max_iterations
+                and intervals_overlap(runner, best)
+            ]
+
+            # The best configuration alone is not a contest
+            if len(contenders) == 0 or contenders == [best]:
+                return
+
+            for runner in contenders:
+                self.run_test_pass(runner)
+
+    def get_parallel_runners(self) -> list[Runner]:
+        return [runner for runner in self.runners.values() if runner.workers > 0]
+
+    def get_best(self) -> Runner:
+        return max(self.get_parallel_runners(), key=lambda x: x.get_tasks_per_second())
+
+    def print_result(self):
+        print("Worker search: Measured scaling curve")
+        for runner in sorted(self.runners.values(), key=lambda x: x.workers):
+            tps, ci = runner.get_tps_confidence_interval()
+            print(
+                f"{runner.name}: {round(tps, 3)} +/- {round(ci, 3)} tasks per second, {len(runner.runtimes)} passes"
+            )
+
+        best = self.get_best()
+        print(
+            f"Worker search: Recommended {best.workers} workers, chunk size {best.chunksize} ({best.name})"
+        )
+        print()
+
+
+def get_coarse_worker_counts(max_workers: int) -> list[int]:
+    """
+    Get the powers of two up to the maximum worker count, and the maximum itself.
+    """
+    worker_counts = []
+    num_workers = 1
+    while num_workers < max_workers:
+        worker_counts.append(num_workers)
+        num_workers *= 2
+    worker_counts.append(max_workers)
+    return worker_counts
+
+
+def intervals_overlap(runner: Runner, other: Runner) -> bool:
+    tps, ci = runner.get_tps_confidence_interval()
+    other_tps, other_ci = other.get_tps_confidence_interval()
+    return abs(tps - other_tps) <= ci + other_ci
@@ -1,28 +1,54 @@
+import os
+
+from util.generator import seed_random_generators
+from util.profiler import TaskProfiles, run_profiled
+from util.samples import TaskSamples
 from util.timer import Timer
 
 
 def sequential_test_pipeline(
-    tasks: list[tuple[callable, list]]
-) -> tuple[float, float, float, float]:
+    tasks: list[tuple[callable, list]], seeds: list[int] = None, profiler: str = None
+) -> tuple[float, float, float, float, dict[str, TaskSamples]]:
     """
     Executes a test pipeline processing tasks sequentially.
     Args:
         tasks (list[tuple[callable, list]]): A list of tasks, where each task is represented
                                              as a tuple containing a callable and a list of arguments.
+        seeds (list[int], optional): A random seed for every task.
+        profiler (str, optional): What is captured around every task, "cprofile",
+                                  "sampling" or "tracemalloc".
     Returns:
-        A tuple of floats containing the following values:
+        A tuple containing the following values:
         - The runtime for task creation.
         - The runtime for waiting for all tasks to complete.
         - The average runtime of each task.
         - The total runtime of the test.
+        - A dict with the CPU time of the tasks and of the main process outside of them, and
+          the per-task samples. All tasks count as submitted when the test starts, so the queue
+          wait of a task is the time spent on the tasks before it. With a profiler also the
+          profiles of the tasks.
     """
     print(f"Sequential test pipeline: Starting test...")
     timer = Timer(start_now=True)
+    task_samples = TaskSamples()
+    task_profiles = TaskProfiles(profiler)
 
     for index, task_tuple in enumerate(tasks):
         task_func, task_args = task_tuple
         task_args_with_index = task_args + [index]
-        res = task_func(*task_args_with_index)
+        if seeds is not None:
+            seed_random_generators(seeds[index])
+
+        task_timer = Timer(start_now=True)
+        queue_wait = task_timer.start_time - timer.start_time
+        if profiler is not None:
+            res, profile = run_profiled(profiler, task_func, task_args_with_index)
+            task_profiles.add(task_func.__name__, os.getpid(), profile)
+        else:
+            res = task_func(*task_args_with_index)
+        task_samples.add(
+            index, task_timer.get_duration(), queue_wait, task_timer.get_cpu_duration()
+        )
 
     total_runtime = timer.get_duration()
     avg_task_runtime = total_runtime / len(tasks)
@@ -30,4 +56,18 @@ def sequential_test_pipeline(
     print(f"Sequential test pipeline: Total runtime: {timer.get_duration_str()}")
     print()
 
-    return (0, total_runtime, avg_task_runtime, total_runtime)
+    metrics = {
+        "task_samples": task_samples,
+        "cpu_task_runtime": task_samples.get_cpu_time_sum(),
+        "cpu_main_runtime": timer.get_cpu_duration() - task_samples.get_cpu_time_sum(),
+    }
+    if profiler is not None:
+        metrics["task_profiles"] = task_profiles
+
+    return (
+        0,
+        total_runtime,
+        avg_task_runtime,
+        total_runtime,
+        metrics,
+    )
@@ -0,0 +1,205 @@
+import importlib
+from typing import Callable, Optional
+
+
+from easy_pool.backends import BACKEND_POOL, BACKEND_THREAD
+from easy_pool.easy_pool import RETENTION_KEEP, EasyPool
+from easy_pool.faults import FaultPolicy
+from easy_pool.placement import PLACEMENT_NONE
+from easy_pool.shared_memory import TRANSPORT_PICKLE
+from pipelines.pool import print_faults
+from util.generator import get_numpy_random, seed_random_generators
+from util.samples import TaskSamples
+from util.timer import Timer
+
+PIPELINE_SPLIT = "split"
+
+# Tasks that have a data-parallel version, which partitions a single task across the
+# workers. The data-parallel version takes a function to run the parts on the workers and
+# the number of parts before the task's own arguments. Both are looked up by name in the
+# module of the task, so that no task module is imported before it is used.
+SPLIT_TASK_FUNCS = {
+    "summing_task": "split_summing_task",
+    "multiplication_task": "split_multiplication_task",
+    "sorting_task": "split_sorting_task",
+    "tensor_task": "split_tensor_task",
+    "img_manipulation_task": "split_img_manipulation_task",
+}
+
+
+class PartFailedError(Exception):
+    """
+    Raised by the map function of a data-parallel task when the pool gave up on a part.
+    """
+
+
+def get_split_task_func(task_func: callable) -> Optional[Callable]:
+    """
+    The data-parallel version of a task, None if it has none.
+    """
+    split_name = SPLIT_TASK_FUNCS.get(getattr(task_func, "__name__", None))
+    if split_name is None:
+        return None
+    return getattr(importlib.import_module(task_func.__module__), split_name, None)
+
+
+def split_test_pipeline(
+    pool_size: int,
+    tasks: list[tuple[callable, list]],
+    easy_pool: EasyPool = None,
+    backend: str = BACKEND_POOL,
+    seeds: list[int] = None,
+    thread_limit: int = None,
+    placement: str = PLACEMENT_NONE,
+    fault_policy: FaultPolicy = None,
+    profiler: str = None,
+) -> tuple[float, float, float, float, dict]:
+    """
+    Executes a test pipeline that runs the tasks one after another, each partitioned across
+    all workers of a pool, to measure strong scaling of a fixed problem size.
+    Args:
+        pool_size (int): The number of workers in the pool, and parts per task.
+        tasks (list[tuple[callable, list]]): A list of tasks, where each task is represented
+                                             as a tuple containing a callable and a list of arguments.
+                                             Every callable must have a data-parallel
+                                             version, see get_split_task_func.
+        easy_pool (EasyPool, optional): An already running pool to reuse. It is left running
+                                        afterwards, so its startup is not part of the runtimes.
+        backend (str, optional): What provides the workers, "pool", "process", "thread"
+                                 or "interpreter". Ignored when easy_pool is given.
+        seeds (list[int], optional): A random seed for every task. The main process is seeded
+                                     with it and draws the seeds of the parts.
+        thread_limit (int, optional): The maximum number of BLAS/OpenMP and OpenCV threads
+                                      per worker. Ignored when easy_pool is given.
+        placement (str, optional): Which CPUs the workers are pinned to, "none", "compact",
+                                   "scatter" or "numa". Ignored when easy_pool is given.
+        fault_policy (FaultPolicy, optional): The task timeout, retries and worker recycling
+                                              of the parts. Ignored when easy_pool is given.
+        profiler (str, optional): What is captured around every part, "cprofile",
+                                  "sampling" or "tracemalloc". The partitioning and merging
+                                  in the main process are not profiled.
+    Returns:
+        A tuple containing the following values:
+        - The runtime for starting the pool.
+        - The runtime for running all tasks.
+        - The average runtime of each task.
+        - The total runtime of the test.
+        - A dict with the CPU time of the parts on the workers and of the main process
+          (partitioning and merging), the faults of the parts and the per-task samples. A
+          task's queue wait is the time spent on the tasks before it, and its CPU time is
+          that of its parts. A task fails if the pool gave up on any of its parts, the failed
+          tasks replace the failed parts in the faults. With a profiler also the profiles of
+          the parts, by the function that ran them.
+    """
+    print_prefix = (
+        f"Split test pipeline: Backend={backend}, Pool size={pool_size}, "
+        f"Thread limit={thread_limit}, "
+        f"Placement={placement} |"
+    )
+    print(f"{print_prefix} Starting test...")
+    timer = Timer(start_now=True)
+
+    if easy_pool is not None:
+        easy_pool.chunksize = 1
+        easy_pool.transport = TRANSPORT_PICKLE
+        easy_pool.retention = RETENTION_KEEP
+        easy_pool.max_in_flight = None
+        easy_pool.profiler = profiler
+        easy_pool.reset_stats()
+    else:
+        easy_pool = EasyPool(
+            pool_size=pool_size,
+            backend=backend,
+            thread_limit=thread_limit,
+            placement=placement,
+            fault_policy=fault_policy,
+            profiler=profiler,
+        )
+    easy_pool.apply_thread_limits()
+
+    print(f"{print_prefix} Pool creation runtime: {timer.get_duration_str()}")
+
+    init_runtime = timer.get_duration()
+    collect_timer = Timer(start_now=True)
+
+    map_parts = get_map_parts(easy_pool, seeds is not None)
+    task_samples = TaskSamples()
+    failed_tasks = 0
+
+    for index, (task_func, task_args) in enumerate(tasks):
+        task_timer = Timer(start_now=True)
+        parts_cpu_time = easy_pool.task_samples.get_cpu_time_sum()
+        if seeds is not None:
+            seed_random_generators(seeds[index])
+
+        try:
+            get_split_task_func(task_func)(map_parts, pool_size, *task_args, index)
+        except PartFailedError:
+            failed_tasks += 1
+            continue
+
+        task_samples.add(
+            index,
+            task_timer.get_duration(),
+            task_timer.start_time - collect_timer.start_time,
+            easy_pool.task_samples.get_cpu_time_sum() - parts_cpu_time,
+        )
+    easy_pool.restore_thread_limits()
+
+    print(f"{print_prefix} Work runtime: {collect_timer.get_duration_str()}")
+    work_runtime = collect_timer.get_duration()
+
+    avg_task_runtime = work_runtime / len(tasks)
+    print_faults(print_prefix, easy_pool)
+    fault_metrics = {**easy_pool.get_fault_metrics(), "failed_tasks": failed_tasks}
+    task_profiles = easy_pool.task_profiles
+
+    cpu_task_runtime = easy_pool.task_samples.get_cpu_time_sum()
+    # Thread workers run inside the main process, their CPU time is not overhead
+    tasks_in_main_process = easy_pool.backend == BACKEND_THREAD
+
+    del easy_pool
+
+    print(f"{print_prefix} Total runtime: {timer.get_duration_str()}")
+    print()
+
+    total_runtime = timer.get_duration()
+
+    cpu_main_runtime = timer.get_cpu_duration()
+    if tasks_in_main_process:
+        cpu_main_runtime -= cpu_task_runtime
+
+    metrics = {
+        "task_samples": task_samples,
+        "cpu_task_runtime": cpu_task_runtime,
+        "cpu_main_runtime": cpu_main_runtime,
+        **fault_metrics,
+    }
+    if profiler is not None:
+        metrics["task_profiles"] = task_profiles
+
+    return init_runtime, work_runtime, avg_task_runtime, total_runtime, metrics
+
+
+def get_map_parts(
+    easy_pool: EasyPool, seeded: bool = False
+) -> Callable[[Callable, list[list]], list]:
+    """
+    Get a function that runs a function for every list of arguments on the pool and returns
+    the results in order. When seeded, every part gets a seed drawn from the numpy generator
+    of the task. Raises a PartFailedError if the pool gave up on a part.
+    """
+
+    def map_parts(func: Callable, parts_args: list[list]) -> list:
+        for index, args in enumerate(parts_args):
+            seed = None
+            if seeded:
+                seed = int(get_numpy_random().integers(2**32))
+            easy_pool.add_task(index, func, args, seed)
+        failed_parts = easy_pool.failed_tasks
+        results = [result for _, result, _ in easy_pool.get_results()]
+        if easy_pool.failed_tasks > failed_parts:
+            raise PartFailedError(easy_pool.last_error)
+        return results
+
+    return map_parts
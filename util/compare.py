@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+
+from util.math import avg_float, confidence_interval_95, get_t_critical_95, welch_t_test
+from util.result_store import ResultStore, StoredRun
+
+# How many earlier runs make up the rolling baseline when no baseline run is given
+DEFAULT_BASELINE_WINDOW = 5
+
+
+@dataclass
+class RunnerComparison:
+    name: str
+    baseline_tps: float
+    baseline_ci: float
+    tps: float
+    ci: float
+    significant: bool
+
+    def get_change(self) -> float:
+        if self.baseline_tps == 0:
+            return 0
+        return self.tps / self.baseline_tps - 1
+
+    def is_regression(self, min_change: float = 0.0) -> bool:
+        return self.significant and self.get_change() < -min_change
+
+
+def compare_runs(
+    store: ResultStore,
+    run: StoredRun,
+    baseline_runs: list[StoredRun],
+) -> list[RunnerComparison]:
+    """
+    Compare the tasks per second of every runner of a run against the runners of the same
+    name in the baseline runs.
+
+    The tasks per second of every iteration of the baseline runs are pooled, and a difference
+    counts as significant when Welch's t-test rejects equal means at the 95% level. Runners
+    need at least two iterations on both sides to be tested.
+    """
+    baseline_runners = [store.get_runners(baseline.id) for baseline in baseline_runs]
+
+    comparisons = []
+    for name, runner in store.get_runners(run.id).items():
+        baseline_tps_values = []
+        for runners in baseline_runners:
+            baseline = runners.get(name)
+            if (
+                baseline is not None
+                and baseline.task_details == runner.task_details
+                and baseline.task_count == runner.task_count
+            ):
+                baseline_tps_values.extend(baseline.get_tps_values())
+
+        tps_values = runner.get_tps_values()
+        if len(baseline_tps_values) == 0 or len(tps_values) == 0:
+            continue
+
+        t, degrees_of_freedom = welch_t_test(tps_values, baseline_tps_values)
+        comparisons.append(
+            RunnerComparison(
+                name=name,
+                baseline_tps=avg_float(baseline_tps_values),
+                baseline_ci=confidence_interval_95(baseline_tps_values),
+                tps=avg_float(tps_values),
+                ci=confidence_interval_95(tps_values),
+                significant=degrees_of_freedom > 0
+                and abs(t) > get_t_critical_95(degrees_of_freedom),
+            )
+        )
+
+    return comparisons
+
+
+def print_comparisons(comparisons: list[RunnerComparison], min_change: float = 0.0):
+    for comparison in comparisons:
+        if comparison.is_regression(min_change):
+            verdict = "REGRESSION"
+        elif comparison.significant and comparison.get_change() > min_change:
+            verdict = "improvement"
+        else:
+            verdict = "no significant change"
+
+        print(
+            f"{comparison.name}: {round(comparison.baseline_tps, 3)} +/- {round(comparison.baseline_ci, 3)} -> "
+            f"{round(comparison.tps, 3)} +/- {round(comparison.ci, 3)} tasks per second "
+            f"({comparison.get_change():+.1%}), {verdict}"
+        )
+    print()
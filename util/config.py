@@ -1,6 +1,32 @@
 import json
 import multiprocessing
 import sys
+from typing import Union
+
+from easy_pool.backends import (
+    BACKEND_DISTRIBUTED,
+    BACKEND_INTERPRETER,
+    BACKEND_POOL,
+    BACKEND_THREAD,
+    get_available_backends,
+)
+from easy_pool.distributed import parse_address, set_agents
+from easy_pool.easy_pool import CHUNKSIZE_AUTO, RETENTION_KEEP, RETENTIONS
+from easy_pool.placement import PLACEMENT_NONE, PLACEMENTS, is_placement_supported
+from easy_pool.registry import TASK_PAYLOAD_INLINE, TASK_PAYLOAD_REGISTRY, TASK_PAYLOADS
+from easy_pool.scheduler import SCHEDULE_FIFO, SCHEDULES
+from easy_pool.shared_memory import (
+    TRANSPORT_PICKLE,
+    TRANSPORT_SHARED_MEMORY,
+    TRANSPORTS,
+)
+from easy_pool.threads import THREAD_POLICIES, THREADS_UNLIMITED
+from pipelines.asynchronous import PIPELINE_ASYNC
+from pipelines.open_loop import ARRIVAL_CONSTANT, ARRIVAL_PROCESSES
+from pipelines.search import WORKERS_AUTO
+from util.profiler import PROFILER_SAMPLING, PROFILERS
+from util.result_store import DEFAULT_RESULT_STORE
+from work_wrapper.task_cost import COST_MODEL_PARAMS, COST_MODELS
 
 
 class RuntimeConfig:
@@ -10,11 +36,37 @@ class RuntimeConfig:
         task: str,
         task_args: list,
         task_count: int,
-        workers: list[int],
+        workers: Union[list[int], str],
         wait_time_after_runner: float = None,
         wait_time_after_iteration: float = None,
         gc_after_iteration: bool = False,
         multiprocessing_start_method: str = None,
+        chunksize: Union[int, str, list[Union[int, str]]] = 1,
+        persistent_pool: bool = False,
+        transport: Union[str, list[str]] = TRANSPORT_PICKLE,
+        backend: Union[str, list[str]] = BACKEND_POOL,
+        async_concurrency: int = None,
+        result_retention: str = RETENTION_KEEP,
+        max_in_flight: int = None,
+        resource_sample_interval: float = None,
+        max_workers: int = None,
+        data_parallel: bool = False,
+        seed: int = None,
+        task_plan: str = None,
+        schedule: Union[str, list[str]] = SCHEDULE_FIFO,
+        cost_model: str = COST_MODEL_PARAMS,
+        result_store: str = DEFAULT_RESULT_STORE,
+        thread_policy: Union[str, list[str]] = THREADS_UNLIMITED,
+        placement: Union[str, list[str]] = PLACEMENT_NONE,
+        arrival_rate: Union[float, list[float]] = None,
+        arrival_process: str = ARRIVAL_CONSTANT,
+        latency_slo: float = None,
+        task_payload: Union[str, list[str]] = TASK_PAYLOAD_INLINE,
+        agents: list[str] = None,
+        task_timeout: float = None,
+        task_retries: int = 0,
+        max_tasks_per_child: int = None,
+        profiler: str = None,
     ):
         self.iterations = iterations
         self.task = task
@@ -25,6 +77,32 @@ class RuntimeConfig:
         self.wait_time_after_iteration = wait_time_after_iteration
         self.gc_after_iteration = gc_after_iteration
         self.multiprocessing_start_method = multiprocessing_start_method
+        self.chunksize = chunksize
+        self.persistent_pool = persistent_pool
+        self.transport = transport
+        self.backend = backend
+        self.async_concurrency = async_concurrency
+        self.result_retention = result_retention
+        self.max_in_flight = max_in_flight
+        self.resource_sample_interval = resource_sample_interval
+        self.max_workers = max_workers
+        self.data_parallel = data_parallel
+        self.seed = seed
+        self.task_plan = task_plan
+        self.schedule = schedule
+        self.cost_model = cost_model
+        self.result_store = result_store
+        self.thread_policy = thread_policy
+        self.placement = placement
+        self.arrival_rate = arrival_rate
+        self.arrival_process = arrival_process
+        self.latency_slo = latency_slo
+        self.task_payload = task_payload
+        self.agents = agents
+        self.task_timeout = task_timeout
+        self.task_retries = task_retries
+        self.max_tasks_per_child = max_tasks_per_child
+        self.profiler = profiler
 
 
 def load_runtime_config(config_file: str) -> RuntimeConfig:
@@ -59,6 +137,281 @@ def load_runtime_config(config_file: str) -> RuntimeConfig:
             print("Invalid wait time after runner: cannot be negative. Quitting...")
             sys.exit(1)
 
+    if isinstance(config.workers, str) and config.workers != WORKERS_AUTO:
+        print(
+            f"Invalid workers: {config.workers}. Must be a list of worker counts or '{WORKERS_AUTO}'. Quitting..."
+        )
+        sys.exit(1)
+
+    if config.max_workers is not None:
+        if config.max_workers < 1:
+            print("Invalid max workers: must be at least 1. Quitting...")
+            sys.exit(1)
+
+    # A single chunk size is treated as a sweep of one
+    if not isinstance(config.chunksize, list):
+        config.chunksize = [config.chunksize]
+
+    if len(config.chunksize) == 0:
+        print("Invalid chunk size: at least one value is required. Quitting...")
+        sys.exit(1)
+
+    for chunksize in config.chunksize:
+        if chunksize == CHUNKSIZE_AUTO:
+            continue
+        if not isinstance(chunksize, int) or chunksize < 1:
+            print(
+                f"Invalid chunk size: {chunksize}. Must be a positive integer or '{CHUNKSIZE_AUTO}'. Quitting..."
+            )
+            sys.exit(1)
+
+    if not isinstance(config.transport, list):
+        config.transport = [config.transport]
+
+    for transport in config.transport:
+        if transport not in TRANSPORTS:
+            print(
+                f"Invalid transport: {transport}. Must be one of {TRANSPORTS}. Quitting..."
+            )
+            sys.exit(1)
+
+    if not isinstance(config.backend, list):
+        config.backend = [config.backend]
+
+    available_backends = get_available_backends() + [PIPELINE_ASYNC]
+    for backend in config.backend:
+        if backend not in available_backends:
+            print(
+                f"Invalid or unsupported backend: {backend}. Available with this Python: {available_backends}. Quitting..."
+            )
+            sys.exit(1)
+
+    if config.data_parallel and PIPELINE_ASYNC in config.backend:
+        print(
+            f"Invalid backend: '{PIPELINE_ASYNC}' can not be used in data-parallel mode. Quitting..."
+        )
+        sys.exit(1)
+
+    if not isinstance(config.schedule, list):
+        config.schedule = [config.schedule]
+
+    for schedule in config.schedule:
+        if schedule not in SCHEDULES:
+            print(
+                f"Invalid schedule: {schedule}. Must be one of {SCHEDULES}. Quitting..."
+            )
+            sys.exit(1)
+
+    if not isinstance(config.thread_policy, list):
+        config.thread_policy = [config.thread_policy]
+
+    for thread_policy in config.thread_policy:
+        if thread_policy not in THREAD_POLICIES:
+            print(
+                f"Invalid thread policy: {thread_policy}. Must be one of {THREAD_POLICIES}. Quitting..."
+            )
+            sys.exit(1)
+
+    if not isinstance(config.placement, list):
+        config.placement = [config.placement]
+
+    for placement in config.placement:
+        if placement not in PLACEMENTS:
+            print(
+                f"Invalid placement: {placement}. Must be one of {PLACEMENTS}. Quitting..."
+            )
+            sys.exit(1)
+        if placement != PLACEMENT_NONE and not is_placement_supported():
+            print(
+                "Invalid placement: pinning workers to CPUs is only supported on Linux. Quitting..."
+            )
+            sys.exit(1)
+
+    if not isinstance(config.task_payload, list):
+        config.task_payload = [config.task_payload]
+
+    for task_payload in config.task_payload:
+        if task_payload not in TASK_PAYLOADS:
+            print(
+                f"Invalid task payload: {task_payload}. Must be one of {TASK_PAYLOADS}. Quitting..."
+            )
+            sys.exit(1)
+
+    if (
+        TASK_PAYLOAD_REGISTRY in config.task_payload
+        and BACKEND_INTERPRETER in config.backend
+    ):
+        print(
+            f"Invalid task payload: '{TASK_PAYLOAD_REGISTRY}' can not be used with the '{BACKEND_INTERPRETER}' backend. Quitting..."
+        )
+        sys.exit(1)
+
+    if BACKEND_DISTRIBUTED in config.backend:
+        if config.agents is None or len(config.agents) == 0:
+            print(
+                f"Invalid agents: the '{BACKEND_DISTRIBUTED}' backend needs at least one agent address. Quitting..."
+            )
+            sys.exit(1)
+
+        for agent in config.agents:
+            try:
+                parse_address(agent)
+            except ValueError as e:
+                print(f"Invalid agents: {e} Quitting...")
+                sys.exit(1)
+
+        # The agents' workers only share the network with the main process
+        if TRANSPORT_SHARED_MEMORY in config.transport:
+            print(
+                f"Invalid transport: '{TRANSPORT_SHARED_MEMORY}' can not be used with the '{BACKEND_DISTRIBUTED}' backend. Quitting..."
+            )
+            sys.exit(1)
+
+        if TASK_PAYLOAD_REGISTRY in config.task_payload:
+            print(
+                f"Invalid task payload: '{TASK_PAYLOAD_REGISTRY}' can not be used with the '{BACKEND_DISTRIBUTED}' backend. Quitting..."
+            )
+            sys.exit(1)
+
+        if any(placement != PLACEMENT_NONE for placement in config.placement):
+            print(
+                f"Invalid placement: workers of the '{BACKEND_DISTRIBUTED}' backend can not be pinned. Quitting..."
+            )
+            sys.exit(1)
+
+        set_agents(config.agents)
+
+    if config.arrival_rate is not None:
+        if not isinstance(config.arrival_rate, list):
+            config.arrival_rate = [config.arrival_rate]
+
+        if len(config.arrival_rate) == 0:
+            print("Invalid arrival rate: at least one value is required. Quitting...")
+            sys.exit(1)
+
+        for arrival_rate in config.arrival_rate:
+            if not isinstance(arrival_rate, (int, float)) or arrival_rate <= 0:
+                print(
+                    f"Invalid arrival rate: {arrival_rate}. Must be a positive number of tasks per second. Quitting..."
+                )
+                sys.exit(1)
+
+        if config.data_parallel:
+            print(
+                "Invalid arrival rate: open-loop tests can not be used in data-parallel mode. Quitting..."
+            )
+            sys.exit(1)
+
+        if config.workers == WORKERS_AUTO:
+            print(
+                f"Invalid arrival rate: open-loop tests need a list of worker counts, not '{WORKERS_AUTO}'. Quitting..."
+            )
+            sys.exit(1)
+
+    if config.arrival_process not in ARRIVAL_PROCESSES:
+        print(
+            f"Invalid arrival process: {config.arrival_process}. Must be one of {ARRIVAL_PROCESSES}. Quitting..."
+        )
+        sys.exit(1)
+
+    if config.latency_slo is not None:
+        if config.latency_slo <= 0:
+            print("Invalid latency SLO: must be positive. Quitting...")
+            sys.exit(1)
+
+    if config.cost_model not in COST_MODELS:
+        print(
+            f"Invalid cost model: {config.cost_model}. Must be one of {COST_MODELS}. Quitting..."
+        )
+        sys.exit(1)
+
+    if config.async_concurrency is not None:
+        if config.async_concurrency < 1:
+            print("Invalid async concurrency: must be at least 1. Quitting...")
+            sys.exit(1)
+
+    if config.result_retention not in RETENTIONS:
+        print(
+            f"Invalid result retention: {config.result_retention}. Must be one of {RETENTIONS}. Quitting..."
+        )
+        sys.exit(1)
+
+    if config.max_in_flight is not None:
+        if config.max_in_flight < 1:
+            print("Invalid max in flight: must be at least 1. Quitting...")
+            sys.exit(1)
+
+    if config.resource_sample_interval is not None:
+        if config.resource_sample_interval <= 0:
+            print(
+                "Invalid resource sample interval: must be positive or null to disable. Quitting..."
+            )
+            sys.exit(1)
+
+    if config.seed is not None:
+        if not isinstance(config.seed, int) or config.seed < 0:
+            print("Invalid seed: must be a non-negative integer. Quitting...")
+            sys.exit(1)
+
+    if config.task_plan is not None and config.task != "random":
+        print("Invalid task plan: only the random task uses a task plan. Quitting...")
+        sys.exit(1)
+
+    # Only worker processes and threads publish the task they are running, see easy_pool.faults
+    if config.task_timeout is not None:
+        if (
+            not isinstance(config.task_timeout, (int, float))
+            or config.task_timeout <= 0
+        ):
+            print("Invalid task timeout: must be a positive number. Quitting...")
+            sys.exit(1)
+
+        for backend in [BACKEND_INTERPRETER, BACKEND_DISTRIBUTED, PIPELINE_ASYNC]:
+            if backend in config.backend:
+                print(
+                    f"Invalid task timeout: can not be used with the '{backend}' backend. Quitting..."
+                )
+                sys.exit(1)
+
+    if not isinstance(config.task_retries, int) or config.task_retries < 0:
+        print("Invalid task retries: must be a non-negative integer. Quitting...")
+        sys.exit(1)
+
+    if config.task_retries > 0 and PIPELINE_ASYNC in config.backend:
+        print(
+            f"Invalid task retries: can not be used with the '{PIPELINE_ASYNC}' backend. Quitting..."
+        )
+        sys.exit(1)
+
+    if config.max_tasks_per_child is not None:
+        if (
+            not isinstance(config.max_tasks_per_child, int)
+            or config.max_tasks_per_child < 1
+        ):
+            print("Invalid max tasks per child: must be at least 1. Quitting...")
+            sys.exit(1)
+
+        for backend in config.backend:
+            if backend != BACKEND_POOL:
+                print(
+                    f"Invalid max tasks per child: only the workers of the '{BACKEND_POOL}' backend are replaced, not those of '{backend}'. Quitting..."
+                )
+                sys.exit(1)
+
+    if config.profiler is not None:
+        if config.profiler not in PROFILERS:
+            print(
+                f"Invalid profiler: {config.profiler}. Must be one of {PROFILERS}. Quitting..."
+            )
+            sys.exit(1)
+
+        # Thread workers would start and stop the process-wide profilers of each other
+        if config.profiler != PROFILER_SAMPLING and BACKEND_THREAD in config.backend:
+            print(
+                f"Invalid profiler: only '{PROFILER_SAMPLING}' can be used with the '{BACKEND_THREAD}' backend. Quitting..."
+            )
+            sys.exit(1)
+
     if config.multiprocessing_start_method is not None:
         # Validate proposed start method
         if (
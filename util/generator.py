@@ -1,10 +1,46 @@
 import random
 import string
+import threading
+
+import numpy as np
+
+# The random module and numpy generators of the task running in a thread. Thread workers
+# share the module globals, so the tasks draw from these instead.
+task_generators = threading.local()
 
 
 def generate_random_str(length: int = 6) -> str:
     return "".join(
-        random.choices(
+        get_random().choices(
             string.ascii_lowercase + string.ascii_uppercase + string.digits, k=length
         )
     )
+
+
+def seed_random_generators(seed: int):
+    """
+    Give the tasks that run next in the calling thread their own random module and numpy
+    generators seeded with seed, which the tasks draw from.
+    """
+    task_generators.random = random.Random(seed)
+    task_generators.numpy = np.random.default_rng(seed)
+
+
+def get_random() -> random.Random:
+    """
+    The random module generator of the task running in the calling thread, an unseeded one
+    if the thread was never seeded.
+    """
+    if not hasattr(task_generators, "random"):
+        task_generators.random = random.Random()
+    return task_generators.random
+
+
+def get_numpy_random() -> np.random.Generator:
+    """
+    The numpy generator of the task running in the calling thread, an unseeded one if the
+    thread was never seeded.
+    """
+    if not hasattr(task_generators, "numpy"):
+        task_generators.numpy = np.random.default_rng()
+    return task_generators.numpy
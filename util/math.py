@@ -1,3 +1,8 @@
+import math
+
+import numpy as np
+
+
 def avg_float(float_list: list[float]) -> float:
     """
     Calculate the average of a list of floats.
@@ -17,3 +22,121 @@ def avg_float_from_tuple_list(
         sum([t[2] for t in tuple_list]) / len(tuple_list),
         sum([t[3] for t in tuple_list]) / len(tuple_list),
     )
+
+
+# Two-sided 95% critical values of Student's t-distribution by degrees of freedom
+T_CRITICAL_95 = {
+    1: 12.706,
+    2: 4.303,
+    3: 3.182,
+    4: 2.776,
+    5: 2.571,
+    6: 2.447,
+    7: 2.365,
+    8: 2.306,
+    9: 2.262,
+    10: 2.228,
+    12: 2.179,
+    15: 2.131,
+    20: 2.086,
+    25: 2.060,
+    30: 2.042,
+}
+
+
+def stddev_float(float_list: list[float]) -> float:
+    """
+    Calculate the sample standard deviation of a list of floats.
+    """
+    if len(float_list) < 2:
+        return 0
+
+    avg = avg_float(float_list)
+    return math.sqrt(sum([(x - avg) ** 2 for x in float_list]) / (len(float_list) - 1))
+
+
+def confidence_interval_95(float_list: list[float]) -> float:
+    """
+    Calculate the half-width of the 95% confidence interval of the mean of a list of floats.
+    """
+    if len(float_list) < 2:
+        return 0
+
+    t_critical = get_t_critical_95(len(float_list) - 1)
+    return t_critical * stddev_float(float_list) / math.sqrt(len(float_list))
+
+
+def get_t_critical_95(degrees_of_freedom: float) -> float:
+    """
+    Get the two-sided 95% critical value of Student's t-distribution.
+    """
+    if degrees_of_freedom > max(T_CRITICAL_95):
+        return 1.960
+
+    # Use the closest tabulated value that is not larger than the degrees of
+    # freedom, which errs on the wide side
+    closest_df = max([df for df in T_CRITICAL_95 if df <= max(degrees_of_freedom, 1)])
+    return T_CRITICAL_95[closest_df]
+
+
+def welch_t_test(
+    float_list: list[float], other_float_list: list[float]
+) -> tuple[float, float]:
+    """
+    Calculate Welch's t statistic for the difference of the means of two samples, which does
+    not assume equal variances, with its Welch-Satterthwaite degrees of freedom.
+    """
+    if len(float_list) < 2 or len(other_float_list) < 2:
+        return 0, 0
+
+    var = stddev_float(float_list) ** 2 / len(float_list)
+    other_var = stddev_float(other_float_list) ** 2 / len(other_float_list)
+    diff = avg_float(float_list) - avg_float(other_float_list)
+
+    if var + other_var == 0:
+        return (math.copysign(math.inf, diff) if diff != 0 else 0), math.inf
+
+    t = diff / math.sqrt(var + other_var)
+    degrees_of_freedom = (var + other_var) ** 2 / (
+        var**2 / (len(float_list) - 1) + other_var**2 / (len(other_float_list) - 1)
+    )
+    return t, degrees_of_freedom
+
+
+def split_range(size: int, parts: int, index: int) -> tuple[int, int]:
+    """
+    Get the start and stop of the index-th of parts near equal parts of range(size).
+    The first size % parts parts are one longer.
+    """
+    part_size, remainder = divmod(size, parts)
+    start = index * part_size + min(index, remainder)
+    stop = start + part_size + (1 if index < remainder else 0)
+    return start, stop
+
+
+def percentiles(values: np.ndarray, qs: list[float]) -> list[float]:
+    """
+    Calculate the given percentiles (0-100) of an array of values.
+    """
+    if len(values) == 0:
+        return [0 for _ in qs]
+    return [float(x) for x in np.percentile(values, qs)]
+
+
+def log2_histogram(values: np.ndarray) -> str:
+    """
+    Summarize an array of durations in seconds as a histogram with power-of-two millisecond
+    buckets, formatted as "<=upper_ms:count" pairs separated by semicolons.
+    """
+    if len(values) == 0:
+        return ""
+
+    millis = np.maximum(values * 1000, 1e-3)
+    buckets = np.ceil(np.log2(millis)).astype(int)
+    upper_bounds, counts = np.unique(buckets, return_counts=True)
+    return ";".join(
+        [
+            f"<={2.0 ** int(upper):g}:{int(count)}"
+            for upper, count in zip(upper_bounds, counts)
+        ]
+    )
@@ -0,0 +1,253 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable
+
+# What is captured around every task:
+# - "cprofile": the deterministic profile of every function call, merged into a pstats file
+# - "sampling": the stack of the task sampled at a fixed interval, merged into a file of
+#   folded stacks (one "root;...;leaf count" line per stack) that flame graph tools read
+# - "tracemalloc": the memory the task still held when it returned by allocating stack,
+#   folded the same way and weighted by bytes, and the peak memory of the task
+PROFILER_CPROFILE = "cprofile"
+PROFILER_SAMPLING = "sampling"
+PROFILER_TRACEMALLOC = "tracemalloc"
+PROFILERS = [PROFILER_CPROFILE, PROFILER_SAMPLING, PROFILER_TRACEMALLOC]
+
+# Seconds between two stack samples
+SAMPLING_INTERVAL = 0.001
+
+# Frames kept of every allocating stack. Tracing costs more the deeper the stacks are, and
+# tasks that allocate many small objects, like the interpreted sum loop, slow down the most:
+# about 70 times with only the allocating line, 125 times with 8 frames
+TRACEMALLOC_FRAMES = 1
+
+# Hot functions and top allocators listed per task type in the summary
+SUMMARY_TOP = 10
+
+
+class ProfiledResult:
+    """
+    The result of a task that ran under a profiler, with what the profiler captured, the task
+    type and the process id of the worker that ran it.
+    """
+
+    def __init__(self, value: Any, task_type: str, data: Any):
+        self.value = value
+        self.task_type = task_type
+        self.pid = os.getpid()
+        self.data = data
+
+
+class StackSampler:
+    """
+    Samples the stack of the calling thread from a background thread, below the frame that
+    started the sampler. Only samples while the sampled thread releases the GIL or is switched
+    out, so native code that holds the GIL shows up as the Python frame that called it.
+    """
+
+    def __init__(self, interval: float = SAMPLING_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def start(self):
+        self.thread_id = threading.get_ident()
+        self.root = sys._getframe(1)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                stack.append(get_frame_name(frame.f_code))
+                frame = frame.f_back
+            # The task is done once the sampler is stopped, leave out the stopping
+            if self.stopped.is_set():
+                break
+            if len(stack) > 0:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> Counter:
+        self.stopped.set()
+        self.thread.join()
+        self.root = None
+        return self.stacks
+
+
+def get_frame_name(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def run_profiled(profiler: str, func: Callable, args: list) -> tuple[Any, Any]:
+    """
+    Run a task under the given profiler.
+
+    Returns:
+        A tuple of the task's result and what the profiler captured: the pstats entries of
+        cProfile, the sample count of every folded stack, or the bytes held by every folded
+        allocating stack with the peak memory.
+    """
+    if profiler == PROFILER_CPROFILE:
+        profile = cProfile.Profile()
+        try:
+            result = profile.runcall(func, *args)
+        finally:
+            profile.create_stats()
+        return result, profile.stats
+
+    if profiler == PROFILER_SAMPLING:
+        sampler = StackSampler()
+        sampler.start()
+        try:
+            result = func(*args)
+        finally:
+            stacks = sampler.stop()
+        return result, stacks
+
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    try:
+        result = func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    # Leave out the allocations of the snapshot itself
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    allocations = Counter()
+    for statistic in snapshot.statistics("traceback"):
+        # Keep the frames below this function, leaving out the frames of the pipeline or pool
+        # that ran the task and the allocations of this function
+        frames = list(statistic.traceback)
+        starts = [i + 1 for i, frame in enumerate(frames) if frame.filename == __file__]
+        if len(starts) > 0:
+            frames = frames[starts[-1] :]
+        if len(frames) == 0:
+            continue
+        stack = ";".join(
+            f"{os.path.basename(frame.filename)}:{frame.lineno}" for frame in frames
+        )
+        allocations[stack] += statistic.size
+    return result, {"allocations": allocations, "peak": peak}
+
+
+class StatsData:
+    """
+    Gives captured pstats entries the interface pstats.Stats loads profiles from.
+    """
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class TaskProfiles:
+    """
+    The profiles of all tasks of a runner, merged per task type, and the number of tasks
+    every worker profiled.
+    """
+
+    def __init__(self, profiler: str):
+        self.profiler = profiler
+        self.stats: dict[str, pstats.Stats] = {}
+        self.stacks: dict[str, Counter] = {}
+        self.peaks: dict[str, int] = {}
+        self.task_counts: dict[str, int] = Counter()
+        self.worker_task_counts: dict[int, int] = Counter()
+
+    def add(self, task_type: str, pid: int, data: Any):
+        self.task_counts[task_type] += 1
+        self.worker_task_counts[pid] += 1
+
+        if self.profiler == PROFILER_CPROFILE:
+            stats = self.stats.setdefault(task_type, pstats.Stats())
+            if len(data) > 0:
+                stats.add(StatsData(data))
+        elif self.profiler == PROFILER_SAMPLING:
+            self.stacks.setdefault(task_type, Counter()).update(data)
+        else:
+            self.stacks.setdefault(task_type, Counter()).update(data["allocations"])
+            self.peaks[task_type] = max(self.peaks.get(task_type, 0), data["peak"])
+
+    def merge(self, other: "TaskProfiles"):
+        """
+        Add the profiles of another test pass.
+        """
+        for task_type, count in other.task_counts.items():
+            self.task_counts[task_type] += count
+        self.worker_task_counts.update(other.worker_task_counts)
+
+        for task_type, stats in other.stats.items():
+            self.stats.setdefault(task_type, pstats.Stats()).add(stats)
+        for task_type, stacks in other.stacks.items():
+            self.stacks.setdefault(task_type, Counter()).update(stacks)
+        for task_type, peak in other.peaks.items():
+            self.peaks[task_type] = max(self.peaks.get(task_type, 0), peak)
+
+    def save(self, basename: str) -> str:
+        """
+        Save the profiles of all task types into one file: a pstats file (".prof") for
+        cProfile, or folded stacks (".folded") rooted at the task type otherwise.
+
+        Returns:
+            str: The name of the saved file.
+        """
+        if self.profiler == PROFILER_CPROFILE:
+            filename = f"{basename}.prof"
+            pstats.Stats().add(*self.stats.values()).dump_stats(filename)
+            return filename
+
+        filename = f"{basename}.folded"
+        with open(filename, "w") as file:
+            for task_type, stacks in self.stacks.items():
+                for stack, count in stacks.items():
+                    file.write(f"{task_type};{stack} {count}\n")
+        return filename
+
+    def get_summary(self) -> list[str]:
+        """
+        The hot functions (by own time or samples) or top allocators (by bytes held, at the
+        allocating line) of every task type.
+        """
+        lines = []
+        for task_type, task_count in self.task_counts.items():
+            lines.append(f"{task_type} ({task_count} tasks):")
+
+            if self.profiler == PROFILER_CPROFILE:
+                entries = self.stats[task_type].stats.items()
+                hot = sorted(entries, key=lambda x: x[1][2], reverse=True)[:SUMMARY_TOP]
+                for (filename, line, name), (_, calls, own, cumulative, _) in hot:
+                    lines.append(
+                        f"  {own:.4f}s own, {cumulative:.4f}s cumulative, {calls} calls: "
+                        f"{os.path.basename(filename)}:{line}:{name}"
+                    )
+                continue
+
+            # The leaf of a folded stack is the sampled function or allocating line
+            leaves = Counter()
+            for stack, count in self.stacks.get(task_type, {}).items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            total = sum(leaves.values())
+
+            if self.profiler == PROFILER_SAMPLING:
+                for leaf, count in leaves.most_common(SUMMARY_TOP):
+                    lines.append(f"  {count / total:.1%} of {total} samples: {leaf}")
+            else:
+                lines.append(f"  Peak: {self.peaks[task_type] / 2**20:.2f} MiB")
+                for leaf, size in leaves.most_common(SUMMARY_TOP):
+                    lines.append(f"  {size / 2**20:.2f} MiB held: {leaf}")
+
+        workers = ", ".join(
+            f"{pid}={count}" for pid, count in self.worker_task_counts.items()
+        )
+        lines.append(f"Tasks profiled per worker: {workers}")
+        return lines
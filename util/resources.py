@@ -0,0 +1,222 @@
+import multiprocessing
+import os
+import threading
+from dataclasses import dataclass
+
+from util.timer import Timer
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, resource sampling is disabled there
+    resource = None
+
+PROC_DIR = "/proc"
+# Used when sampling is enabled without an interval, sampling is off by default
+DEFAULT_SAMPLE_INTERVAL = 0.1
+
+BYTES_PER_MIB = 1024 * 1024
+# Block size of the getrusage ru_inblock/ru_oublock counters
+RUSAGE_BLOCK_BYTES = 512
+
+
+@dataclass
+class ProcessCounters:
+    """
+    Cumulative OS counters of a process.
+    """
+
+    cpu_time: float = 0
+    voluntary_ctx_switches: int = 0
+    involuntary_ctx_switches: int = 0
+    read_bytes: int = 0
+    write_bytes: int = 0
+
+    def __add__(self, other: "ProcessCounters") -> "ProcessCounters":
+        return ProcessCounters(
+            self.cpu_time + other.cpu_time,
+            self.voluntary_ctx_switches + other.voluntary_ctx_switches,
+            self.involuntary_ctx_switches + other.involuntary_ctx_switches,
+            self.read_bytes + other.read_bytes,
+            self.write_bytes + other.write_bytes,
+        )
+
+    def __sub__(self, other: "ProcessCounters") -> "ProcessCounters":
+        return ProcessCounters(
+            self.cpu_time - other.cpu_time,
+            self.voluntary_ctx_switches - other.voluntary_ctx_switches,
+            self.involuntary_ctx_switches - other.involuntary_ctx_switches,
+            self.read_bytes - other.read_bytes,
+            self.write_bytes - other.write_bytes,
+        )
+
+
+class ResourceSampler:
+    """
+    Samples the resource usage of the main process and the worker processes it started with
+    multiprocessing (the workers of the pools and executors) in a background thread while a
+    test pass runs. Only these processes are read, not every process on the machine.
+
+    On Linux the counters are read from /proc: the RSS of all processes is summed every
+    interval and its peak is kept, the cumulative CPU time, context switches and I/O bytes
+    are kept per process, so workers that exit during the test pass are still counted.
+    Elsewhere only getrusage of the main process and its terminated children is available,
+    which is read at the start and stop. Shared pages (e.g. of forked workers) are counted
+    once per process in the RSS.
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.pid = os.getpid()
+        self.use_proc = os.path.exists(f"{PROC_DIR}/{self.pid}/stat")
+        self.clock_ticks = os.sysconf("SC_CLK_TCK") if self.use_proc else 0
+        self.page_size = os.sysconf("SC_PAGE_SIZE") if self.use_proc else 0
+
+        # Processes are keyed by pid and start time, so reused pids are not mixed up
+        self.baseline: dict[tuple[int, int], ProcessCounters] = {}
+        self.latest: dict[tuple[int, int], ProcessCounters] = {}
+        self.peak_rss = 0
+        self.start_rusage = None
+        self.timer = Timer()
+
+        self.stop_event = threading.Event()
+        self.thread: threading.Thread = None
+
+    def start(self):
+        self.timer.start()
+
+        if self.use_proc:
+            self.sample()
+            self.baseline = dict(self.latest)
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        elif resource is not None:
+            self.start_rusage = get_rusage_counters()
+
+    def stop(self) -> dict[str, float]:
+        """
+        Stop sampling.
+
+        Returns:
+            The resource metrics of the sampled period by name: peak RSS and I/O in MiB,
+            CPU usage in percent of one core, and context switch counts. Empty if resource
+            usage can not be read on this platform.
+        """
+        elapsed = self.timer.get_duration()
+
+        if self.use_proc:
+            self.stop_event.set()
+            self.thread.join()
+            self.sample()
+
+            total = ProcessCounters()
+            for key, counters in self.latest.items():
+                total += counters - self.baseline.get(key, ProcessCounters())
+            peak_rss = self.peak_rss
+        elif self.start_rusage is not None:
+            end_counters, peak_rss = get_rusage_counters()
+            total = end_counters - self.start_rusage[0]
+        else:
+            return {}
+
+        return {
+            "peak_rss": peak_rss / BYTES_PER_MIB,
+            "cpu_percent": total.cpu_time / elapsed * 100 if elapsed > 0 else 0,
+            "voluntary_ctx_switches": total.voluntary_ctx_switches,
+            "involuntary_ctx_switches": total.involuntary_ctx_switches,
+            "read_bytes": total.read_bytes / BYTES_PER_MIB,
+            "write_bytes": total.write_bytes / BYTES_PER_MIB,
+        }
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        rss = 0
+        for pid in [self.pid, *get_worker_pids()]:
+            try:
+                key, counters, process_rss = self.read_process(pid)
+            except (OSError, ValueError, IndexError):
+                # The process exited while being read
+                continue
+            self.latest[key] = counters
+            rss += process_rss
+
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def read_process(self, pid: int) -> tuple[tuple[int, int], ProcessCounters, int]:
+        with open(f"{PROC_DIR}/{pid}/stat", "r") as file:
+            # The command name can contain spaces, the fields after it can't
+            stat = file.read().rsplit(")", 1)[1].split()
+        # Field 14 (utime), 15 (stime), 22 (starttime) and 24 (rss) of proc(5)
+        cpu_time = (int(stat[11]) + int(stat[12])) / self.clock_ticks
+        start_time = int(stat[19])
+        rss = int(stat[21]) * self.page_size
+
+        counters = ProcessCounters(cpu_time=cpu_time)
+
+        # Context switches are only reported per thread in /proc, getrusage of the main
+        # process also counts its threads that exited and doesn't read all of them
+        if pid == self.pid and resource is not None:
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            counters.voluntary_ctx_switches = usage.ru_nvcsw
+            counters.involuntary_ctx_switches = usage.ru_nivcsw
+            tids = []
+        else:
+            tids = os.listdir(f"{PROC_DIR}/{pid}/task")
+
+        for tid in tids:
+            try:
+                with open(f"{PROC_DIR}/{pid}/task/{tid}/status", "r") as file:
+                    for line in file:
+                        if line.startswith("voluntary_ctxt_switches:"):
+                            counters.voluntary_ctx_switches += int(line.split()[1])
+                        elif line.startswith("nonvoluntary_ctxt_switches:"):
+                            counters.involuntary_ctx_switches += int(line.split()[1])
+            except OSError:
+                # The thread exited while being read
+                continue
+
+        try:
+            with open(f"{PROC_DIR}/{pid}/io", "r") as file:
+                for line in file:
+                    if line.startswith("read_bytes:"):
+                        counters.read_bytes = int(line.split()[1])
+                    elif line.startswith("write_bytes:"):
+                        counters.write_bytes = int(line.split()[1])
+        except PermissionError:
+            # Some systems restrict the I/O accounting
+            pass
+
+        return (pid, start_time), counters, rss
+
+
+def get_worker_pids() -> list[int]:
+    """
+    Get the pids of the live processes multiprocessing started for this process, which are
+    the workers of the pools and process executors, also those forked from a forkserver.
+    """
+    return [process.pid for process in multiprocessing.active_children()]
+
+
+def get_rusage_counters() -> tuple[ProcessCounters, int]:
+    """
+    Get the counters of the main process and its terminated children from getrusage, with
+    the highest peak RSS of them in bytes.
+    """
+    counters = ProcessCounters()
+    peak_rss = 0
+    for who in [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]:
+        usage = resource.getrusage(who)
+        counters.cpu_time += usage.ru_utime + usage.ru_stime
+        counters.voluntary_ctx_switches += usage.ru_nvcsw
+        counters.involuntary_ctx_switches += usage.ru_nivcsw
+        counters.read_bytes += usage.ru_inblock * RUSAGE_BLOCK_BYTES
+        counters.write_bytes += usage.ru_oublock * RUSAGE_BLOCK_BYTES
+        peak_rss = max(peak_rss, usage.ru_maxrss)
+
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    if os.uname().sysname != "Darwin":
+        peak_rss *= 1024
+    return counters, peak_rss
@@ -0,0 +1,335 @@
+import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import sqlite3
+from dataclasses import dataclass
+
+import numpy as np
+
+from easy_pool.backends import is_gil_enabled
+from easy_pool.placement import format_cpu_list, get_numa_nodes, is_placement_supported
+from easy_pool.threads import BLAS_THREAD_VARIABLES, get_thread_pool_info
+from util.runner import METRIC_COLUMNS, SUMMARY_COLUMNS, Runner
+
+DEFAULT_RESULT_STORE = "results/results.db"
+
+# The environment values that identify a machine and software stack. Runs with the same
+# fingerprint can be compared with each other.
+FINGERPRINT_KEYS = [
+    "cpu_model",
+    "cpu_count",
+    "platform",
+    "python",
+    "numpy",
+    "cv2",
+    "blas",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    task TEXT NOT NULL,
+    config TEXT NOT NULL,
+    environment TEXT NOT NULL,
+    fingerprint TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runners (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    workers INTEGER NOT NULL,
+    backend TEXT,
+    chunksize TEXT,
+    transport TEXT,
+    schedule TEXT,
+    thread_policy TEXT,
+    placement TEXT,
+    placement_cpus TEXT,
+    task_payload TEXT,
+    implementation TEXT,
+    recommended INTEGER,
+    task_details TEXT,
+    task_count INTEGER NOT NULL,
+    tasks_per_second REAL NOT NULL,
+    tps_ci95 REAL NOT NULL,
+    runtimes TEXT NOT NULL,
+    metrics TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE INDEX IF NOT EXISTS runs_task ON runs (task, fingerprint);
+"""
+
+# Columns added to the runners table after it was first created, with their types
+RUNNER_COLUMN_MIGRATIONS = {
+    "thread_policy": "TEXT",
+    "placement": "TEXT",
+    "placement_cpus": "TEXT",
+    "task_payload": "TEXT",
+    "implementation": "TEXT",
+    "recommended": "INTEGER",
+}
+
+
+@dataclass
+class StoredRun:
+    id: int
+    created_at: str
+    task: str
+    config: dict
+    environment: dict
+    fingerprint: str
+
+
+@dataclass
+class StoredRunner:
+    name: str
+    workers: int
+    task_details: str
+    task_count: int
+    tasks_per_second: float
+    tps_ci95: float
+    runtimes: list[list[float]]
+    metrics: dict[str, list[float]]
+
+    def get_tps_values(self) -> list[float]:
+        """
+        The completed tasks per second of every iteration.
+        """
+        failed_tasks = self.metrics.get("failed_tasks", [])
+        return [
+            (self.task_count - (failed_tasks[i] if i < len(failed_tasks) else 0))
+            / runtime[3]
+            for i, runtime in enumerate(self.runtimes)
+            if runtime[3] > 0
+        ]
+
+
+class ResultStore:
+    """
+    An append-only SQLite database of all runs: the config, the environment the run was
+    measured in and the runtimes, metrics and summaries of every runner. Runs are never
+    updated or deleted, so earlier runs stay available as a baseline.
+    """
+
+    def __init__(self, filename: str = DEFAULT_RESULT_STORE):
+        directory = os.path.dirname(filename)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(filename)
+        self.connection.executescript(SCHEMA)
+        self.migrate()
+
+    def migrate(self):
+        """
+        Add the columns of newer versions to a database created by an older one.
+        """
+        columns = [
+            row[1]
+            for row in self.connection.execute("PRAGMA table_info(runners)").fetchall()
+        ]
+        with self.connection:
+            for name, column_type in RUNNER_COLUMN_MIGRATIONS.items():
+                if name not in columns:
+                    self.connection.execute(
+                        f"ALTER TABLE runners ADD COLUMN {name} {column_type}"
+                    )
+
+    def add_run(self, task: str, config: dict, runners: dict[str, Runner]) -> int:
+        """
+        Record a run and all of its runners.
+
+        Returns:
+            int: The id of the run.
+        """
+        environment = get_environment()
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (created_at, task, config, environment, fingerprint) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    datetime.datetime.now().isoformat(timespec="seconds"),
+                    task,
+                    json.dumps(config),
+                    json.dumps(environment),
+                    get_fingerprint(environment),
+                ),
+            )
+            run_id = cursor.lastrowid
+
+            for runner in runners.values():
+                tps, tps_ci = runner.get_tps_confidence_interval()
+                self.connection.execute(
+                    "INSERT INTO runners (run_id, name, workers, backend, chunksize, "
+                    "transport, schedule, thread_policy, placement, placement_cpus, "
+                    "task_payload, implementation, recommended, task_details, "
+                    "task_count, tasks_per_second, tps_ci95, runtimes, metrics, summary) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        run_id,
+                        runner.name,
+                        runner.workers,
+                        runner.backend,
+                        str(runner.chunksize) if runner.chunksize is not None else None,
+                        runner.transport,
+                        runner.schedule,
+                        runner.thread_policy,
+                        runner.placement,
+                        runner.placement_cpus,
+                        runner.task_payload,
+                        runner.implementation,
+                        int(runner.recommended),
+                        runner.task_details,
+                        runner.task_count,
+                        tps,
+                        tps_ci,
+                        json.dumps(runner.runtimes),
+                        json.dumps(
+                            {
+                                name: runner.metrics[name]
+                                for name in METRIC_COLUMNS
+                                if name in runner.metrics
+                            }
+                        ),
+                        json.dumps(dict(zip(SUMMARY_COLUMNS, runner.get_summary()))),
+                    ),
+                )
+
+        return run_id
+
+    def get_run(self, run_id: int) -> StoredRun:
+        row = self.connection.execute(
+            "SELECT * FROM runs WHERE id = ?", (run_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return to_stored_run(row)
+
+    def get_latest_run(self) -> StoredRun:
+        row = self.connection.execute(
+            "SELECT * FROM runs ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        return to_stored_run(row)
+
+    def get_runs(self, limit: int = None) -> list[StoredRun]:
+        """
+        Get the most recent runs, newest first.
+        """
+        rows = self.connection.execute(
+            "SELECT * FROM runs ORDER BY id DESC LIMIT ?",
+            (limit if limit is not None else -1,),
+        ).fetchall()
+        return [to_stored_run(row) for row in rows]
+
+    def get_previous_runs(self, run: StoredRun, count: int) -> list[StoredRun]:
+        """
+        Get up to count runs before the given one, of the same task on the same environment.
+        """
+        rows = self.connection.execute(
+            "SELECT * FROM runs WHERE id < ? AND task = ? AND fingerprint = ? "
+            "ORDER BY id DESC LIMIT ?",
+            (run.id, run.task, run.fingerprint, count),
+        ).fetchall()
+        return [to_stored_run(row) for row in rows]
+
+    def get_runners(self, run_id: int) -> dict[str, StoredRunner]:
+        rows = self.connection.execute(
+            "SELECT name, workers, task_details, task_count, tasks_per_second, tps_ci95, "
+            "runtimes, metrics FROM runners WHERE run_id = ? ORDER BY rowid",
+            (run_id,),
+        ).fetchall()
+        return {
+            row[0]: StoredRunner(
+                name=row[0],
+                workers=row[1],
+                task_details=row[2],
+                task_count=row[3],
+                tasks_per_second=row[4],
+                tps_ci95=row[5],
+                runtimes=json.loads(row[6]),
+                metrics=json.loads(row[7]),
+            )
+            for row in rows
+        }
+
+    def close(self):
+        self.connection.close()
+
+
+def to_stored_run(row: tuple) -> StoredRun:
+    return StoredRun(
+        id=row[0],
+        created_at=row[1],
+        task=row[2],
+        config=json.loads(row[3]),
+        environment=json.loads(row[4]),
+        fingerprint=row[5],
+    )
+
+
+def get_environment() -> dict:
+    """
+    Describe the machine and software stack the benchmark runs on.
+    """
+    import cv2
+
+    return {
+        "cpu_model": get_cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "numa_nodes": (
+            [format_cpu_list(cpus) for cpus in get_numa_nodes()]
+            if is_placement_supported()
+            else []
+        ),
+        "platform": platform.platform(),
+        "python": f"{platform.python_implementation()} {platform.python_version()}",
+        "numpy": np.__version__,
+        "cv2": cv2.__version__,
+        "blas": get_blas_name(),
+        "blas_threads": {
+            name: os.environ.get(name)
+            for name in BLAS_THREAD_VARIABLES
+            if name in os.environ
+        },
+        "blas_thread_pools": get_thread_pool_info(),
+        "cv2_threads": cv2.getNumThreads(),
+        "gil_enabled": is_gil_enabled(),
+        "start_method": multiprocessing.get_start_method(allow_none=True),
+    }
+
+
+def get_fingerprint(environment: dict) -> str:
+    """
+    A short hash of the environment values that identify the machine and software stack.
+    """
+    identity = json.dumps({key: environment.get(key) for key in FINGERPRINT_KEYS})
+    return hashlib.sha256(identity.encode()).hexdigest()[:12]
+
+
+def get_cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo", "r") as file:
+            for line in file:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def get_blas_name() -> str:
+    """
+    The BLAS library Numpy was built against, if Numpy reports it.
+    """
+    try:
+        config = np.show_config(mode="dicts")
+        blas = config["Build Dependencies"]["blas"]
+        return f"{blas['name']} {blas.get('version', '')}".strip()
+    except Exception:
+        return ""
@@ -1,21 +1,253 @@
-from util.math import avg_float_from_tuple_list
+import math
+from typing import Union
+
+import numpy as np
+
+from util.math import (
+    avg_float,
+    avg_float_from_tuple_list,
+    confidence_interval_95,
+    log2_histogram,
+    percentiles,
+    stddev_float,
+)
+from util.profiler import TaskProfiles
+from util.samples import TaskSamples
+
+# Additional metrics pipelines can report next to the runtimes, by name, with their CSV
+# column headers. The columns of metrics a runner has not reported are left empty.
+METRIC_COLUMNS = {
+    "first_result_runtime": "Time: first result",
+    "hol_blocking_runtime": "Time: HOL blocking avg",
+    "submit_blocked_runtime": "Time: submit blocked",
+    "dispatch_runtime": "Time: dispatch per task",
+    "payload_bytes": "Dispatch: payload bytes per task",
+    "network_runtime": "Time: network per task",
+    "failed_tasks": "Tasks: failed",
+    "retried_tasks": "Tasks: retried",
+    "timed_out_tasks": "Tasks: timed out",
+    "lost_workers": "Workers: lost",
+    "makespan_runtime": "Time: makespan",
+    "makespan_ratio": "Makespan / lower bound",
+    "offered_rate": "Open-loop: offered rate (tasks/s)",
+    "achieved_rate": "Open-loop: achieved rate (tasks/s)",
+    "response_p50_runtime": "Time: response p50",
+    "response_p99_runtime": "Time: response p99",
+    "slo_violation_ratio": "Open-loop: share over SLO",
+    "slo_knee_rate": "Open-loop: SLO crossed at (tasks/s)",
+    "slo_met_rate": "Open-loop: SLO met up to (tasks/s)",
+    "slo_missed_rate": "Open-loop: SLO missed at (tasks/s)",
+    "cpu_task_runtime": "CPU: tasks",
+    "cpu_main_runtime": "CPU: main process overhead",
+    "cpu_utilization": "CPU utilization per worker",
+    "parallel_efficiency": "Parallel efficiency",
+    "peak_rss": "Memory: peak RSS (MiB)",
+    "cpu_percent": "CPU %",
+    "voluntary_ctx_switches": "Context switches: voluntary",
+    "involuntary_ctx_switches": "Context switches: involuntary",
+    "read_bytes": "I/O: read (MiB)",
+    "write_bytes": "I/O: write (MiB)",
+}
+
+# Summaries of the per-task samples of all iterations and of the spread between iterations
+SUMMARY_COLUMNS = [
+    "Task p50",
+    "Task p90",
+    "Task p99",
+    "Task max",
+    "Queue wait p50",
+    "Queue wait p90",
+    "Queue wait p99",
+    "Queue wait max",
+    "Time: total stddev",
+    "Tasks per second CI95 (+/-)",
+    "Task histogram (ms)",
+]
+
+PERCENTILES = [50, 90, 99, 100]
+
+TASK_CSV_HEADER = [
+    "Name",
+    "Iteration",
+    "Task index",
+    "Time: task",
+    "Time: queue wait",
+    "CPU: task",
+]
 
 
 class Runner:
-    def __init__(self, name: str, workers: int, task_details: str, task_count: int):
+    def __init__(
+        self,
+        name: str,
+        workers: int,
+        task_details: str,
+        task_count: int,
+        chunksize: Union[int, str] = None,
+        transport: str = None,
+        backend: str = None,
+        schedule: str = None,
+        thread_policy: str = None,
+        placement: str = None,
+        arrival_rate: float = None,
+        task_payload: str = None,
+        implementation: str = None,
+    ):
         self.name = name
         self.workers = workers
+        self.chunksize = chunksize
+        self.transport = transport
+        self.backend = backend
+        self.schedule = schedule
+        self.thread_policy = thread_policy
+        self.placement = placement
+        # The tasks per second submitted in an open-loop test, None for a closed loop
+        self.arrival_rate = arrival_rate
+        self.task_payload = task_payload
+        # The implementation of the sum or multi tasks, see work.sum
+        self.implementation = implementation
+        # The CPUs every worker was pinned to, see easy_pool.placement.format_worker_cpus
+        self.placement_cpus: str = None
+        self.startup_runtime: float = None
         self.runtimes = []
+        self.metrics: dict[str, list[float]] = {}
+        self.task_samples: list[TaskSamples] = []
+        # The profiles of the tasks of all test passes, when a profiler is set
+        self.task_profiles: TaskProfiles = None
         self.task_details = task_details
         self.task_count = task_count
+        # Whether the worker search recommends the worker count and chunk size of the runner
+        self.recommended = False
+
+    def add_runtime(self, runtime: tuple):
+        """
+        Add the runtimes of a test pass. Pipelines can return a dict of additional
+        metrics by name as a fifth element, which can include the per-task samples.
+        """
+        if len(runtime) > 4:
+            self.add_metrics(runtime[4])
+            self.add_cpu_ratios(runtime[4], runtime[1], runtime[3])
+            runtime = runtime[:4]
 
-    def add_runtime(self, runtime: tuple[float, float, float, float]):
         self.runtimes.append(runtime)
 
+    def add_metrics(self, metrics: dict):
+        """
+        Add metrics of a test pass by name, e.g. the resource usage sampled while it ran.
+        """
+        for name, value in metrics.items():
+            if isinstance(value, TaskSamples):
+                self.task_samples.append(value)
+            elif isinstance(value, TaskProfiles):
+                if self.task_profiles is None:
+                    self.task_profiles = TaskProfiles(value.profiler)
+                self.task_profiles.merge(value)
+            else:
+                self.metrics.setdefault(name, []).append(value)
+
+    def add_cpu_ratios(self, metrics: dict, work_runtime: float, total_runtime: float):
+        """
+        Derive how busy the workers were from the CPU times a pipeline reported.
+
+        The CPU utilization per worker is the task CPU time per worker and second of work,
+        the parallel efficiency is all CPU time (including the main process overhead) per
+        worker and second of total runtime. Idle time of the workers, e.g. waiting for IPC,
+        lowers both. The sequential runner counts as a single worker.
+        """
+        workers = max(self.workers, 1)
+
+        if "cpu_task_runtime" in metrics and work_runtime > 0:
+            self.metrics.setdefault("cpu_utilization", []).append(
+                metrics["cpu_task_runtime"] / (work_runtime * workers)
+            )
+
+        if "cpu_main_runtime" in metrics and total_runtime > 0:
+            cpu_runtime = metrics["cpu_task_runtime"] + metrics["cpu_main_runtime"]
+            self.metrics.setdefault("parallel_efficiency", []).append(
+                cpu_runtime / (total_runtime * workers)
+            )
+
+    def get_avg_metric(self, name: str) -> float:
+        if name not in self.metrics:
+            return None
+        return avg_float(self.metrics[name])
+
+    def get_task_runtimes(self) -> np.ndarray:
+        return np.concatenate(
+            [samples.get_runtimes() for samples in self.task_samples] or [np.empty(0)]
+        )
+
+    def get_queue_waits(self) -> np.ndarray:
+        return np.concatenate(
+            [samples.get_queue_waits() for samples in self.task_samples]
+            or [np.empty(0)]
+        )
+
+    def get_summary(self) -> list:
+        """
+        Get the values of the SUMMARY_COLUMNS: task runtime and queue wait percentiles over
+        all iterations, the spread of the total runtime and throughput between iterations and
+        a histogram of the task runtimes.
+        """
+        if len(self.task_samples) == 0:
+            task_percentiles = ["" for _ in PERCENTILES]
+            queue_wait_percentiles = ["" for _ in PERCENTILES]
+            histogram = ""
+        else:
+            task_runtimes = self.get_task_runtimes()
+            task_percentiles = percentiles(task_runtimes, PERCENTILES)
+            queue_wait_percentiles = percentiles(self.get_queue_waits(), PERCENTILES)
+            histogram = log2_histogram(task_runtimes)
+
+        total_runtimes = [runtime[3] for runtime in self.runtimes]
+
+        return [
+            *task_percentiles,
+            *queue_wait_percentiles,
+            stddev_float(total_runtimes),
+            self.get_tps_confidence_interval()[1],
+            histogram,
+        ]
+
+    def tasks_to_csv(self) -> list[list]:
+        rows = []
+        for iteration, samples in enumerate(self.task_samples):
+            for index, runtime, queue_wait, cpu_time in zip(
+                samples.indexes,
+                samples.runtimes,
+                samples.queue_waits,
+                samples.cpu_times,
+            ):
+                rows.append(
+                    [
+                        self.name,
+                        iteration + 1,
+                        index,
+                        runtime,
+                        queue_wait,
+                        cpu_time if not math.isnan(cpu_time) else "",
+                    ]
+                )
+        return rows
+
     def get_avg_runtimes(self) -> tuple[float, float, float, float]:
         return avg_float_from_tuple_list(self.runtimes)
 
+    def get_completed_task_counts(self) -> list[int]:
+        """
+        The number of tasks of every test pass that completed, without those that failed
+        for good.
+        """
+        failed_tasks = self.metrics.get("failed_tasks", [])
+        return [
+            self.task_count - (failed_tasks[i] if i < len(failed_tasks) else 0)
+            for i in range(len(self.runtimes))
+        ]
+
     def get_tasks_per_second(self) -> float:
+        """
+        The completed tasks per second, failed tasks don't count as throughput.
+        """
         if len(self.runtimes) == 0:
             return 0
 
@@ -23,9 +255,34 @@ class Runner:
         if avg_total_runtime == 0:
             return 0
 
-        return self.task_count / avg_total_runtime
+        return avg_float(self.get_completed_task_counts()) / avg_total_runtime
+
+    def get_tps_confidence_interval(self) -> tuple[float, float]:
+        """
+        Get the tasks per second with the half-width of its 95% confidence interval
+        between iterations.
+        """
+        tps_values = [
+            task_count / runtime[3]
+            for task_count, runtime in zip(
+                self.get_completed_task_counts(), self.runtimes
+            )
+            if runtime[3] > 0
+        ]
+        return self.get_tasks_per_second(), confidence_interval_95(tps_values)
 
-    def to_csv(self, reference_tps: float = 0) -> list[list]:
+    def to_csv(
+        self, reference_tps: float = 0, implementation_speedup: float = None
+    ) -> list[list]:
+        """
+        Args:
+            reference_tps (float): The tasks per second of the sequential runner of the same
+                                   implementation, the speedup from parallelism is relative
+                                   to it.
+            implementation_speedup (float, optional): How much faster the sequential runner
+                                                      of the implementation is than the one
+                                                      of the interpreter loop.
+        """
         tps = self.get_tasks_per_second()
         tps_speedup = 0
         if reference_tps != 0:
@@ -35,11 +292,28 @@ class Runner:
             [
                 self.name,
                 self.workers,
+                self.backend if self.backend is not None else "",
+                self.chunksize if self.chunksize is not None else "",
+                self.transport if self.transport is not None else "",
+                self.schedule if self.schedule is not None else "",
+                self.thread_policy if self.thread_policy is not None else "",
+                self.placement if self.placement is not None else "",
+                self.placement_cpus if self.placement_cpus is not None else "",
+                self.task_payload if self.task_payload is not None else "",
+                self.implementation if self.implementation is not None else "",
                 self.task_details,
                 self.task_count,
                 *self.get_avg_runtimes(),
+                self.startup_runtime if self.startup_runtime is not None else "",
                 self.get_tasks_per_second(),
                 tps_speedup,
+                implementation_speedup if implementation_speedup is not None else "",
+                "yes" if self.recommended else "",
+                *[
+                    self.get_avg_metric(name) if name in self.metrics else ""
+                    for name in METRIC_COLUMNS
+                ],
+                *self.get_summary(),
             ]
         ]
 
@@ -51,9 +325,47 @@ class Runner:
         print(f"AVG work: {round(avgs[1], 3)}")
         print(f"AVG per task: {round(avgs[2], 3)}")
         print(f"AVG total: {round(avgs[3], 3)}")
+        if self.startup_runtime is not None:
+            print(f"Pool startup: {round(self.startup_runtime, 3)}")
+        for name, header in METRIC_COLUMNS.items():
+            if name in self.metrics:
+                print(f"AVG {header}: {round(self.get_avg_metric(name), 3)}")
+        if len(self.task_samples) > 0:
+            p50, p90, p99, p100 = percentiles(self.get_task_runtimes(), PERCENTILES)
+            print(
+                f"Task p50/p90/p99/max: {round(p50, 3)}/{round(p90, 3)}/{round(p99, 3)}/{round(p100, 3)}"
+            )
         print()
 
 
 def print_runtimes(runners: dict[str, Runner]):
     for _, runner in runners.items():
         runner.print_runtimes()
+
+
+def save_task_profiles(runners: dict[str, Runner], basename: str) -> str:
+    """
+    Save the merged profile of every profiled runner into its own file, and the summary of
+    all of them into a text file.
+
+    Returns:
+        str: The name of the summary file, None if no runner was profiled.
+    """
+    lines = []
+    for _, runner in runners.items():
+        if runner.task_profiles is None:
+            continue
+
+        filename = runner.task_profiles.save(f"{basename}__{runner.name}")
+        lines.append(f"Profile of {runner.name} ({runner.task_profiles.profiler}):")
+        lines.extend(runner.task_profiles.get_summary())
+        lines.append(f"Saved to {filename}")
+        lines.append("")
+
+    if len(lines) == 0:
+        return None
+
+    summary_filename = f"{basename}__profiles.txt"
+    with open(summary_filename, "w") as file:
+        file.write("\n".join(lines))
+    return summary_filename
@@ -0,0 +1,60 @@
+from array import array
+
+import numpy as np
+
+
+class TaskSamples:
+    """
+    Per-task timings of a test pass, in the order the tasks completed.
+
+    Kept in typed arrays instead of lists of tuples, so large task counts stay compact and the
+    values can be viewed as numpy arrays without copying.
+    """
+
+    def __init__(self):
+        self.indexes = array("q")
+        self.runtimes = array("d")
+        self.queue_waits = array("d")
+        self.cpu_times = array("d")
+
+    def add(
+        self,
+        index: int,
+        runtime: float,
+        queue_wait: float,
+        cpu_time: float = float("nan"),
+    ):
+        self.indexes.append(index)
+        self.runtimes.append(runtime)
+        self.queue_waits.append(queue_wait)
+        self.cpu_times.append(cpu_time)
+
+    def get_runtimes(self) -> np.ndarray:
+        return np.frombuffer(self.runtimes, dtype=np.float64)
+
+    def get_queue_waits(self) -> np.ndarray:
+        return np.frombuffer(self.queue_waits, dtype=np.float64)
+
+    def get_cpu_times(self) -> np.ndarray:
+        return np.frombuffer(self.cpu_times, dtype=np.float64)
+
+    def get_cpu_time_sum(self) -> float:
+        """
+        The total CPU time of the tasks, tasks whose CPU time is not known (NaN) are skipped.
+        """
+        if len(self) == 0:
+            return 0
+        return float(np.nansum(self.get_cpu_times()))
+
+    def get_makespan_lower_bound(self, workers: int) -> float:
+        """
+        The shortest possible time to run the tasks on the workers: no schedule can finish
+        before the work is spread evenly across the workers, or before the longest task ends.
+        """
+        if len(self) == 0:
+            return 0
+        runtimes = self.get_runtimes()
+        return max(float(runtimes.sum()) / max(workers, 1), float(runtimes.max()))
+
+    def __len__(self) -> int:
+        return len(self.indexes)
@@ -1,19 +1,63 @@
 import datetime
 import time
 
+# Which CPU time a timer measures: the whole process including threads started by
+# libraries (BLAS, OpenCV), or only the calling thread. The latter is needed when
+# several tasks run as threads of the same process.
+CPU_CLOCK_PROCESS = "process"
+CPU_CLOCK_THREAD = "thread"
+
+# Subtracted from the performance counter by now() and start(), so a process on another
+# host can report times on the clock of the process that compares them, see set_clock_offset
+clock_offset = 0.0
+
+
+def set_clock_offset(offset: float):
+    """
+    Set how far this process's clock is ahead of the clock its times are compared with.
+    """
+    global clock_offset
+    clock_offset = offset
+
 
 class Timer:
-    def __init__(self, start_now=False):
+    """
+    Measures wall time with the monotonic, high resolution performance counter, and the CPU
+    time spent in the meantime.
+    """
+
+    def __init__(self, start_now=False, cpu_clock: str = CPU_CLOCK_PROCESS):
+        self.cpu_clock = cpu_clock
         self.start_time = None
+        self.start_time_ns = None
+        self.start_cpu_time_ns = None
 
         if start_now:
             self.start()
 
+    @staticmethod
+    def now() -> float:
+        """
+        The current time on the clock timers use. The performance counter is system-wide on
+        Linux, macOS and Windows, so values are comparable between processes.
+        """
+        return time.perf_counter_ns() / 1e9 - clock_offset
+
+    def get_cpu_time_ns(self) -> int:
+        if self.cpu_clock == CPU_CLOCK_THREAD:
+            return time.thread_time_ns()
+        return time.process_time_ns()
+
     def start(self):
-        self.start_time = time.time()
+        self.start_cpu_time_ns = self.get_cpu_time_ns()
+        self.start_time_ns = time.perf_counter_ns()
+        self.start_time = self.start_time_ns / 1e9 - clock_offset
 
     def get_duration(self) -> float:
-        return time.time() - self.start_time
+        return (time.perf_counter_ns() - self.start_time_ns) / 1e9
+
+    def get_cpu_duration(self) -> float:
+        return (self.get_cpu_time_ns() - self.start_cpu_time_ns) / 1e9
 
     def get_duration_str(self) -> str:
         return str(datetime.timedelta(seconds=self.get_duration()))
@@ -1,6 +1,13 @@
+from typing import Callable
+
 import cv2
 import numpy as np
 
+from util.math import split_range
+
+# Rows and columns of the tile grid CLAHE equalizes the histograms in
+CLAHE_GRID_SIZE = 8
+
 
 def img_manipulation_task(imgs: list[np.ndarray], work_index: int) -> list[np.ndarray]:
     imgs_out = []
@@ -13,13 +20,80 @@ def img_manipulation_task(imgs: list[np.ndarray], work_index: int) -> list[np.nd
     return imgs_out
 
 
+def split_img_manipulation_task(
+    map_parts: Callable[[Callable, list[list]], list],
+    parts: int,
+    imgs: list[np.ndarray],
+    work_index: int = 0,
+) -> list[np.ndarray]:
+    """
+    Data-parallel version of img_manipulation_task: every image is cropped and resized, and
+    then split into horizontal strips along the rows of the CLAHE tile grid, which are
+    contrast enhanced by a part each and stacked again. Resizing the strips separately would
+    shift their contents, so it stays with the caller.
+
+    Args:
+        map_parts (Callable): Runs a function for every list of arguments on the workers and
+                              returns the results in order.
+        parts (int): Number of parts to split the work into, at most the tile grid size.
+        imgs (list[np.ndarray]): Images to process.
+        work_index (int): Index of the task.
+    """
+    parts = min(parts, CLAHE_GRID_SIZE)
+
+    imgs_out = []
+    for img in imgs:
+        img_out = img_crop(img, 1.0)
+        img_out = img_resize(img_out, 512)
+        h = img_out.shape[0]
+
+        # Every strip is enhanced with a halo of one tile row on each side, so the
+        # interpolation between the tiles at its edges is the same as in the whole image
+        strips = []
+        for i in range(parts):
+            tile_start, tile_stop = split_range(CLAHE_GRID_SIZE, parts, i)
+            halo_start = max(tile_start - 1, 0)
+            halo_stop = min(tile_stop + 1, CLAHE_GRID_SIZE)
+            row_start = h * halo_start // CLAHE_GRID_SIZE
+            strips.append(
+                [
+                    img_out[row_start : h * halo_stop // CLAHE_GRID_SIZE],
+                    2.0,
+                    (CLAHE_GRID_SIZE, halo_stop - halo_start),
+                    (
+                        h * tile_start // CLAHE_GRID_SIZE - row_start,
+                        h * tile_stop // CLAHE_GRID_SIZE - row_start,
+                    ),
+                ]
+            )
+
+        imgs_out.append(np.vstack(map_parts(img_enhance_contrast_strip, strips)))
+
+    return imgs_out
+
+
+def img_enhance_contrast_strip(
+    img: np.ndarray,
+    amount: float,
+    tile_grid_size: tuple[int, int],
+    rows: tuple[int, int],
+) -> np.ndarray:
+    img = img_enhance_contrast(img, amount, tile_grid_size)
+    return img[rows[0] : rows[1]]
+
+
 def img_resize(img: np.ndarray, max_size: int) -> np.ndarray:
+    return cv2.resize(img, get_resized_dims(img, max_size))
+
+
+def get_resized_dims(img: np.ndarray, max_size: int) -> tuple[int, int]:
+    """
+    Get the width and height that fit an image into max_size, keeping its aspect ratio.
+    """
     h, w = img.shape[:2]
     if h > w:
-        img = cv2.resize(img, (int(w * max_size / h), max_size))
-    else:
-        img = cv2.resize(img, (max_size, int(h * max_size / w)))
-    return img
+        return (int(w * max_size / h), max_size)
+    return (max_size, int(h * max_size / w))
 
 
 def img_crop(img: np.ndarray, aspect_ratio: float) -> np.ndarray:
@@ -35,10 +109,14 @@ def img_crop(img: np.ndarray, aspect_ratio: float) -> np.ndarray:
     return img
 
 
-def img_enhance_contrast(img: np.ndarray, amount: float = 2.0) -> np.ndarray:
+def img_enhance_contrast(
+    img: np.ndarray,
+    amount: float = 2.0,
+    tile_grid_size: tuple[int, int] = (CLAHE_GRID_SIZE, CLAHE_GRID_SIZE),
+) -> np.ndarray:
     lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
     l, a, b = cv2.split(lab)
-    clahe = cv2.createCLAHE(clipLimit=amount, tileGridSize=(8, 8))
+    clahe = cv2.createCLAHE(clipLimit=amount, tileGridSize=tile_grid_size)
     cl = clahe.apply(l)
     limg = cv2.merge((cl, a, b))
     enhanced_img = cv2.cvtColor(limg, cv2.COLOR_LAB2BGR)
@@ -1,5 +1,22 @@
+import asyncio
+import mmap
 import os
 import random
+import sys
+
+# Size of the blocks the async variants hand to the executor at a time
+ASYNC_CHUNK_BYTES = 4 * 1024 * 1024
+
+# Size of the blocks payloads are written in
+WRITE_CHUNK_BYTES = 1024 * 1024
+
+COPY_SENDFILE = "sendfile"
+COPY_FILE_RANGE = "copy_file_range"
+COPY_MMAP = "mmap"
+COPY_METHODS = [COPY_SENDFILE, COPY_FILE_RANGE, COPY_MMAP]
+
+# Random payload generated once per worker process and reused by all its tasks
+payload_cache: bytes = b""
 
 
 def io_task(filesize_mb: int, work_index: int):
@@ -20,6 +37,140 @@ def io_task(filesize_mb: int, work_index: int):
     os.remove(copy_filename)
 
 
+async def async_io_task(filesize_mb: int, work_index: int):
+    """
+    Same work as io_task, but the file operations are done block by block in the event loop's
+    default executor, so other tasks can run while this one waits on the drive.
+    """
+    os.makedirs("tmp/write", exist_ok=True)
+    os.makedirs("tmp/copy", exist_ok=True)
+
+    filename = f"tmp/write/random_file_{work_index}.bin"
+    await async_write_random_file(filename, filesize_mb * 1024 * 1024)
+
+    copy_filename = f"tmp/copy/copy_file_{work_index}.bin"
+    await async_copy_file(filename, copy_filename)
+
+    os.remove(filename)
+    os.remove(copy_filename)
+
+
+async def async_write_random_file(filename: str, nbytes: int):
+    """
+    Write nbytes of random data block by block. The blocks are generated in the executor as
+    well, generating all of them at once would block the event loop.
+    """
+    with open(filename, "wb") as f:
+        for start in range(0, nbytes, ASYNC_CHUNK_BYTES):
+            chunk_bytes = min(ASYNC_CHUNK_BYTES, nbytes - start)
+            chunk = await asyncio.to_thread(os.urandom, chunk_bytes)
+            await asyncio.to_thread(f.write, chunk)
+
+
+async def async_copy_file(src_filename: str, dst_filename: str):
+    with open(src_filename, "rb") as f_in:
+        with open(dst_filename, "wb") as f_out:
+            while True:
+                chunk = await asyncio.to_thread(f_in.read, ASYNC_CHUNK_BYTES)
+                if not chunk:
+                    break
+                await asyncio.to_thread(f_out.write, chunk)
+
+
+def zero_copy_io_task(
+    filesize_mb: int,
+    copy_method: str = COPY_SENDFILE,
+    reuse_payload: bool = False,
+    work_index: int = 0,
+):
+    """
+    Same work as io_task, but the copy is done without passing the data through Python
+    buffers, with os.sendfile, os.copy_file_range or a memory mapped source file. The random
+    payload can be generated once per worker and reused, to leave out the CPU cost of
+    generating it.
+    """
+    os.makedirs("tmp/write", exist_ok=True)
+    os.makedirs("tmp/copy", exist_ok=True)
+
+    filename = f"tmp/write/random_file_{work_index}.bin"
+    write_file(filename, get_random_payload(filesize_mb * 1024 * 1024, reuse_payload))
+
+    copy_filename = f"tmp/copy/copy_file_{work_index}.bin"
+    copy_file(filename, copy_filename, copy_method)
+
+    os.remove(filename)
+    os.remove(copy_filename)
+
+
+def get_random_payload(nbytes: int, reuse: bool = False) -> memoryview:
+    """
+    Get nbytes of random data. When reused, the data is generated once per process and
+    later calls get a view of it, so the same bytes are written again.
+    """
+    global payload_cache
+
+    if not reuse:
+        return memoryview(os.urandom(nbytes))
+
+    if len(payload_cache) < nbytes:
+        payload_cache = os.urandom(nbytes)
+    return memoryview(payload_cache)[:nbytes]
+
+
+def write_file(filename: str, data: memoryview):
+    with open(filename, "wb") as f:
+        for start in range(0, len(data), WRITE_CHUNK_BYTES):
+            f.write(data[start : start + WRITE_CHUNK_BYTES])
+
+
+def copy_file(src_filename: str, dst_filename: str, copy_method: str):
+    with open(src_filename, "rb") as f_in:
+        with open(dst_filename, "wb") as f_out:
+            size = os.fstat(f_in.fileno()).st_size
+            if size == 0:
+                return
+
+            if copy_method == COPY_MMAP:
+                with mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    f_out.write(mapped)
+                return
+
+            # Both can copy less than requested, so loop until done
+            offset = 0
+            while offset < size:
+                if copy_method == COPY_SENDFILE:
+                    copied = os.sendfile(
+                        f_out.fileno(), f_in.fileno(), offset, size - offset
+                    )
+                else:
+                    copied = os.copy_file_range(
+                        f_in.fileno(), f_out.fileno(), size - offset
+                    )
+                if copied == 0:
+                    break
+                offset += copied
+
+
+def get_available_copy_methods() -> list[str]:
+    """
+    Get the copy methods supported on this platform. sendfile only accepts a regular file as
+    the destination on Linux, copy_file_range only exists on Linux.
+    """
+    methods = []
+    if sys.platform.startswith("linux"):
+        methods.append(COPY_SENDFILE)
+    if hasattr(os, "copy_file_range"):
+        methods.append(COPY_FILE_RANGE)
+    methods.append(COPY_MMAP)
+    return methods
+
+
 def io_task_random_params() -> list:
     filesize_mb = random.randint(1, 100)
     return [filesize_mb]
+
+
+def zero_copy_io_task_random_params() -> list:
+    filesize_mb = random.randint(1, 100)
+    copy_method = random.choice(get_available_copy_methods())
+    return [filesize_mb, copy_method, True]
@@ -1,9 +1,11 @@
 import random
 import numpy as np
 
+from util.generator import get_numpy_random
+
 
 def matrix_inversion_task(size: int, work_index: int = 0) -> np.ndarray:
-    matrix = np.random.rand(size, size)
+    matrix = get_numpy_random().random((size, size))
     return np.linalg.inv(matrix)
 
 
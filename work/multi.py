@@ -1,13 +1,99 @@
+import math
 import random
+from typing import Callable
 
+import numpy as np
+
+from util.math import split_range
+from work.sum import (
+    IMPLEMENTATION_BUILTIN,
+    IMPLEMENTATION_CHUNKED,
+    IMPLEMENTATION_LOOP,
+    IMPLEMENTATION_NUMPY,
+    NUMPY_BLOCK_SIZE,
+)
+
+FACTOR = 1.00001
+
+
+def multiplication_task(
+    size: int,
+    implementation: str = IMPLEMENTATION_LOOP,
+    chunks: int = 1,
+    work_index: int = 0,
+) -> float:
+    """
+    Multiplies by a constant factor size times.
+
+    Args:
+        size (int): Number of multiplications.
+        implementation (str): "loop" for an interpreted for loop, "builtin" for the closed
+                              form with math.pow, "numpy" for vectorized products, or
+                              "chunked" for the loop over chunks parts of size whose partial
+                              products are multiplied. split_multiplication_task runs the
+                              parts on the workers.
+        chunks (int): Number of parts size is split into with "chunked".
+        work_index (int): Index of the task.
+
+    Returns:
+        float: The product. Rounding differs slightly between the implementations.
+    """
+    if implementation == IMPLEMENTATION_BUILTIN:
+        return math.pow(FACTOR, size)
+
+    if implementation == IMPLEMENTATION_NUMPY:
+        out = 1.0
+        for start in range(0, size, NUMPY_BLOCK_SIZE):
+            block_size = min(NUMPY_BLOCK_SIZE, size - start)
+            out *= float(np.full(block_size, FACTOR).prod())
+        return out
+
+    if implementation == IMPLEMENTATION_CHUNKED:
+        return math.prod(
+            multiplication_task(stop - start)
+            for start, stop in [split_range(size, chunks, i) for i in range(chunks)]
+        )
 
-def multiplication_task(size: int, work_index: int = 0) -> float:
     out = 1
     for _ in range(size):
-        out *= 1.00001
+        out *= FACTOR
     return out
 
 
+def split_multiplication_task(
+    map_parts: Callable[[Callable, list[list]], list],
+    parts: int,
+    size: int,
+    implementation: str = IMPLEMENTATION_LOOP,
+    chunks: int = 1,
+    work_index: int = 0,
+) -> float:
+    """
+    Data-parallel version of multiplication_task as a reduction: size is split into one
+    part per worker, every part is multiplied with the implementation (the loop for
+    "chunked", whose chunks are the parts here) and the partial products are multiplied.
+
+    Args:
+        map_parts (Callable): Runs a function for every list of arguments on the workers and
+                              returns the results in order.
+        parts (int): Number of parts to split the work into.
+        size (int): Number of multiplications.
+        implementation (str): How every part is multiplied, see multiplication_task.
+        chunks (int): Ignored, the size is split into parts.
+        work_index (int): Index of the task.
+    """
+    if implementation == IMPLEMENTATION_CHUNKED:
+        implementation = IMPLEMENTATION_LOOP
+
+    part_sizes = [
+        stop - start
+        for start, stop in [split_range(size, parts, i) for i in range(parts)]
+    ]
+    return math.prod(
+        map_parts(multiplication_task, [[x, implementation] for x in part_sizes])
+    )
+
+
 def multiplication_task_random_params() -> list:
     size = random.randint(10000, 10000000)
-    return [size]
+    return [size, IMPLEMENTATION_LOOP, 1]
@@ -1,10 +1,30 @@
 import hashlib
 import math
 import random
+import string
 
 import numpy as np
 
-from util.generator import generate_random_str
+from util.generator import generate_random_str, get_numpy_random, get_random
+
+HASH_MODE_SHA256 = "sha256"
+HASH_MODE_PBKDF2 = "pbkdf2"
+HASH_MODE_SCRYPT = "scrypt"
+HASH_MODES = [HASH_MODE_SHA256, HASH_MODE_PBKDF2, HASH_MODE_SCRYPT]
+
+# Work factors of the key derivation modes. Lower than what is recommended for storing
+# real passwords, so a task takes milliseconds instead of seconds per hash.
+PBKDF2_ITERATIONS = 10000
+SCRYPT_N = 2**12
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+
+# The same characters generate_random_str uses
+PASSWORD_ALPHABET = np.frombuffer(
+    (string.ascii_lowercase + string.ascii_uppercase + string.digits).encode(),
+    dtype=np.uint8,
+)
 
 
 def password_hashing_and_checking_task(
@@ -58,15 +78,15 @@ def generate_test_passwords(
     correct_test_password_pool = stored_passwords
     if correct_test_password_count > stored_passwords_count:
         ratio = int(math.ceil(correct_test_password_count / stored_passwords_count))
-        correct_test_password_pool = random.choices(
+        correct_test_password_pool = get_random().choices(
             stored_passwords, k=int(stored_passwords_count * ratio)
         )
 
-    correct_test_passwords = random.sample(
+    correct_test_passwords = get_random().sample(
         correct_test_password_pool, correct_test_password_count
     )
     test_passwords = correct_test_passwords + incorrect_test_passwords
-    random.shuffle(test_passwords)
+    get_random().shuffle(test_passwords)
 
     return test_passwords
 
@@ -87,7 +107,7 @@ def generate_passwords(
     passwords: list[str] = []
 
     for _ in range(passwords_count):
-        password_length = random.randint(*password_length_range)
+        password_length = get_random().randint(*password_length_range)
         password = generate_random_str(password_length)
 
         passwords.append(password)
@@ -100,6 +120,90 @@ def sha256_hash(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
 
+def bulk_password_hashing_and_checking_task(
+    stored_hashes_count: int,
+    tried_hashes_count: int,
+    password_length_range: tuple[int, int],
+    correct_hashes_ratio: float,
+    hash_mode: str = HASH_MODE_SHA256,
+    work_index: int = 0,
+) -> int:
+    """
+    A high-throughput variant of password_hashing_and_checking_task. Passwords are generated
+    in one batch from a numpy byte buffer, hashed to digest bytes and looked up in a set,
+    so the task measures hashing instead of scanning the stored hashes.
+
+    Args:
+        stored_hashes_count (int): Number of stored password hashes.
+        tried_hashes_count (int): Number of passwords to hash and check.
+        password_length_range (tuple): Range of password lengths (min, max).
+        correct_hashes_ratio (float): Share of the tried passwords that are stored ones.
+        hash_mode (str): "sha256", or the key derivation functions "pbkdf2" or "scrypt".
+        work_index (int): Index of the task.
+
+    Returns:
+        int: Number of tried passwords that matched a stored hash.
+    """
+    # Drawn from the task's generator, so seeding that makes the task reproducible
+    rng = np.random.default_rng(get_numpy_random().integers(2**32))
+
+    stored_passwords = generate_password_batch(
+        stored_hashes_count, password_length_range, rng
+    )
+
+    correct_count = int(tried_hashes_count * correct_hashes_ratio)
+    correct_indexes = rng.choice(
+        stored_hashes_count,
+        size=correct_count,
+        replace=correct_count > stored_hashes_count,
+    )
+    test_passwords = [stored_passwords[i] for i in correct_indexes.tolist()]
+    test_passwords += generate_password_batch(
+        tried_hashes_count - correct_count, password_length_range, rng
+    )
+    get_random().shuffle(test_passwords)
+
+    # All hashes share the salt, otherwise they could not be indexed
+    salt = rng.bytes(SALT_BYTES)
+    stored_hashes = {hash_password(pwd, hash_mode, salt) for pwd in stored_passwords}
+
+    hashes_matched = 0
+    for password in test_passwords:
+        if hash_password(password, hash_mode, salt) in stored_hashes:
+            hashes_matched += 1
+
+    return hashes_matched
+
+
+def generate_password_batch(
+    passwords_count: int,
+    password_length_range: tuple[int, int],
+    rng: np.random.Generator,
+) -> list[bytes]:
+    """
+    Generates random passwords by slicing a single random byte buffer.
+    """
+    lengths = rng.integers(
+        password_length_range[0], password_length_range[1] + 1, size=passwords_count
+    )
+    buffer = PASSWORD_ALPHABET[
+        rng.integers(0, len(PASSWORD_ALPHABET), size=int(lengths.sum()))
+    ].tobytes()
+
+    ends = np.cumsum(lengths).tolist()
+    starts = [0] + ends[:-1]
+    return [buffer[start:end] for start, end in zip(starts, ends)]
+
+
+def hash_password(password: bytes, hash_mode: str, salt: bytes) -> bytes:
+    """Hashes a password into digest bytes."""
+    if hash_mode == HASH_MODE_PBKDF2:
+        return hashlib.pbkdf2_hmac("sha256", password, salt, PBKDF2_ITERATIONS)
+    if hash_mode == HASH_MODE_SCRYPT:
+        return hashlib.scrypt(password, salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+    return hashlib.sha256(password).digest()
+
+
 def password_hashing_and_checking_task_random_params() -> list:
     """
     Generates random parameters for the password hashing and checking task.
@@ -119,3 +223,13 @@ def password_hashing_and_checking_task_random_params() -> list:
         password_length_range,
         correct_hashes_ratio,
     ]
+
+
+def bulk_password_hashing_and_checking_task_random_params() -> list:
+    """
+    Generates random parameters for the bulk password hashing and checking task.
+
+    Returns:
+        list: Randomly generated parameters for the task, always using SHA-256.
+    """
+    return password_hashing_and_checking_task_random_params() + [HASH_MODE_SHA256]
@@ -1,12 +1,74 @@
 import random
+from typing import Callable
+
 import numpy as np
 
+from util.generator import get_numpy_random
+from util.math import split_range
+
 
 def sorting_task(size: int, work_index: int = 0) -> np.ndarray:
-    data = np.random.rand(size)
+    data = get_numpy_random().random(size)
     return np.sort(data)
 
 
+def split_sorting_task(
+    map_parts: Callable[[Callable, list[list]], list],
+    parts: int,
+    size: int,
+    work_index: int = 0,
+) -> np.ndarray:
+    """
+    Data-parallel version of sorting_task as a sample sort: every part generates and sorts
+    its share of the data, the sorted chunks are split into value ranges at splitters
+    sampled from them, and the slices of every value range are merged by a part of its own.
+    The merged ranges only need to be concatenated.
+
+    Args:
+        map_parts (Callable): Runs a function for every list of arguments on the workers and
+                              returns the results in order.
+        parts (int): Number of parts to split the work into.
+        size (int): Number of values to sort.
+        work_index (int): Index of the task.
+    """
+    # Every part needs at least one value to sample splitters from
+    parts = max(min(parts, size), 1)
+
+    chunk_sizes = [
+        stop - start
+        for start, stop in [split_range(size, parts, i) for i in range(parts)]
+    ]
+    chunks = map_parts(generate_sorted_chunk, [[x] for x in chunk_sizes])
+
+    # Evenly spaced elements of the sorted chunks are a sample of the distribution
+    samples = np.sort(
+        np.concatenate([chunk[:: max(len(chunk) // parts, 1)] for chunk in chunks])
+    )
+    splitters = np.array(
+        [samples[split_range(len(samples), parts, i)[0]] for i in range(1, parts)]
+    )
+
+    # The start and end of every value range in every chunk
+    bounds = [
+        [0, *np.searchsorted(chunk, splitters).tolist(), len(chunk)] for chunk in chunks
+    ]
+    ranges = [
+        [[chunk[bound[i] : bound[i + 1]] for chunk, bound in zip(chunks, bounds)]]
+        for i in range(parts)
+    ]
+
+    return np.concatenate(map_parts(merge_sorted_chunks, ranges))
+
+
+def generate_sorted_chunk(size: int) -> np.ndarray:
+    return np.sort(get_numpy_random().random(size))
+
+
+def merge_sorted_chunks(chunks: list[np.ndarray]) -> np.ndarray:
+    # Numpy's vectorized quicksort beats merging the sorted runs with a timsort
+    return np.sort(np.concatenate(chunks))
+
+
 def sorting_task_random_params() -> list:
     size = random.randint(200000, 10000000)
     return [size]
@@ -1,13 +1,100 @@
 import random
+from typing import Callable
 
+import numpy as np
+
+from util.math import split_range
+
+IMPLEMENTATION_LOOP = "loop"
+IMPLEMENTATION_BUILTIN = "builtin"
+IMPLEMENTATION_NUMPY = "numpy"
+IMPLEMENTATION_CHUNKED = "chunked"
+IMPLEMENTATIONS = [
+    IMPLEMENTATION_LOOP,
+    IMPLEMENTATION_BUILTIN,
+    IMPLEMENTATION_NUMPY,
+    IMPLEMENTATION_CHUNKED,
+]
+
+# Numpy implementations work in blocks of this many elements to bound memory use
+NUMPY_BLOCK_SIZE = 1024 * 1024
+
+
+def summing_task(
+    size: int,
+    implementation: str = IMPLEMENTATION_LOOP,
+    chunks: int = 1,
+    work_index: int = 0,
+) -> int:
+    """
+    Adds 1 size times.
+
+    Args:
+        size (int): Number of additions.
+        implementation (str): "loop" for an interpreted for loop, "builtin" for the closed
+                              form (the sum is size), "numpy" for vectorized sums, or "chunked"
+                              for the loop over chunks parts of size whose partial sums are
+                              added up. split_summing_task runs the parts on the workers.
+        chunks (int): Number of parts size is split into with "chunked".
+        work_index (int): Index of the task.
+
+    Returns:
+        int: The sum.
+    """
+    if implementation == IMPLEMENTATION_BUILTIN:
+        return size
+
+    if implementation == IMPLEMENTATION_NUMPY:
+        out = 0
+        for start in range(0, size, NUMPY_BLOCK_SIZE):
+            block_size = min(NUMPY_BLOCK_SIZE, size - start)
+            out += int(np.ones(block_size, dtype=np.int64).sum())
+        return out
+
+    if implementation == IMPLEMENTATION_CHUNKED:
+        return sum(
+            summing_task(stop - start)
+            for start, stop in [split_range(size, chunks, i) for i in range(chunks)]
+        )
 
-def summing_task(size: int, work_index: int = 0) -> int:
     out = 0
     for _ in range(size):
         out += 1
     return out
 
 
+def split_summing_task(
+    map_parts: Callable[[Callable, list[list]], list],
+    parts: int,
+    size: int,
+    implementation: str = IMPLEMENTATION_LOOP,
+    chunks: int = 1,
+    work_index: int = 0,
+) -> int:
+    """
+    Data-parallel version of summing_task as a reduction: size is split into one part per
+    worker, every part is summed with the implementation (the loop for "chunked", whose
+    chunks are the parts here) and the partial sums are added up.
+
+    Args:
+        map_parts (Callable): Runs a function for every list of arguments on the workers and
+                              returns the results in order.
+        parts (int): Number of parts to split the work into.
+        size (int): Number of additions.
+        implementation (str): How every part is summed, see summing_task.
+        chunks (int): Ignored, the size is split into parts.
+        work_index (int): Index of the task.
+    """
+    if implementation == IMPLEMENTATION_CHUNKED:
+        implementation = IMPLEMENTATION_LOOP
+
+    part_sizes = [
+        stop - start
+        for start, stop in [split_range(size, parts, i) for i in range(parts)]
+    ]
+    return sum(map_parts(summing_task, [[x, implementation] for x in part_sizes]))
+
+
 def summing_task_random_params() -> list:
     size = random.randint(10000, 10000000)
-    return [size]
+    return [size, IMPLEMENTATION_LOOP, 1]
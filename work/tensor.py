@@ -1,7 +1,12 @@
 import math
 import random
+from typing import Callable
+
 import numpy as np
 
+from util.generator import get_numpy_random
+from util.math import split_range
+
 
 def tensor_task(size: int, tensor_count: int, work_index: int = 0) -> np.ndarray:
     a = get_tensor(size)
@@ -16,8 +21,44 @@ def tensor_task(size: int, tensor_count: int, work_index: int = 0) -> np.ndarray
     return a
 
 
+def split_tensor_task(
+    map_parts: Callable[[Callable, list[list]], list],
+    parts: int,
+    size: int,
+    tensor_count: int,
+    work_index: int = 0,
+) -> np.ndarray:
+    """
+    Data-parallel version of tensor_task as a blocked matrix product: for every product in
+    the chain the rows of the left matrix are split into blocks, every part multiplies one
+    block with the whole right matrix and the result blocks are stacked.
+
+    Args:
+        map_parts (Callable): Runs a function for every list of arguments on the workers and
+                              returns the results in order.
+        parts (int): Number of parts to split the work into.
+        size (int): Size of the square matrices.
+        tensor_count (int): Number of matrices to multiply.
+        work_index (int): Index of the task.
+    """
+    a = get_tensor(size)
+
+    for _ in range(tensor_count - 1):
+        b = get_tensor(size)
+        blocks = [split_range(size, parts, i) for i in range(parts)]
+        a = np.vstack(
+            map_parts(multiply_block, [[a[start:stop], b] for start, stop in blocks])
+        )
+
+    return a
+
+
+def multiply_block(a_block: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.dot(a_block, b)
+
+
 def get_tensor(size: int):
-    return np.random.rand(size, size)
+    return get_numpy_random().random((size, size))
 
 
 def tensor_multiply(a: np.ndarray, b: np.ndarray) -> np.ndarray:
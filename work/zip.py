@@ -1,6 +1,46 @@
+import asyncio
+import bz2
 import gzip
+import lzma
 import os
 import random
+import zlib
+
+from work.io import (
+    ASYNC_CHUNK_BYTES,
+    async_write_random_file,
+    get_random_payload,
+    write_file,
+)
+
+# zlib window bits for reading and writing the gzip format
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+# Size of the chunks the streaming variant compresses at a time
+STREAM_CHUNK_BYTES = 1024 * 1024
+
+CODEC_GZIP = "gzip"
+CODEC_ZLIB = "zlib"
+CODEC_BZ2 = "bz2"
+CODEC_LZMA = "lzma"
+
+# Compression level used when none is given, the same as each codec's module defaults
+# (gzip.open, zlib.compress, bz2.open, lzma.open)
+CODEC_DEFAULT_LEVELS = {
+    CODEC_GZIP: 9,
+    CODEC_ZLIB: zlib.Z_DEFAULT_COMPRESSION,
+    CODEC_BZ2: 9,
+    CODEC_LZMA: 6,
+}
+CODECS = list(CODEC_DEFAULT_LEVELS)
+
+# The compression levels every codec accepts, zlib also takes -1 for its default level
+CODEC_LEVEL_RANGES = {
+    CODEC_GZIP: range(-1, 10),
+    CODEC_ZLIB: range(-1, 10),
+    CODEC_BZ2: range(1, 10),
+    CODEC_LZMA: range(0, 10),
+}
 
 
 def file_compression_task(filesize_mb: int, work_index: int):
@@ -26,6 +66,138 @@ def file_compression_task(filesize_mb: int, work_index: int):
     os.remove(decompressed_filename)
 
 
+async def async_file_compression_task(filesize_mb: int, work_index: int):
+    """
+    Same work as file_compression_task, but streamed block by block: the file operations and
+    the (GIL releasing) zlib calls run in the event loop's default executor, so other tasks can
+    run in between. Produces the same gzip files.
+    """
+    os.makedirs("tmp/compress", exist_ok=True)
+    os.makedirs("tmp/decompress", exist_ok=True)
+
+    filename = f"tmp/compress/random_file_{work_index}.bin"
+    await async_write_random_file(filename, filesize_mb * 1024 * 1024)
+
+    compressed_filename = f"{filename}.gz"
+    compressor = zlib.compressobj(wbits=GZIP_WBITS)
+    await async_transform_file(
+        filename, compressed_filename, compressor.compress, compressor.flush
+    )
+
+    decompressed_filename = f"tmp/decompress/decompressed_file_{work_index}.bin"
+    decompressor = zlib.decompressobj(wbits=GZIP_WBITS)
+    await async_transform_file(
+        compressed_filename,
+        decompressed_filename,
+        decompressor.decompress,
+        decompressor.flush,
+    )
+
+    os.remove(filename)
+    os.remove(compressed_filename)
+    os.remove(decompressed_filename)
+
+
+async def async_transform_file(
+    src_filename: str, dst_filename: str, transform: callable, flush: callable
+):
+    with open(src_filename, "rb") as f_in:
+        with open(dst_filename, "wb") as f_out:
+            while True:
+                chunk = await asyncio.to_thread(f_in.read, ASYNC_CHUNK_BYTES)
+                if not chunk:
+                    break
+                transformed = await asyncio.to_thread(transform, chunk)
+                await asyncio.to_thread(f_out.write, transformed)
+            await asyncio.to_thread(f_out.write, flush())
+
+
+def stream_compression_task(
+    filesize_mb: int,
+    codec: str = CODEC_GZIP,
+    level: int = None,
+    reuse_payload: bool = False,
+    work_index: int = 0,
+):
+    """
+    Same work as file_compression_task, but compressed and decompressed as a stream of fixed
+    size chunks read into a reused buffer, so memory use does not grow with the file size.
+    The codec can be chosen from the standard library ones, and the random payload can be
+    generated once per worker and reused.
+    """
+    if level is None:
+        level = CODEC_DEFAULT_LEVELS[codec]
+
+    os.makedirs("tmp/compress", exist_ok=True)
+    os.makedirs("tmp/decompress", exist_ok=True)
+
+    filename = f"tmp/compress/random_file_{work_index}.bin"
+    write_file(filename, get_random_payload(filesize_mb * 1024 * 1024, reuse_payload))
+
+    compressed_filename = f"{filename}.{codec}"
+    compressor = get_compressor(codec, level)
+    transform_file(filename, compressed_filename, compressor.compress, compressor.flush)
+
+    decompressed_filename = f"tmp/decompress/decompressed_file_{work_index}.bin"
+    decompressor = get_decompressor(codec)
+    transform_file(
+        compressed_filename,
+        decompressed_filename,
+        decompressor.decompress,
+        # Only zlib buffers output until flushed
+        getattr(decompressor, "flush", bytes),
+    )
+
+    os.remove(filename)
+    os.remove(compressed_filename)
+    os.remove(decompressed_filename)
+
+
+def get_compressor(codec: str, level: int):
+    if codec == CODEC_GZIP:
+        return zlib.compressobj(level, wbits=GZIP_WBITS)
+    if codec == CODEC_ZLIB:
+        return zlib.compressobj(level)
+    if codec == CODEC_BZ2:
+        return bz2.BZ2Compressor(level)
+    if codec == CODEC_LZMA:
+        return lzma.LZMACompressor(preset=level)
+    raise ValueError(f"Invalid codec '{codec}', must be one of {CODECS}")
+
+
+def get_decompressor(codec: str):
+    if codec == CODEC_GZIP:
+        return zlib.decompressobj(wbits=GZIP_WBITS)
+    if codec == CODEC_ZLIB:
+        return zlib.decompressobj()
+    if codec == CODEC_BZ2:
+        return bz2.BZ2Decompressor()
+    if codec == CODEC_LZMA:
+        return lzma.LZMADecompressor()
+    raise ValueError(f"Invalid codec '{codec}', must be one of {CODECS}")
+
+
+def transform_file(
+    src_filename: str, dst_filename: str, transform: callable, flush: callable
+):
+    buffer = bytearray(STREAM_CHUNK_BYTES)
+    view = memoryview(buffer)
+    with open(src_filename, "rb") as f_in:
+        with open(dst_filename, "wb") as f_out:
+            while True:
+                size = f_in.readinto(buffer)
+                if not size:
+                    break
+                f_out.write(transform(view[:size]))
+            f_out.write(flush())
+
+
 def file_compression_task_random_params() -> list:
     filesize_mb = random.randint(1, 100)
     return [filesize_mb]
+
+
+def stream_compression_task_random_params() -> list:
+    filesize_mb = random.randint(1, 100)
+    codec = random.choice(CODECS)
+    return [filesize_mb, codec, None, True]
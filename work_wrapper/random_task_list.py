@@ -1,44 +1,43 @@
 import random
 import time
+from typing import Union
+
 import numpy as np
 
-from work.img import img_manipulation_task
-from work.io import io_task, io_task_random_params
-from work.matrix import matrix_inversion_task, matrix_inversion_task_random_params
-from work.multi import multiplication_task, multiplication_task_random_params
-from work.password import (
-    password_hashing_and_checking_task,
-    password_hashing_and_checking_task_random_params,
+from work_wrapper.task_types import (
+    RANDOM_DEFAULT_TASK_TYPES,
+    TASK_TYPES,
+    get_random_params_func,
+    get_task_func,
 )
-from work.sort import sorting_task, sorting_task_random_params
-from work.sum import summing_task, summing_task_random_params
-from work.tensor import tensor_task, tensor_task_random_params
-from work.zip import file_compression_task, file_compression_task_random_params
 
 
 def get_random_task_list(
-    task_count: int, task_types=list[str], img: np.ndarray = None
+    task_count: int, task_types=list[str], img: np.ndarray = None, seed: int = None
 ) -> list[tuple[callable, list]]:
+    return [
+        (task_func, task_args)
+        for _, task_func, task_args in get_random_named_task_list(
+            task_count, task_types, img, seed
+        )
+    ]
+
+
+def get_random_named_task_list(
+    task_count: int, task_types=list[str], img: np.ndarray = None, seed: int = None
+) -> list[tuple[str, callable, list]]:
+    """
+    Generate a random task list, with the task type name of every task.
+
+    With a seed the same list is generated every time, otherwise the generator is seeded from
+    the clock for every task.
+    """
     print(f"Generating a random task list of {task_count} tasks...")
 
-    task_option_pool = [
-        ("sum", summing_task, summing_task_random_params),
-        ("multi", multiplication_task, multiplication_task_random_params),
-        ("io", io_task, io_task_random_params),
-        ("zip", file_compression_task, file_compression_task_random_params),
-        ("tensor", tensor_task, tensor_task_random_params),
-        ("sort", sorting_task, sorting_task_random_params),
-        ("matrix", matrix_inversion_task, matrix_inversion_task_random_params),
-        (
-            "password",
-            password_hashing_and_checking_task,
-            password_hashing_and_checking_task_random_params,
-        ),
-        ("img", img_manipulation_task, [[img]]),
-    ]
+    task_option_pool = get_task_option_pool(img, task_types)
 
     task_options = []
-    # If no task types are specified, use all available task types
+    # If no task types are specified, use the default task types
     if len(task_types) == 0:
         task_options = task_option_pool
     else:
@@ -51,9 +50,14 @@ def get_random_task_list(
     print("Using task types: ", [opt[0] for opt in task_options])
     print()
 
+    # The random params functions all draw from the random module
+    if seed is not None:
+        random.seed(seed)
+
     task_list = []
     for _ in range(task_count):
-        random.seed(time.time())
+        if seed is None:
+            random.seed(time.time())
         task_tuple = task_options[random.randint(0, len(task_options) - 1)]
         task_name = task_tuple[0]
         task_func = task_tuple[1]
@@ -62,6 +66,27 @@ def get_random_task_list(
         else:
             task_args = task_tuple[2]()
 
-        task_list.append((task_func, task_args))
+        task_list.append((task_name, task_func, task_args))
 
     return task_list
+
+
+def get_task_option_pool(
+    img: np.ndarray = None, task_types: list[str] = None
+) -> list[tuple[str, callable, Union[callable, list]]]:
+    """
+    Get the task types the random task list is drawn from, by name, with their task function
+    and a function generating random arguments for it (or the fixed arguments). Only the
+    modules of the given task types are imported, of the default task types if none are given.
+    """
+    if task_types is None or len(task_types) == 0:
+        task_types = RANDOM_DEFAULT_TASK_TYPES
+    return [
+        (
+            name,
+            get_task_func(name),
+            [[img]] if name == "img" else get_random_params_func(name),
+        )
+        for name in TASK_TYPES
+        if name in task_types
+    ]
@@ -0,0 +1,127 @@
+import math
+
+from util.samples import TaskSamples
+
+COST_MODEL_PARAMS = "params"
+COST_MODEL_LEARNED = "learned"
+COST_MODELS = [COST_MODEL_PARAMS, COST_MODEL_LEARNED]
+
+# Hashes of the bulk password task per SHA-256 hash, by hash mode
+HASH_MODE_COST_UNITS = {"pbkdf2": 3000, "scrypt": 8000}
+
+
+def get_password_cost_units(args: list) -> float:
+    # Every tried password is compared with all stored hashes, which outweighs the hashing
+    return args[0] + args[0] * args[1] / 400
+
+
+def get_bulk_password_cost_units(args: list) -> float:
+    hash_mode = args[4] if len(args) > 4 else None
+    return (args[0] + args[1]) * HASH_MODE_COST_UNITS.get(hash_mode, 1)
+
+
+# How much work a task does in the units of its own task type, from the same parameters
+# the *_random_params functions draw. Only comparable between tasks of the same type. By the
+# name of the task function, so the task modules don't have to be imported.
+TASK_COST_UNITS = {
+    "summing_task": lambda args: args[0],
+    "multiplication_task": lambda args: args[0],
+    "io_task": lambda args: args[0],
+    "zero_copy_io_task": lambda args: args[0],
+    "file_compression_task": lambda args: args[0],
+    "stream_compression_task": lambda args: args[0],
+    "tensor_task": lambda args: args[0] ** 3 * max(args[1] - 1, 1),
+    "sorting_task": lambda args: args[0] * math.log2(max(args[0], 2)),
+    "matrix_inversion_task": lambda args: args[0] ** 3,
+    "password_hashing_and_checking_task": get_password_cost_units,
+    "bulk_password_hashing_and_checking_task": get_bulk_password_cost_units,
+    "img_manipulation_task": lambda args: len(args[0]),
+}
+
+# Seconds per cost unit of every task type, measured on one core of an Intel Xeon server
+# with the loop implementation of sum and multi and the gzip codec of zip_stream. Only the
+# ratios between the task types matter for the order of the tasks, so the estimates stay
+# comparable across task types on other machines.
+TASK_SECONDS_PER_UNIT = {
+    "summing_task": 5.5e-8,
+    "multiplication_task": 4.5e-8,
+    "io_task": 7e-3,
+    "zero_copy_io_task": 5e-3,
+    "file_compression_task": 7.5e-2,
+    "stream_compression_task": 5e-2,
+    "tensor_task": 1e-10,
+    "sorting_task": 1e-9,
+    "matrix_inversion_task": 2e-10,
+    "password_hashing_and_checking_task": 1e-5,
+    "bulk_password_hashing_and_checking_task": 2e-6,
+    "img_manipulation_task": 2e-2,
+}
+
+
+def get_task_cost_units(task_func: callable, task_args: list) -> float:
+    """
+    Estimate the work of a task from its parameters, tasks of unknown types count as one unit.
+    """
+    if task_func.__name__ not in TASK_COST_UNITS:
+        return 1.0
+    return float(TASK_COST_UNITS[task_func.__name__](task_args))
+
+
+def get_task_seconds(task_func: callable, task_args: list) -> float:
+    """
+    Estimate the runtime of a task in seconds from its parameters, which is comparable
+    between task types. Tasks of unknown types count as one second.
+    """
+    units = get_task_cost_units(task_func, task_args)
+    return units * TASK_SECONDS_PER_UNIT.get(task_func.__name__, 1.0)
+
+
+class CostModel:
+    """
+    Learns the runtime per cost unit of every task type from measured task runtimes, which
+    makes the estimates of different task types comparable in seconds.
+
+    Until a task type has been measured its tasks are estimated at the average measured task
+    runtime, and before anything has been measured at all from the task parameters.
+    """
+
+    def __init__(self):
+        self.runtimes: dict[callable, float] = {}
+        self.units: dict[callable, float] = {}
+        self.runtime_sum = 0.0
+        self.count = 0
+
+    def update(self, tasks: list[tuple[callable, list]], task_samples: TaskSamples):
+        """
+        Learn from the per-task samples of a test pass that ran the given tasks.
+        """
+        for index, runtime in zip(task_samples.indexes, task_samples.runtimes):
+            task_func, task_args = tasks[index]
+            self.runtimes[task_func] = self.runtimes.get(task_func, 0.0) + runtime
+            self.units[task_func] = self.units.get(
+                task_func, 0.0
+            ) + get_task_cost_units(task_func, task_args)
+            self.runtime_sum += runtime
+            self.count += 1
+
+    def estimate(self, task_func: callable, task_args: list) -> float:
+        units = get_task_cost_units(task_func, task_args)
+        if self.units.get(task_func, 0) > 0:
+            return units * self.runtimes[task_func] / self.units[task_func]
+        if self.count > 0:
+            return self.runtime_sum / self.count
+        return get_task_seconds(task_func, task_args)
+
+
+def get_task_costs(
+    tasks: list[tuple[callable, list]], cost_model: CostModel = None
+) -> list[float]:
+    """
+    Estimate the runtime of every task in seconds, with the learned cost model if one is
+    given.
+    """
+    if cost_model is None:
+        return [
+            get_task_seconds(task_func, task_args) for task_func, task_args in tasks
+        ]
+    return [cost_model.estimate(task_func, task_args) for task_func, task_args in tasks]
@@ -5,3 +5,15 @@ def get_task_list(
     for index in range(task_count):
         tasks.append((task_func, task_args))
     return tasks
+
+
+def set_task_implementation(
+    tasks: list[tuple[callable, list]], implementation: str
+) -> list[tuple[callable, list]]:
+    """
+    The sum or multi tasks with their implementation argument replaced.
+    """
+    return [
+        (task_func, [task_args[0], implementation, *task_args[2:]])
+        for task_func, task_args in tasks
+    ]
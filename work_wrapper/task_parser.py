@@ -1,19 +1,12 @@
-import cv2
-from work.img import img_manipulation_task
-from work.io import io_task
-from work.matrix import matrix_inversion_task
-from work.multi import multiplication_task
-from work.password import password_hashing_and_checking_task
-from work.sort import sorting_task
-from work.sum import summing_task
-from work.tensor import tensor_task
-from work.zip import file_compression_task
+from work_wrapper.task_types import get_task_func
 
 
 class TaskWrapper:
     task_func: callable
     task_args: list
     task_details: str
+    # The implementations of sum and multi, compared in separate runners, None for other tasks
+    implementations: list[str] = None
 
     def __init__(self, task: str, task_args: list):
         self.task_func, self.task_args, self.task_details = self.parse_task(
@@ -24,50 +17,114 @@ class TaskWrapper:
         return f"{self.task_func.__name__}({self.task_details})"
 
     def parse_task(self, task: str, task_args: list) -> tuple[callable, list, str]:
-        if task == "sum":
-            task_func = summing_task
-            task_details = "x".join([str(x) for x in task_args])
-
-        elif task == "multi":
-            task_func = multiplication_task
-            task_details = "x".join([str(x) for x in task_args])
+        # The task modules are imported for the selected task only, see task_types
+        if task in ["sum", "multi"]:
+            from work.sum import IMPLEMENTATION_LOOP, IMPLEMENTATIONS
+
+            task_func = get_task_func(task)
+            # Defaults for the optional implementation and chunk count
+            task_args = add_default_args(task, task_args, 1, [IMPLEMENTATION_LOOP, 1])
+            # A list of implementations is compared, the tasks take the first by default
+            self.implementations = task_args[1]
+            if not isinstance(self.implementations, list):
+                self.implementations = [self.implementations]
+            if len(self.implementations) == 0:
+                raise ValueError("No implementation given")
+            for implementation in self.implementations:
+                if implementation not in IMPLEMENTATIONS:
+                    raise ValueError(
+                        f"Invalid implementation '{implementation}', must be one of {IMPLEMENTATIONS}"
+                    )
+            if task_args[2] < 1:
+                raise ValueError(
+                    f"Invalid chunk count {task_args[2]}, must be at least 1"
+                )
+            task_details = "; ".join(
+                [str(task_args[0]), "/".join(self.implementations), str(task_args[2])]
+            )
+            task_args = [task_args[0], self.implementations[0], *task_args[2:]]
 
         elif task == "io":
-            task_func = io_task
+            task_func = get_task_func(task)
             task_details = "x".join([str(x) for x in task_args])
 
         elif task == "zip":
-            task_func = file_compression_task
+            task_func = get_task_func(task)
             task_details = "x".join([str(x) for x in task_args])
 
+        elif task == "io_zero_copy":
+            from work.io import COPY_SENDFILE, get_available_copy_methods
+
+            task_func = get_task_func(task)
+            # Defaults for the optional copy method and payload reuse
+            task_args = add_default_args(task, task_args, 1, [COPY_SENDFILE, False])
+            copy_methods = get_available_copy_methods()
+            if task_args[1] not in copy_methods:
+                raise ValueError(
+                    f"Invalid or unsupported copy method '{task_args[1]}', available on this platform: {copy_methods}"
+                )
+            task_details = "; ".join([str(x) for x in task_args])
+
+        elif task == "zip_stream":
+            from work.zip import CODEC_GZIP, CODEC_LEVEL_RANGES, CODECS
+
+            task_func = get_task_func(task)
+            # Defaults for the optional codec, level and payload reuse
+            task_args = add_default_args(task, task_args, 1, [CODEC_GZIP, None, False])
+            if task_args[1] not in CODECS:
+                raise ValueError(
+                    f"Invalid codec '{task_args[1]}', must be one of {CODECS}"
+                )
+            levels = CODEC_LEVEL_RANGES[task_args[1]]
+            if task_args[2] is not None and task_args[2] not in levels:
+                raise ValueError(
+                    f"Invalid level {task_args[2]} for codec '{task_args[1]}', must be null or from {levels.start} to {levels.stop - 1}"
+                )
+            task_details = "; ".join([str(x) for x in task_args])
+
         elif task == "tensor":
-            task_func = tensor_task
+            task_func = get_task_func(task)
             task_details = "x".join([str(x) for x in task_args])
 
         elif task == "sort":
-            task_func = sorting_task
+            task_func = get_task_func(task)
             task_details = "x".join([str(x) for x in task_args])
 
         elif task == "matrix":
-            task_func = matrix_inversion_task
+            task_func = get_task_func(task)
             task_details = "x".join([str(x) for x in task_args])
 
         elif task == "img":
-            task_func = img_manipulation_task
+            import cv2
+
+            task_func = get_task_func(task)
             imgs = []
             for img_path in task_args[0]:
                 img = cv2.imread(img_path)
                 imgs.append(img)
 
             task_details = ";".join([str(x) for x in task_args[0]])
-            task_args[0] = imgs
+            # A new list, the config's task args are recorded in the result store
+            task_args = [imgs, *task_args[1:]]
 
         elif task == "password":
-            task_func = password_hashing_and_checking_task
+            task_func = get_task_func(task)
             task_details = (
                 f"{task_args[0]}/{task_args[1]}; {task_args[2]}; {task_args[3]}"
             )
 
+        elif task == "password_bulk":
+            from work.password import HASH_MODE_SHA256, HASH_MODES
+
+            task_func = get_task_func(task)
+            # Default for the optional hash mode
+            task_args = add_default_args(task, task_args, 4, [HASH_MODE_SHA256])
+            if task_args[4] not in HASH_MODES:
+                raise ValueError(
+                    f"Invalid hash mode '{task_args[4]}', must be one of {HASH_MODES}"
+                )
+            task_details = f"{task_args[0]}/{task_args[1]}; {task_args[2]}; {task_args[3]}; {task_args[4]}"
+
         elif task == "random":
             task_func = None
             if len(task_args) == 0:
@@ -79,3 +136,17 @@ class TaskWrapper:
             raise (f"Invalid task '{task}' specified.")
 
         return task_func, task_args, task_details
+
+
+def add_default_args(
+    task: str, task_args: list, required_count: int, defaults: list
+) -> list:
+    """
+    Append the defaults of the optional task args that are not given, after the required
+    ones, which have to be.
+    """
+    if len(task_args) < required_count:
+        raise ValueError(
+            f"The {task} task needs at least {required_count} args, got {len(task_args)}"
+        )
+    return task_args + defaults[len(task_args) - required_count :]
@@ -0,0 +1,100 @@
+import json
+import random
+from dataclasses import dataclass
+
+import numpy as np
+
+from work_wrapper.random_task_list import get_random_named_task_list
+from work_wrapper.task_types import get_task_func
+
+# Raised whenever the same plan would replay different data, e.g. when the tasks draw from
+# their seeds differently, so older plans are rejected instead. 2: per-task generators.
+TASK_PLAN_VERSION = 2
+
+
+@dataclass
+class TaskPlan:
+    """
+    A reproducible random workload: the type, arguments and random seed of every task,
+    generated from a single seed. Every iteration replays the same plan, and every task draws
+    from its own random and numpy generators seeded with its own seed.
+
+    Saved as compact JSON, so the same workload can be replayed on other machines and
+    commits. The image of img tasks is not saved, it is filled in when the tasks are created.
+    """
+
+    seed: int
+    task_types: list[str]
+    tasks: list[tuple[str, list, int]]
+
+    def get_tasks(self, img: np.ndarray = None) -> list[tuple[callable, list]]:
+        task_funcs = {name: get_task_func(name) for name, _, _ in self.tasks}
+
+        tasks = []
+        for name, task_args, _ in self.tasks:
+            if name == "img":
+                task_args = [[img]]
+            tasks.append((task_funcs[name], task_args))
+        return tasks
+
+    def get_seeds(self) -> list[int]:
+        return [seed for _, _, seed in self.tasks]
+
+    def save(self, filename: str):
+        plan = {
+            "version": TASK_PLAN_VERSION,
+            "seed": self.seed,
+            "task_types": self.task_types,
+            "tasks": [
+                [name, [] if name == "img" else task_args, seed]
+                for name, task_args, seed in self.tasks
+            ],
+        }
+        with open(filename, "w") as file:
+            json.dump(plan, file, separators=(",", ":"))
+
+    @staticmethod
+    def load(filename: str) -> "TaskPlan":
+        with open(filename, "r") as file:
+            plan = json.load(file)
+
+        if plan.get("version") != TASK_PLAN_VERSION:
+            raise ValueError(
+                f"Unsupported task plan version {plan.get('version')}, only version "
+                f"{TASK_PLAN_VERSION} plans can be replayed. Delete the file to generate a new plan"
+            )
+
+        return TaskPlan(
+            seed=plan["seed"],
+            task_types=plan["task_types"],
+            tasks=[tuple(task) for task in plan["tasks"]],
+        )
+
+
+def generate_task_plan(
+    task_count: int, task_types: list[str], seed: int = None
+) -> TaskPlan:
+    """
+    Generate a plan of random tasks. Without a seed one is drawn and recorded in the plan.
+    """
+    if seed is None:
+        seed = random.SystemRandom().randrange(2**32)
+
+    named_tasks = get_random_named_task_list(task_count, task_types, seed=seed)
+    task_seeds = get_task_seeds(seed, task_count)
+
+    return TaskPlan(
+        seed=seed,
+        task_types=task_types,
+        tasks=[
+            (name, task_args, task_seed)
+            for (name, _, task_args), task_seed in zip(named_tasks, task_seeds)
+        ],
+    )
+
+
+def get_task_seeds(seed: int, task_count: int) -> list[int]:
+    """
+    Derive an independent seed for every task from a single seed.
+    """
+    return np.random.SeedSequence(seed).generate_state(task_count).tolist()
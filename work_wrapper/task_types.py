@@ -0,0 +1,60 @@
+import importlib
+
+# The module and function of every task type. The task modules are only imported once a
+# task type is used, so that e.g. a sum run does not load OpenCV, and neither do its
+# spawned workers. The random argument generator of a task type is its function name
+# followed by "_random_params".
+TASK_TYPES = {
+    "sum": ("work.sum", "summing_task"),
+    "multi": ("work.multi", "multiplication_task"),
+    "io": ("work.io", "io_task"),
+    "zip": ("work.zip", "file_compression_task"),
+    "io_zero_copy": ("work.io", "zero_copy_io_task"),
+    "zip_stream": ("work.zip", "stream_compression_task"),
+    "tensor": ("work.tensor", "tensor_task"),
+    "sort": ("work.sort", "sorting_task"),
+    "matrix": ("work.matrix", "matrix_inversion_task"),
+    "password": ("work.password", "password_hashing_and_checking_task"),
+    "password_bulk": ("work.password", "bulk_password_hashing_and_checking_task"),
+    "img": ("work.img", "img_manipulation_task"),
+}
+
+# The task types a random task list is drawn from when no task types are given: the original
+# mix, so that results stay comparable with earlier runs of the same config. The variants
+# io_zero_copy, zip_stream and password_bulk are only used when listed in task_args.
+RANDOM_DEFAULT_TASK_TYPES = [
+    "sum",
+    "multi",
+    "io",
+    "zip",
+    "tensor",
+    "sort",
+    "matrix",
+    "password",
+    "img",
+]
+
+
+def get_task_func(task_type: str) -> callable:
+    module, func_name = TASK_TYPES[task_type]
+    return getattr(importlib.import_module(module), func_name)
+
+
+def get_random_params_func(task_type: str) -> callable:
+    module, func_name = TASK_TYPES[task_type]
+    return getattr(importlib.import_module(module), f"{func_name}_random_params")
+
+
+def get_task_modules(task_types: list[str]) -> list[str]:
+    """
+    The modules of the given task types, of the default random task types if none are given.
+    """
+    if len(task_types) == 0:
+        task_types = RANDOM_DEFAULT_TASK_TYPES
+    return sorted(
+        set(
+            TASK_TYPES[task_type][0]
+            for task_type in task_types
+            if task_type in TASK_TYPES
+        )
+    )